@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db.database import Database
+from service.query import QueryError
+from service.report import PERIODS, ReportGenerator
+
+
+def print_progress(percent: int, stage: str):
+    print(f"\r生成中 {percent:3d}%  {stage}", end="", flush=True)
+
+
+def run_batch(start_date: str, end_date: str, period: str = "week", fmt: str = "md",
+              query: str = None, db_path: str = None):
+    """一次扫描批量生成（重新生成）日期范围内每个周期的报告，写入 export/
+
+    数据库路径与程序保持一致（开发环境为 data/worklog.db，打包环境为用户数据目录）。
+    """
+    if db_path is None:
+        db_path = Database._get_default_db_path()
+
+    if not os.path.exists(db_path):
+        print(f"数据库文件不存在: {db_path}")
+        sys.exit(1)
+
+    with Database(db_path) as db:
+        start = time.perf_counter()
+        try:
+            paths = ReportGenerator.generate_and_export_batch_reports(
+                db, start_date, end_date, period, progress=print_progress, fmt=fmt, query=query)
+        except QueryError as e:
+            print(f"筛选条件有误: {e}")
+            sys.exit(2)
+        print()
+        for path in paths:
+            print(f"  {path}")
+        print(f"共生成 {len(paths)} 份报告（{time.perf_counter() - start:.2f}s）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="批量生成 WorkTag 周报 / 迭代报告 / 月报",
+        epilog="示例: python batch_reports.py 2026-01-01 2026-12-31 --period month",
+    )
+    parser.add_argument("start", help="开始日期 YYYY-MM-DD（扩展到所在周期的第一天）")
+    parser.add_argument("end", help="结束日期 YYYY-MM-DD（扩展到所在周期的最后一天）")
+    parser.add_argument("--period", choices=list(PERIODS), default="week", help="报告周期（sprint 为两周）")
+    parser.add_argument("--format", dest="fmt", choices=["md", "html", "docx"], default="md", help="导出格式")
+    parser.add_argument("--query", help="筛选语句，只统计满足条件的记录（语法同 search_logs.py）")
+    parser.add_argument("--db", help="数据库文件路径（默认与程序使用的路径一致）")
+    args = parser.parse_args()
+    run_batch(args.start, args.end, args.period, args.fmt, args.query, args.db)
@@ -5,12 +5,53 @@ WorkTag - 打包脚本
 """
 
 import os
+import re
 import sys
 import shutil
+import argparse
 import PyInstaller.__main__
 
+# 打包方式：
+#   onefile  单个 exe，每次启动先把整个包解压到临时目录，冷启动慢
+#   fast     单目录（dist/onedir/WorkTag/），免解压；排除用不到的 Qt 模块、插件和翻译，
+#            字节码预先编译并优化，启动更快（用 startup_bench.py 测量）
+BUILD_MODES = ('onefile', 'fast')
+FAST_DIST_DIR = os.path.join('dist', 'onedir')
+
+# 程序只用到 QtCore / QtGui / QtWidgets / QtNetwork，其余 Qt 模块不打包
+UNUSED_QT_MODULES = [
+    'PySide6.QtQml', 'PySide6.QtQuick', 'PySide6.QtQuickWidgets', 'PySide6.QtQuickControls2',
+    'PySide6.QtWebEngineCore', 'PySide6.QtWebEngineWidgets', 'PySide6.QtWebChannel', 'PySide6.QtWebSockets',
+    'PySide6.QtMultimedia', 'PySide6.QtMultimediaWidgets', 'PySide6.QtCharts', 'PySide6.QtDataVisualization',
+    'PySide6.QtPdf', 'PySide6.QtPdfWidgets', 'PySide6.QtSvg', 'PySide6.QtSvgWidgets', 'PySide6.QtSql',
+    'PySide6.QtTest', 'PySide6.QtOpenGLWidgets', 'PySide6.Qt3DCore', 'PySide6.QtBluetooth',
+    'PySide6.QtPositioning', 'PySide6.QtLocation', 'PySide6.QtSensors', 'PySide6.QtSerialPort',
+    'PySide6.QtNfc', 'PySide6.QtDesigner', 'PySide6.QtHelp', 'PySide6.QtUiTools', 'PySide6.QtXml',
+    'PySide6.QtConcurrent', 'PySide6.QtPrintSupport', 'PySide6.QtStateMachine', 'PySide6.QtTextToSpeech',
+]
+
+# 保留的 Qt 插件目录（其余整个删除）及其中保留的插件（None 表示整个目录都保留）
+KEPT_QT_PLUGINS = {
+    'platforms': ('qwindows', 'qxcb', 'qwayland', 'qcocoa', 'qoffscreen', 'qminimal'),
+    'styles': None,
+    'imageformats': ('qico',),          # PNG 由 QtGui 内置支持，托盘图标只需要 ICO
+    'platformthemes': None,
+    'platforminputcontexts': None,      # Linux 下的中文输入法
+    'wayland-shell-integration': None,
+    'wayland-decoration-client': None,
+    'wayland-graphics-integration-client': None,
+    'xcbglintegrations': None,
+}
+
+# 被删掉的插件才会用到的 Qt 库（opengl32sw 为软件渲染的后备实现）
+UNUSED_QT_LIBRARIES = re.compile(
+    r'(Qt6(Qml|QmlModels|QmlMeta|QmlWorkerScript|Quick|QuickControls2|QuickTemplates2|Pdf|'
+    r'VirtualKeyboard|Svg|Multimedia|WebEngineCore|WebChannel|Positioning)\b|opengl32sw)',
+    re.IGNORECASE,
+)
+
 def clean_build_dirs():
-    """清理构建目录"""
+    """清理构建目录（两种打包方式的产物都会清理）"""
     dirs_to_clean = ['build', 'dist', '__pycache__']
     for dir_name in dirs_to_clean:
         if os.path.exists(dir_name):
@@ -32,16 +73,80 @@ def collect_data_files():
     if os.path.exists(icon_path):
         data_files.append((icon_path, 'ui'))
     
+    # 内置报告模板
+    templates_dir = 'service/report_templates'
+    if os.path.isdir(templates_dir):
+        data_files.append((templates_dir, templates_dir))
+    
     # 注意：数据库文件不再打包到exe中
     # 数据库文件将存储在用户数据目录（Windows: AppData/Local/WorkTag/data）
     # 这样可以避免每次重新打包时丢失用户数据
     
     return data_files
 
-def build_exe():
-    """构建可执行文件"""
+def find_qt_dir(dist_dir):
+    """在单目录产物中找到 PySide6 目录（PyInstaller 6 放在 _internal/ 下）"""
+    for root, dirs, _files in os.walk(dist_dir):
+        if os.path.basename(root) == 'PySide6':
+            return root
+    return None
+
+def prune_qt_files(dist_dir):
+    """删除单目录产物中用不到的 Qt 插件、翻译和库，返回释放的字节数"""
+    qt_dir = find_qt_dir(dist_dir)
+    if qt_dir is None:
+        print("未找到 PySide6 目录，跳过精简")
+        return 0
+    
+    removed = []
+    
+    def remove(path):
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                removed.extend(os.path.getsize(os.path.join(root, f)) for f in files)
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            removed.append(os.path.getsize(path))
+            os.remove(path)
+    
+    # 程序没有加载 Qt 自带的翻译
+    remove(os.path.join(qt_dir, 'translations'))
+    remove(os.path.join(qt_dir, 'Qt', 'translations'))
+    
+    for plugins_dir in (os.path.join(qt_dir, 'plugins'), os.path.join(qt_dir, 'Qt', 'plugins')):
+        if not os.path.isdir(plugins_dir):
+            continue
+        for group in os.listdir(plugins_dir):
+            group_dir = os.path.join(plugins_dir, group)
+            if group not in KEPT_QT_PLUGINS:
+                remove(group_dir)
+                continue
+            kept = KEPT_QT_PLUGINS[group]
+            if kept is None:
+                continue
+            for name in os.listdir(group_dir):
+                stem = os.path.splitext(name)[0]
+                if stem.startswith('lib'):
+                    stem = stem[3:]
+                if not stem.startswith(kept):
+                    remove(os.path.join(group_dir, name))
+    
+    for root, _dirs, files in os.walk(dist_dir):
+        for name in files:
+            if UNUSED_QT_LIBRARIES.search(name):
+                remove(os.path.join(root, name))
+    
+    freed = sum(removed)
+    print(f"精简 Qt 文件: 删除 {len(removed)} 个文件，释放 {freed / (1024 * 1024):.1f} MB")
+    return freed
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _dirs, files in os.walk(path) for f in files)
+
+def build_exe(mode='onefile'):
+    """构建可执行文件（mode 见 BUILD_MODES）"""
     print("=" * 50)
-    print("WorkTag - 打包为Windows可执行文件")
+    print(f"WorkTag - 打包为Windows可执行文件（{mode}）")
     print("=" * 50)
     
     # 清理旧的构建文件
@@ -54,12 +159,22 @@ def build_exe():
     pyinstaller_args = [
         'main.py',  # 主程序入口
         '--name=WorkTag',  # 可执行文件名称
-        '--onefile',  # 打包为单个exe文件
         '--windowed',  # 窗口程序（不显示控制台）
         '--clean',  # 清理临时文件
         '--noconfirm',  # 覆盖输出目录而不确认
     ]
     
+    if mode == 'fast':
+        pyinstaller_args.extend([
+            '--onedir',  # 单目录：启动时不需要解压
+            f'--distpath={FAST_DIST_DIR}',
+            f'--workpath={os.path.join("build", "onedir")}',
+            '--noupx',  # UPX 压缩的库每次加载都要解压
+            '--optimize=1',  # 预编译的字节码去掉 assert（需要 PyInstaller 6.0+）
+        ])
+    else:
+        pyinstaller_args.append('--onefile')  # 打包为单个exe文件
+    
     # 添加图标
     icon_path = 'ui/icon.png'
     if os.path.exists(icon_path):
@@ -68,20 +183,30 @@ def build_exe():
     
     # 添加数据文件
     for src, dst in data_files:
-        pyinstaller_args.append(f'--add-data={src};{dst}')
+        pyinstaller_args.append(f'--add-data={src}{os.pathsep}{dst}')
         print(f"添加数据文件: {src} -> {dst}")
     
     # 添加隐藏导入（PySide6可能需要）
-    pyinstaller_args.extend([
-        '--hidden-import=PySide6',
-        '--hidden-import=PySide6.QtCore',
-        '--hidden-import=PySide6.QtGui',
-        '--hidden-import=PySide6.QtWidgets',
-        '--hidden-import=sqlite3',
-        '--hidden-import=os',
-        '--hidden-import=sys',
-        '--hidden-import=datetime',
-    ])
+    if mode == 'fast':
+        # 只声明实际用到的 Qt 模块，其余由依赖分析决定
+        pyinstaller_args.extend([
+            '--hidden-import=PySide6.QtCore',
+            '--hidden-import=PySide6.QtGui',
+            '--hidden-import=PySide6.QtWidgets',
+            '--hidden-import=PySide6.QtNetwork',
+        ])
+    else:
+        pyinstaller_args.extend([
+            '--hidden-import=PySide6',
+            '--hidden-import=PySide6.QtCore',
+            '--hidden-import=PySide6.QtGui',
+            '--hidden-import=PySide6.QtWidgets',
+            '--hidden-import=PySide6.QtNetwork',
+            '--hidden-import=sqlite3',
+            '--hidden-import=os',
+            '--hidden-import=sys',
+            '--hidden-import=datetime',
+        ])
     
     # 添加排除模块（减少体积）
     pyinstaller_args.extend([
@@ -90,6 +215,8 @@ def build_exe():
         '--exclude-module=numpy',
         '--exclude-module=pandas',
     ])
+    if mode == 'fast':
+        pyinstaller_args.extend(f'--exclude-module={name}' for name in UNUSED_QT_MODULES)
     
     print("\n开始打包...")
     print(f"PyInstaller参数: {pyinstaller_args}")
@@ -104,8 +231,15 @@ def build_exe():
         print("=" * 50)
         
         # 显示输出信息
+        if mode == 'fast':
+            app_dir = os.path.join(FAST_DIST_DIR, 'WorkTag')
+            prune_qt_files(app_dir)
+            print(f"生成的程序目录: {os.path.abspath(app_dir)}")
+            print(f"目录大小: {dir_size(app_dir) / (1024 * 1024):.2f} MB")
+            print("测量启动时间: python startup_bench.py fast onefile")
+        
         dist_dir = 'dist'
-        if os.path.exists(dist_dir):
+        if mode == 'onefile' and os.path.exists(dist_dir):
             exe_files = [f for f in os.listdir(dist_dir) if f.endswith('.exe')]
             if exe_files:
                 exe_path = os.path.join(dist_dir, exe_files[0])
@@ -131,13 +265,13 @@ def build_exe():
         print(f"\n打包失败: {e}")
         sys.exit(1)
 
-def create_standalone_package():
-    """创建独立发布包（包含exe和必要文件）"""
+def create_standalone_package(mode='onefile'):
+    """创建独立发布包（包含exe和必要文件；fast 方式复制整个程序目录）"""
     print("\n" + "=" * 50)
     print("创建独立发布包")
     print("=" * 50)
     
-    dist_dir = 'dist'
+    dist_dir = FAST_DIST_DIR if mode == 'fast' else 'dist'
     package_dir = 'WorkTag_Package'
     
     if not os.path.exists(dist_dir):
@@ -147,19 +281,28 @@ def create_standalone_package():
     # 创建发布包目录
     if os.path.exists(package_dir):
         shutil.rmtree(package_dir)
-    os.makedirs(package_dir)
     
-    # 复制exe文件
-    exe_files = [f for f in os.listdir(dist_dir) if f.endswith('.exe')]
-    if not exe_files:
-        print("错误: 未找到exe文件")
-        return
-    
-    for exe_file in exe_files:
-        src = os.path.join(dist_dir, exe_file)
-        dst = os.path.join(package_dir, exe_file)
-        shutil.copy2(src, dst)
-        print(f"复制: {exe_file}")
+    if mode == 'fast':
+        app_dir = os.path.join(dist_dir, 'WorkTag')
+        if not os.path.isdir(app_dir):
+            print("错误: 未找到程序目录")
+            return
+        shutil.copytree(app_dir, package_dir)
+        print(f"复制: {app_dir}")
+    else:
+        os.makedirs(package_dir)
+        
+        # 复制exe文件
+        exe_files = [f for f in os.listdir(dist_dir) if f.endswith('.exe')]
+        if not exe_files:
+            print("错误: 未找到exe文件")
+            return
+        
+        for exe_file in exe_files:
+            src = os.path.join(dist_dir, exe_file)
+            dst = os.path.join(package_dir, exe_file)
+            shutil.copy2(src, dst)
+            print(f"复制: {exe_file}")
     
     # 复制图标
     icon_src = 'ui/icon.png'
@@ -203,11 +346,16 @@ def create_standalone_package():
     print(f"包含文件: {os.listdir(package_dir)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 WorkTag 打包为可执行文件")
+    parser.add_argument("--mode", choices=BUILD_MODES, default="onefile",
+                        help="onefile：单个 exe；fast：单目录、精简 Qt，启动更快")
+    args = parser.parse_args()
+    
     # 构建exe
-    build_exe()
+    build_exe(args.mode)
     
     # 创建发布包
-    create_standalone_package()
+    create_standalone_package(args.mode)
     
     print("\n" + "=" * 50)
     print("全部完成！")
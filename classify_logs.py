@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db.database import Database
+from service.classifier import ProjectClassifier, apply_suggestions
+
+
+def run_classify(db_path: str = None, apply: bool = False, rebuild: bool = False, show: int = 20):
+    """为没有项目的记录建议项目（按已有项目记录训练的 TF-IDF 最近质心模型）
+
+    默认只输出建议；apply 时把置信度足够的建议写入数据库。
+    数据库路径与程序保持一致（开发环境为 data/worklog.db，打包环境为用户数据目录）。
+    """
+    if db_path is None:
+        db_path = Database._get_default_db_path()
+
+    if not os.path.exists(db_path):
+        print(f"数据库文件不存在: {db_path}")
+        sys.exit(1)
+
+    with Database(db_path) as db:
+        start = time.perf_counter()
+        classifier = ProjectClassifier.load(db)
+        learned = classifier.update(db, rebuild)
+        print(f"{'重新训练' if rebuild else '增量训练'} {learned} 条记录，"
+              f"参与归类的项目 {len(classifier.projects)} 个（{time.perf_counter() - start:.2f}s）")
+
+        start = time.perf_counter()
+        suggestions = classifier.suggest(db)
+        confident = [s for s in suggestions if s.confident]
+        print(f"未分类记录 {len(suggestions)} 条，可归类 {len(confident)} 条"
+              f"（{'NumPy' if classifier.vectorized else '纯 Python'}，{time.perf_counter() - start:.2f}s）")
+
+        for suggestion in confident[:show]:
+            print(f"  {suggestion.date} [{suggestion.project}] {suggestion.content}"
+                  f"  ({suggestion.score:.2f} / +{suggestion.margin:.2f})")
+        if len(confident) > show:
+            print("  …")
+
+        if apply and confident:
+            print(f"已为 {apply_suggestions(db, confident)} 条记录设置项目")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按已有记录自动归类没有项目的 WorkTag 记录")
+    parser.add_argument("--db", help="数据库文件路径（默认与程序使用的路径一致）")
+    parser.add_argument("--apply", action="store_true", help="把置信度足够的建议写入数据库")
+    parser.add_argument("--rebuild", action="store_true", help="丢弃已有模型，用全部记录重新训练")
+    parser.add_argument("--show", type=int, default=20, help="输出的建议条数")
+    args = parser.parse_args()
+    run_classify(args.db, args.apply, args.rebuild, args.show)
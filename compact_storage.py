@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db.database import Database
+from db.contents import compact_storage, expand_storage
+
+
+def print_progress(percent: int, stage: str):
+    print(f"\r{stage} {percent:3d}%", end="", flush=True)
+
+
+def run_compact(db_path: str = None, disable: bool = False, retrain: bool = False, stats_only: bool = False):
+    """切换记录内容的存储方式
+
+    紧凑存储：相同的内容只保存一份（log_contents），较长的内容用从历史记录训练的预置字典压缩；
+    读取时只有实际显示的记录才会解压。disable 时把内容写回 work_log，恢复普通存储。
+    数据库路径与程序保持一致（开发环境为 data/worklog.db，打包环境为用户数据目录）。
+    """
+    db_path = os.path.abspath(db_path) if db_path else Database._get_default_db_path()
+
+    if not os.path.exists(db_path):
+        print(f"数据库文件不存在: {db_path}")
+        sys.exit(1)
+
+    with Database(db_path) as db:
+        print(db.get_storage_stats())
+        if stats_only:
+            return
+
+        start = time.perf_counter()
+        if disable:
+            stats = expand_storage(db, progress=print_progress)
+        else:
+            stats = compact_storage(db, retrain, progress=print_progress)
+        print()
+        print(f"完成（{time.perf_counter() - start:.2f}s）")
+        print(stats)
+
+        # 回收转换后空出的页（数据库启用了 auto_vacuum=INCREMENTAL）
+        with db.writer() as conn:
+            conn.execute('PRAGMA incremental_vacuum').fetchall()
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+    print(f"数据库文件大小: {os.path.getsize(db_path) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 WorkTag 记录内容切换为紧凑存储（去重 + 字典压缩）或恢复普通存储")
+    parser.add_argument("--db", help="数据库文件路径（默认与程序使用的路径一致）")
+    parser.add_argument("--disable", action="store_true", help="恢复普通存储（内容写回 work_log）")
+    parser.add_argument("--retrain", action="store_true", help="用最近的记录重新训练压缩字典并重新压缩")
+    parser.add_argument("--stats", action="store_true", help="只输出存储统计")
+    args = parser.parse_args()
+    run_compact(args.db, args.disable, args.retrain, args.stats)
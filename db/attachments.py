@@ -0,0 +1,152 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+# 流式读写的块大小
+CHUNK_SIZE = 1024 * 1024
+# 新写入的文件在这段时间内不会被垃圾回收（写入文件和插入引用之间有短暂的间隔）
+GC_GRACE_SECONDS = 3600
+
+_TMP_DIR = 'tmp'
+
+
+class AttachmentStore:
+    """按内容寻址的附件目录
+
+    文件以 SHA-256 命名，按前两级各两位分片存放：<根目录>/ab/cd/abcd…；
+    相同内容只存一份，数据库中只保存引用（attachments 表）。
+    写入时先流式写到 tmp/ 下的临时文件并同时计算哈希，完成后原子地移动到最终位置。
+    没有任何引用的文件由维护任务在后台清理（见 db/maintenance.py）。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, sha256: str) -> str:
+        """内容哈希 -> 文件路径（不检查文件是否存在）"""
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def uri_for(self, sha256: str) -> str:
+        """file:// 链接，供报告引用（不读取文件内容）"""
+        return Path(os.path.abspath(self.path_for(sha256))).as_uri()
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path_for(sha256))
+
+    def put_stream(self, stream: BinaryIO) -> Tuple[str, int]:
+        """按块读取 stream 写入仓库，返回 (sha256, 字节数)；内容已存在时不重复保存"""
+        tmp_dir = os.path.join(self.root, _TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256)
+            if os.path.exists(path):
+                # 已有相同内容：刷新修改时间，避免在插入引用之前被垃圾回收
+                os.utime(path)
+                os.remove(tmp_path)
+            else:
+                self._move_into_place(tmp_path, path)
+            return sha256, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _move_into_place(tmp_path: str, path: str):
+        # 垃圾回收可能恰好删除了刚创建的空分片目录，重建后再试一次
+        for attempt in range(2):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.replace(tmp_path, path)
+                return
+            except FileNotFoundError:
+                if attempt:
+                    raise
+
+    def put_file(self, source: str) -> Tuple[str, int]:
+        """把文件写入仓库，返回 (sha256, 字节数)"""
+        with open(source, 'rb') as stream:
+            return self.put_stream(stream)
+
+    def open(self, sha256: str) -> BinaryIO:
+        """以二进制只读方式打开附件"""
+        return open(self.path_for(sha256), 'rb')
+
+    def iter_chunks(self, sha256: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """按块读出附件内容"""
+        with self.open(sha256) as stream:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def copy_to(self, sha256: str, destination: str) -> str:
+        """把附件按块复制到 destination（覆盖已有文件），返回目标路径"""
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+        with self.open(sha256) as src, open(destination, 'wb') as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        return destination
+
+    def iter_shards(self, after: str = '') -> Iterator[str]:
+        """按名称顺序列出一级分片目录（ab、cd…），after 用于分批继续"""
+        if not os.path.isdir(self.root):
+            return
+        for name in sorted(os.listdir(self.root)):
+            if len(name) == 2 and name > after and os.path.isdir(os.path.join(self.root, name)):
+                yield name
+
+    def iter_shard_files(self, shard: str) -> Iterator[Tuple[str, str]]:
+        """列出分片下的所有附件 (sha256, 路径)"""
+        shard_dir = os.path.join(self.root, shard)
+        for sub in sorted(os.listdir(shard_dir)):
+            sub_dir = os.path.join(shard_dir, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                yield name, os.path.join(sub_dir, name)
+
+    def remove_if_stale(self, path: str, grace_seconds: float = GC_GRACE_SECONDS,
+                        now: Optional[float] = None, prune_dir: bool = True) -> bool:
+        """删除超过宽限期的文件，返回是否删除（prune_dir 时顺带删除变空的分片目录）"""
+        now = now if now is not None else time.time()
+        try:
+            if now - os.path.getmtime(path) < grace_seconds:
+                return False
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        if not prune_dir:
+            return True
+        # 清理空的二级分片目录
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+        return True
+
+    def clean_temp(self, grace_seconds: float = GC_GRACE_SECONDS) -> int:
+        """删除中断的写入留下的临时文件"""
+        tmp_dir = os.path.join(self.root, _TMP_DIR)
+        if not os.path.isdir(tmp_dir):
+            return 0
+        return sum(self.remove_if_stale(os.path.join(tmp_dir, name), grace_seconds, prune_dir=False)
+                   for name in os.listdir(tmp_dir))
@@ -0,0 +1,215 @@
+import hashlib
+import heapq
+import threading
+import zlib
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# meta 中的存储方式：compact 时新写入的内容按内容去重保存在 log_contents 中
+STORAGE_MODE_KEY = 'storage_mode'
+COMPACT_MODE = 'compact'
+
+# 不短于该字节数（UTF-8）的内容才去重保存：更短的内容引用本身（哈希 + 索引）比内容还大
+INTERN_MIN_BYTES = 16
+# 不短于该字节数的内容才尝试压缩；压缩后不小于原文的 MAX_COMPRESSED_RATIO 时保留原文
+COMPRESS_MIN_BYTES = 80
+MAX_COMPRESSED_RATIO = 0.9
+
+# 预置字典：大小（deflate 的窗口为 32 KiB，字典再大也用不上）、训练用样本的总字节数上下限
+DICT_SIZE = 16 * 1024
+TRAIN_MAX_BYTES = 1024 * 1024
+TRAIN_MIN_BYTES = 8 * 1024
+# 训练时统计的子串长度（UTF-8 字节，约两个汉字）和候选片段的长度
+_KMER = 6
+_SEGMENT = 64
+
+# 不使用预置字典的压缩（还没有训练字典时）
+NO_DICT = 0
+
+# 读取内容的 SQL 表达式：内联的 content，或按 content_id 取出并在需要时解压
+# （标量子查询只对最终输出的行求值，列表和统计查询不会为不显示的内容付出解压的代价）
+_CONTENT_SQL = ('COALESCE({table}.content, (SELECT inflate_content(c.dict_id, c.data) '
+                'FROM log_contents AS c WHERE c.id = {table}.content_id))')
+
+
+def content_sql(table: str = 'work_log') -> str:
+    """work_log（或其别名 table）中记录内容的 SQL 表达式"""
+    return _CONTENT_SQL.format(table=table)
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def should_intern(text: str) -> bool:
+    return len(text.encode('utf-8')) >= INTERN_MIN_BYTES
+
+
+class ContentCodec:
+    """log_contents 中内容的编解码
+
+    dict_id 为 NULL 时 data 就是原文；否则 data 是 raw deflate 压缩的 UTF-8，
+    使用 log_content_dicts 中对应的预置字典（NO_DICT 表示不用字典）。
+    字典写入后不再修改，按 ID 缓存；缓存中没有的由 loader 从数据库读取。
+    """
+
+    def __init__(self, loader: Callable[[int], Optional[bytes]]):
+        self._loader = loader
+        self._dicts: Dict[int, bytes] = {NO_DICT: b''}
+        self._lock = threading.Lock()
+
+    def dictionary(self, dict_id: int) -> bytes:
+        zdict = self._dicts.get(dict_id)
+        if zdict is None:
+            zdict = self._loader(dict_id)
+            if zdict is None:
+                raise ValueError(f"压缩字典不存在: {dict_id}")
+            with self._lock:
+                self._dicts[dict_id] = zdict
+        return zdict
+
+    def add_dictionary(self, dict_id: int, zdict: bytes):
+        with self._lock:
+            self._dicts[dict_id] = zdict
+
+    def encode(self, text: str, dict_id: int) -> Tuple[Optional[int], Union[str, bytes]]:
+        """原文 -> (dict_id, data)；太短或压缩效果不明显时保留原文（dict_id 为 None）"""
+        raw = text.encode('utf-8')
+        if len(raw) < COMPRESS_MIN_BYTES:
+            return None, text
+        zdict = self.dictionary(dict_id)
+        if zdict:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+        else:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        data = compressor.compress(raw) + compressor.flush()
+        if len(data) >= len(raw) * MAX_COMPRESSED_RATIO:
+            return None, text
+        return dict_id, data
+
+    def decode(self, dict_id: Optional[int], data: Union[str, bytes]) -> str:
+        """SQL 函数 inflate_content(dict_id, data) 的实现"""
+        if dict_id is None:
+            return data
+        zdict = self.dictionary(dict_id)
+        decompressor = zlib.decompressobj(-15, zdict) if zdict else zlib.decompressobj(-15)
+        return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+
+
+def train_dictionary(samples: List[bytes], size: int = DICT_SIZE) -> bytes:
+    """从历史内容中训练 deflate 预置字典（简化的 COVER 算法）
+
+    统计每个 6 字节子串出现在多少条样本中；把样本切成 64 字节的候选片段（步长为一半），
+    片段的得分为其中各子串的出现次数之和。每次贪心地选出得分最高的片段，并把它包含的
+    子串计数清零（避免字典里重复同样的内容），直到字典写满。deflate 对距离近的匹配
+    编码更短，因此得分最高的片段放在字典末尾。
+    """
+    df = Counter()
+    for sample in samples:
+        df.update({sample[i:i + _KMER] for i in range(len(sample) - _KMER + 1)})
+
+    def score(segment: bytes) -> int:
+        kmers = {segment[i:i + _KMER] for i in range(len(segment) - _KMER + 1)}
+        return sum(df[k] for k in kmers if df[k] > 1)
+
+    step = _SEGMENT // 2
+    candidates = {sample[i:i + _SEGMENT] for sample in samples
+                  for i in range(0, max(len(sample) - step, 1), step)}
+    heap = [(-score(segment), segment) for segment in candidates]
+    heapq.heapify(heap)
+
+    chosen: List[bytes] = []
+    total = 0
+    while heap and total < size:
+        _, segment = heapq.heappop(heap)
+        current = score(segment)
+        if current <= 0:
+            continue
+        if heap and current < -heap[0][0]:
+            # 得分只会下降：重新计算后不再领先的放回堆中（惰性贪心）
+            heapq.heappush(heap, (-current, segment))
+            continue
+        chosen.append(segment)
+        total += len(segment)
+        for i in range(len(segment) - _KMER + 1):
+            df[segment[i:i + _KMER]] = 0
+
+    return b''.join(reversed(chosen))[-size:]
+
+
+class StorageStats(NamedTuple):
+    """内容存储的统计（字节数均为 UTF-8 / 压缩后的长度）"""
+    mode: str
+    rows: int
+    inline_rows: int
+    interned_rows: int
+    contents: int
+    compressed: int
+    text_bytes: int      # 所有记录内容的原文总长度
+    stored_bytes: int    # 实际保存的内容长度（内联 + 去重后 + 字典）
+
+    def __str__(self):
+        saved = 1 - self.stored_bytes / self.text_bytes if self.text_bytes else 0.0
+        return (f"存储方式 {self.mode}：记录 {self.rows} 条（内联 {self.inline_rows}，引用 {self.interned_rows}），"
+                f"去重后内容 {self.contents} 条（压缩 {self.compressed}）；"
+                f"原文 {self.text_bytes / 1024:.1f} KiB，实际 {self.stored_bytes / 1024:.1f} KiB（节省 {saved:.0%}）")
+
+
+def train_content_dictionary(db) -> Optional[int]:
+    """用最近的不重复内容训练新的预置字典并保存，返回字典 ID；样本太少时返回 None"""
+    samples: List[bytes] = []
+    seen = set()
+    total = 0
+    for text in db.iter_recent_contents():
+        raw = text.encode('utf-8')
+        if len(raw) < _KMER or raw in seen:
+            continue
+        seen.add(raw)
+        samples.append(raw)
+        total += len(raw)
+        if total >= TRAIN_MAX_BYTES:
+            break
+    if total < TRAIN_MIN_BYTES:
+        return None
+    return db.add_content_dictionary(train_dictionary(samples), len(samples))
+
+
+def _run_batches(step: Callable[[int], Tuple[Optional[int], int]], total: int, stage: str, progress=None) -> int:
+    """按 ID 分批执行 step(after_id) -> (本批最后的 ID, 本批行数)，每批一个短事务；total 为总行数"""
+    after_id = 0
+    done = 0
+    while True:
+        last_id, count = step(after_id)
+        if last_id is None:
+            return done
+        after_id = last_id
+        done += count
+        if progress:
+            progress(min(done * 100 // max(total, 1), 99), stage)
+
+
+def compact_storage(db, retrain: bool = False, progress=None) -> StorageStats:
+    """切换到紧凑存储：训练字典（没有字典或 retrain 时），把已有记录的内容去重、压缩
+
+    先写入存储方式，之后新增的记录直接按紧凑方式保存；已有记录按 ID 分批转换，
+    中断后重新运行会从头跳过已转换的记录。训练出新字典时，已去重的内容也用它重新压缩。
+    """
+    db.set_meta(STORAGE_MODE_KEY, COMPACT_MODE)
+    if retrain or db.get_content_dictionary_id() == NO_DICT:
+        if progress:
+            progress(0, "训练压缩字典")
+        dict_id = train_content_dictionary(db)
+        if dict_id is not None:
+            _run_batches(db.recompress_contents, db.get_storage_stats().contents, "重新压缩", progress)
+
+    stats = db.get_storage_stats()
+    _run_batches(lambda after: db.convert_contents(True, after), stats.inline_rows, "去重、压缩", progress)
+    return db.get_storage_stats()
+
+
+def expand_storage(db, progress=None) -> StorageStats:
+    """切换回普通存储：把引用的内容写回 work_log.content（无引用的内容由触发器删除）"""
+    db.set_meta(STORAGE_MODE_KEY, None)
+    stats = db.get_storage_stats()
+    _run_batches(lambda after: db.convert_contents(False, after), stats.interned_rows, "还原", progress)
+    return db.get_storage_stats()
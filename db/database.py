@@ -1,24 +1,544 @@
 import sqlite3
 import os
 import sys
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from functools import wraps
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional, Set, Tuple
 
-class Database:
-    def __init__(self, db_path: str = None):
-        """初始化数据库连接"""
+from db import frecency
+from db.attachments import AttachmentStore
+from db.contents import (
+    COMPACT_MODE, NO_DICT, STORAGE_MODE_KEY, ContentCodec, StorageStats, content_hash, content_sql, should_intern
+)
+from db.migrations import run_migrations, ProgressCallback
+from db.events import (
+    AttachmentsChanged, EventBus, ExternalChange, LogAdded, LogDeleted, LogsImported, ProjectDeleted,
+    ProjectsAdded, ProjectsAssigned, ProjectUsageChanged
+)
+from db.models import Attachment, LogEntry, split_list
+from db.pool import ReaderPool
+
+
+def _serialized(method):
+    """同一连接上的操作串行执行（写连接可能被后台线程通过 writer() 使用）
+
+    写方法产生的变更事件在最外层调用释放锁之后才发布，订阅者中可以放心地再查询数据库。
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            self._depth += 1
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                self._depth -= 1
+                pending = self._take_events() if self._depth == 0 else ()
+        for event in pending:
+            self.events.publish(event)
+        return result
+    return wrapper
+
+
+# 每条记录的耗时（分钟）：优先用显式填写的 duration_minutes，否则取与同一天上一条记录的
+# 时间间隔（LAG 窗口函数，在 SQLite 内一次算完）。当天第一条或间隔超过 :idle 分钟
+# （视为中间有空闲）时，按 :fallback 分钟估算。{filter} 为筛选条件：间隔仍按全部记录计算，
+# 只在最后挑出满足条件的记录。
+_DURATION_CTE = '''
+    WITH gaps AS (
+        SELECT id, project, duration_minutes,
+               (julianday(created_at)
+                - julianday(LAG(created_at) OVER (PARTITION BY date ORDER BY created_at, id))) * 1440 AS gap
+        FROM work_log
+        WHERE date BETWEEN :start AND :end
+    ),
+    durations AS (
+        SELECT id, project,
+               CASE
+                   WHEN duration_minutes IS NOT NULL THEN duration_minutes
+                   WHEN gap IS NULL OR gap > :idle THEN :fallback
+                   ELSE gap
+               END AS minutes
+        FROM gaps
+        {filter}
+    )
+'''
+
+
+# 记录内容（内联保存或按 content_id 引用 log_contents，见 db/contents.py）
+_CONTENT = content_sql()
+
+
+class LogQueries:
+    """只读查询，Database（写连接）和 ReadSession（只读快照）共用"""
+    
+    conn: sqlite3.Connection
+    _lock: threading.RLock
+    _depth = 0
+    attachments: Optional[AttachmentStore] = None
+    
+    def _take_events(self) -> list:
+        """只读查询不产生事件；Database 覆盖此方法"""
+        return []
+    
+    # 迭代查询每次从游标取出的行数（只在取数时持有锁）
+    ITER_BATCH_SIZE = 500
+    
+    # 耗时估算：两条记录间隔超过 IDLE_CUTOFF_MINUTES 视为中间有空闲，
+    # 这类记录和当天第一条记录按 DEFAULT_DURATION_MINUTES 计
+    IDLE_CUTOFF_MINUTES = 120
+    DEFAULT_DURATION_MINUTES = 30
+    
+    def _duration_params(self, start_date: str, end_date: str) -> Dict:
+        return {
+            'start': start_date,
+            'end': end_date,
+            'idle': self.IDLE_CUTOFF_MINUTES,
+            'fallback': self.DEFAULT_DURATION_MINUTES,
+        }
+    
+    @staticmethod
+    def _duration_sql(where: Optional[str] = None) -> str:
+        if not where:
+            return _DURATION_CTE.format(filter='')
+        return _DURATION_CTE.format(filter=f'WHERE id IN (SELECT id FROM work_log WHERE {where})')
+    
+    @staticmethod
+    def _range_sql(where: Optional[str] = None) -> str:
+        """日期范围条件（:start / :end），附加筛选条件（见 service/query.py）"""
+        return 'date BETWEEN :start AND :end' + (f' AND ({where})' if where else '')
+    
+    def _iter_rows(self, sql: str, params=()) -> Iterator[tuple]:
+        """逐批从游标读取并产出行，不一次性把结果集读入内存"""
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(self.ITER_BATCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    
+    def _iter_entries(self, sql: str, params=()) -> Iterator[LogEntry]:
+        """逐条产出 LogEntry（按批从游标读取）"""
+        split_cache = {}
+        for row in self._iter_rows(sql, params):
+            yield LogEntry.from_row(row, split_cache)
+    
+    def iter_today_logs(self) -> Iterator[LogEntry]:
+        """逐条产出今天的工作日志（最新的在前）"""
+        return self.iter_day_logs(datetime.now().strftime("%Y-%m-%d"))
+    
+    def iter_day_logs(self, day: str) -> Iterator[LogEntry]:
+        """逐条产出某一天的工作日志（最新的在前）"""
+        return self._iter_entries(f'''
+            SELECT id, date, {_CONTENT}, project, tags, created_at, duration_minutes
+            FROM work_log
+            WHERE date = ?
+            ORDER BY created_at DESC
+        ''', (day,))
+    
+    def iter_logs_by_date_range(self, start_date: str, end_date: str,
+                                where: Optional[str] = None, params: Optional[Dict] = None) -> Iterator[LogEntry]:
+        """逐条产出指定日期范围内的日志（按日期、时间排序）
+
+        where / params 为附加的筛选条件及其命名参数（见 service/query.py 的 CompiledQuery）。
+        """
+        return self._iter_entries(f'''
+            SELECT id, date, {_CONTENT}, project, tags, created_at, duration_minutes
+            FROM work_log
+            WHERE {self._range_sql(where)}
+            ORDER BY date, created_at
+        ''', {**(params or {}), 'start': start_date, 'end': end_date})
+    
+    def iter_logs_with_minutes(self, start_date: str, end_date: str, where: Optional[str] = None,
+                               params: Optional[Dict] = None) -> Iterator[Tuple[LogEntry, float]]:
+        """一次有序扫描逐条产出日期范围内的 (日志, 耗时分钟)，按日期、时间排序
+        
+        耗时与 get_entry_durations 的算法相同（间隔按天计算，跨多个周期扫描时结果不变），
+        供批量生成报告时在一遍扫描中同时得到记录和统计所需的数据。
+        """
+        sql = self._duration_sql(where) + f'''
+            SELECT w.id, w.date, {content_sql('w')}, w.project, w.tags, w.created_at, w.duration_minutes, d.minutes
+            FROM durations AS d
+            JOIN work_log AS w ON w.id = d.id
+            ORDER BY w.date, w.created_at
+        '''
+        split_cache = {}
+        for row in self._iter_rows(sql, {**(params or {}), **self._duration_params(start_date, end_date)}):
+            yield LogEntry.from_row(row[:7], split_cache), row[7]
+    
+    def iter_logs_where(self, where: str, params: Optional[Dict] = None,
+                        limit: Optional[int] = None) -> Iterator[LogEntry]:
+        """逐条产出满足筛选条件的日志（最新的在前）"""
+        return self._iter_entries(self._logs_where_sql(where), {**(params or {}), 'limit': limit or -1})
+    
+    @staticmethod
+    def _logs_where_sql(where: str) -> str:
+        # 先在子查询中排序、截取，只为返回的这一页取出（解压）内容
+        return f'''
+            SELECT id, date, {content_sql('page')}, project, tags, created_at, duration_minutes
+            FROM (
+                SELECT id, date, content, content_id, project, tags, created_at, duration_minutes
+                FROM work_log
+                WHERE {where}
+                ORDER BY date DESC, created_at DESC
+                LIMIT :limit
+            ) AS page
+            ORDER BY date DESC, created_at DESC
+        '''
+    
+    @_serialized
+    def explain_logs_where(self, where: str, params: Optional[Dict] = None) -> Tuple[str, List[str]]:
+        """返回筛选查询的 SQL 和 EXPLAIN QUERY PLAN 结果（按层级缩进）"""
+        sql = self._logs_where_sql(where)
+        rows = self.conn.execute('EXPLAIN QUERY PLAN ' + sql, {**(params or {}), 'limit': -1}).fetchall()
+        depth = {0: -1}
+        plan = []
+        for node_id, parent, _unused, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            plan.append('  ' * depth[node_id] + detail)
+        return sql, plan
+    
+    @_serialized
+    def has_table(self, name: str) -> bool:
+        """数据库中是否存在指定的表（含虚拟表）"""
+        row = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        return row is not None
+    
+    def get_today_logs(self) -> List[LogEntry]:
+        """获取今天的工作日志"""
+        return list(self.iter_today_logs())
+    
+    def get_logs_by_date_range(self, start_date: str, end_date: str,
+                               where: Optional[str] = None, params: Optional[Dict] = None) -> List[LogEntry]:
+        """获取指定日期范围内的日志"""
+        return list(self.iter_logs_by_date_range(start_date, end_date, where, params))
+    
+    @_serialized
+    def get_weekly_stats(self, start_date: str, end_date: str,
+                         where: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        """获取周统计信息（where / params 为附加的筛选条件）"""
+        cursor = self.conn.cursor()
+        range_sql = self._range_sql(where)
+        range_params = {**(params or {}), 'start': start_date, 'end': end_date}
+        
+        # 总记录数
+        cursor.execute(f'''
+            SELECT COUNT(*) as total_count
+            FROM work_log
+            WHERE {range_sql}
+        ''', range_params)
+        total_count = cursor.fetchone()[0]
+        
+        # 按项目统计
+        cursor.execute(f'''
+            SELECT project, COUNT(*) as count
+            FROM work_log
+            WHERE {range_sql} AND project IS NOT NULL
+            GROUP BY project
+            ORDER BY count DESC, project
+        ''', range_params)
+        project_stats = cursor.fetchall()
+        
+        # 获取所有项目列表
+        cursor.execute(f'''
+            SELECT DISTINCT project
+            FROM work_log
+            WHERE {range_sql} AND project IS NOT NULL
+            ORDER BY project
+        ''', range_params)
+        projects = [row[0] for row in cursor.fetchall()]
+        
+        # 按项目汇总耗时（显式耗时 + 估算耗时，一次查询完成）
+        cursor.execute(self._duration_sql(where) + '''
+            SELECT project, ROUND(SUM(minutes)) AS minutes
+            FROM durations
+            GROUP BY project
+            ORDER BY minutes DESC, project
+        ''', {**(params or {}), **self._duration_params(start_date, end_date)})
+        project_minutes = []
+        total_minutes = 0
+        for project, minutes in cursor.fetchall():
+            total_minutes += int(minutes)
+            if project is not None:
+                project_minutes.append((project, int(minutes)))
+        
+        return {
+            'total_count': total_count,
+            'project_stats': project_stats,
+            'projects': projects,
+            'total_minutes': total_minutes,
+            'project_minutes': project_minutes
+        }
+    
+    @_serialized
+    def get_entry_durations(self, start_date: str, end_date: str,
+                            where: Optional[str] = None, params: Optional[Dict] = None) -> Dict[int, int]:
+        """每条记录的耗时（分钟），显式填写的优先，否则按时间间隔估算"""
+        cursor = self.conn.cursor()
+        cursor.execute(self._duration_sql(where) + '''
+            SELECT id, ROUND(minutes) FROM durations
+        ''', {**(params or {}), **self._duration_params(start_date, end_date)})
+        return {row[0]: int(row[1]) for row in cursor.fetchall()}
+    
+    @_serialized
+    def get_all_projects(self) -> List[Dict]:
+        """获取所有项目（按热度排序）"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, name, created_at, usage_count, frecency, last_used_at
+            FROM projects
+            ORDER BY frecency DESC, name ASC
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_serialized
+    def get_top_projects(self, limit: int = 20) -> List[Dict]:
+        """获取热度最高的前 N 个项目（直接走 idx_projects_frecency 索引）"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, name, created_at, usage_count, frecency, last_used_at
+            FROM projects
+            ORDER BY frecency DESC, name ASC
+            LIMIT ?
+        ''', (limit,))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_serialized
+    def get_projects_from_history(self) -> List[str]:
+        """从历史日志中提取项目名（多项目组合会拆分为单个项目名）"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT DISTINCT project
+            FROM work_log
+            WHERE project IS NOT NULL AND project != ''
+        ''')
+        
+        names = set()
+        for row in cursor.fetchall():
+            for name in row[0].split(','):
+                if name.strip():
+                    names.add(name.strip())
+        return sorted(names)
+    
+    @_serialized
+    def get_all_tags(self) -> List[str]:
+        """获取历史日志中出现过的所有标签（已拆分、去重）"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT DISTINCT tags
+            FROM work_log
+            WHERE tags IS NOT NULL AND tags != ''
+        ''')
+
+        tags = set()
+        for row in cursor.fetchall():
+            for tag in row[0].split(','):
+                if tag.strip():
+                    tags.add(tag.strip())
+        return sorted(tags)
+    
+    @_serialized
+    def get_entry_history(self) -> List[Tuple[str, Optional[str], Optional[str], int]]:
+        """去重后的历史记录 (内容, 项目, 标签, 出现次数)，按最近一次出现的先后排序
+        
+        引用的内容按 content_id 分组，每组只取出（解压）一次。
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+            SELECT {_CONTENT}, project, tags, COUNT(*)
+            FROM work_log
+            GROUP BY content, content_id, project, tags
+            ORDER BY MAX(id)
+        ''')
+        return [tuple(row) for row in cursor.fetchall()]
+    
+    @_serialized
+    def get_daily_counts(self, start_date: str, end_date: str) -> Dict[str, int]:
+        """按天聚合记录数（走 idx_date 索引）"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT date, COUNT(*)
+            FROM work_log
+            WHERE date BETWEEN ? AND ?
+            GROUP BY date
+        ''', (start_date, end_date))
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    @_serialized
+    def get_analytics_columns(self) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """一次性读取统计所需的紧凑列：(儒略日序号, 项目, 标签)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT CAST(julianday(date) + 0.5 AS INTEGER), project, tags
+            FROM work_log
+            ORDER BY date
+        ''')
+        return cursor.fetchall()
+    
+    @_serialized
+    def get_max_log_id(self) -> int:
+        """当前最大的记录 ID（没有记录时为 0），用作增量任务的高水位"""
+        return self.conn.execute('SELECT MAX(id) FROM work_log').fetchone()[0] or 0
+    
+    @_serialized
+    def get_classifier_model(self) -> Tuple[Dict[str, int], Dict[str, int], List[Tuple[str, str, float]]]:
+        """读取项目归类模型的统计量：(n-gram 文档频率, 各项目记录数, [(项目, n-gram, 权重和)])"""
+        cursor = self.conn.cursor()
+        df = dict(cursor.execute('SELECT gram, df FROM classifier_grams').fetchall())
+        docs = dict(cursor.execute('SELECT project, docs FROM classifier_projects').fetchall())
+        weights = cursor.execute('SELECT project, gram, weight FROM classifier_weights').fetchall()
+        return df, docs, [tuple(row) for row in weights]
+    
+    @_serialized
+    def get_attachments(self, log_id: int) -> List[Attachment]:
+        """一条日志的附件（按添加顺序）"""
+        cursor = self.conn.execute('''
+            SELECT id, log_id, sha256, name, size, created_at
+            FROM attachments
+            WHERE log_id = ?
+            ORDER BY id
+        ''', (log_id,))
+        return [Attachment(*row) for row in cursor.fetchall()]
+    
+    @_serialized
+    def get_attachments_by_date_range(self, start_date: str, end_date: str,
+                                      where: Optional[str] = None,
+                                      params: Optional[Dict] = None) -> Dict[int, List[Attachment]]:
+        """日期范围内各条日志的附件 {log_id: [Attachment]}（只读引用，不读取文件内容）"""
+        cursor = self.conn.execute(f'''
+            SELECT a.id, a.log_id, a.sha256, a.name, a.size, a.created_at
+            FROM attachments AS a
+            WHERE a.log_id IN (SELECT id FROM work_log WHERE {self._range_sql(where)})
+            ORDER BY a.log_id, a.id
+        ''', {**(params or {}), 'start': start_date, 'end': end_date})
+        result: Dict[int, List[Attachment]] = {}
+        for row in cursor.fetchall():
+            result.setdefault(row[1], []).append(Attachment(*row))
+        return result
+    
+    @_serialized
+    def get_attachment_counts(self, start_date: str, end_date: str) -> Dict[int, int]:
+        """日期范围内有附件的日志及其附件数 {log_id: 数量}"""
+        cursor = self.conn.execute('''
+            SELECT log_id, COUNT(*)
+            FROM attachments
+            WHERE log_id IN (SELECT id FROM work_log WHERE date BETWEEN ? AND ?)
+            GROUP BY log_id
+        ''', (start_date, end_date))
+        return dict(cursor.fetchall())
+    
+    @_serialized
+    def get_attachment_hashes(self, prefix: str) -> Set[str]:
+        """以 prefix 开头、仍被引用的内容哈希（按分片查询，供垃圾回收使用）"""
+        cursor = self.conn.execute('''
+            SELECT DISTINCT sha256 FROM attachments WHERE sha256 >= ? AND sha256 < ?
+        ''', (prefix, prefix + 'g'))
+        return {row[0] for row in cursor.fetchall()}
+    
+    def iter_recent_contents(self) -> Iterator[str]:
+        """逐条产出记录内容（最新的在前，供训练压缩字典）"""
+        for row in self._iter_rows(f'SELECT {_CONTENT} FROM work_log ORDER BY id DESC'):
+            yield row[0]
+    
+    @_serialized
+    def get_content_dictionary_id(self) -> int:
+        """新内容压缩时使用的预置字典（最新训练的），还没有训练时为 NO_DICT"""
+        row = self.conn.execute('SELECT MAX(id) FROM log_content_dicts').fetchone()
+        return row[0] if row[0] is not None else NO_DICT
+    
+    @_serialized
+    def get_storage_stats(self) -> StorageStats:
+        """内容存储的统计（只读取长度，不解压）"""
+        cursor = self.conn.cursor()
+        rows, inline_rows, inline_bytes = cursor.execute('''
+            SELECT COUNT(*), COUNT(content), COALESCE(SUM(length(CAST(content AS BLOB))), 0)
+            FROM work_log
+        ''').fetchone()
+        interned_bytes = cursor.execute('''
+            SELECT COALESCE(SUM(c.size), 0)
+            FROM work_log AS w JOIN log_contents AS c ON c.id = w.content_id
+        ''').fetchone()[0]
+        contents, compressed, data_bytes = cursor.execute('''
+            SELECT COUNT(*), COUNT(dict_id), COALESCE(SUM(length(CAST(data AS BLOB))), 0)
+            FROM log_contents
+        ''').fetchone()
+        dict_bytes = cursor.execute('''
+            SELECT COALESCE(SUM(length(data)), 0) FROM log_content_dicts
+        ''').fetchone()[0]
+        mode = cursor.execute('SELECT value FROM meta WHERE key = ?', (STORAGE_MODE_KEY,)).fetchone()
+        return StorageStats(
+            mode=(mode[0] if mode else None) or 'normal',
+            rows=rows,
+            inline_rows=inline_rows,
+            interned_rows=rows - inline_rows,
+            contents=contents,
+            compressed=compressed,
+            text_bytes=inline_bytes + interned_bytes,
+            stored_bytes=inline_bytes + data_bytes + dict_bytes,
+        )
+    
+    @_serialized
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """读取 meta 表中的值"""
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row and row[0] is not None else default
+
+
+class ReadSession(LogQueries):
+    """在只读连接的快照事务中执行查询，供后台线程使用（见 Database.snapshot）"""
+    
+    def __init__(self, conn: sqlite3.Connection, attachments: Optional[AttachmentStore] = None):
+        self.conn = conn
+        self._lock = threading.RLock()
+        self.attachments = attachments
+
+
+class Database(LogQueries):
+    # 后台只读连接池大小
+    MAX_READERS = 4
+    # 存储方式转换时每批处理的记录数（每批一个短事务）
+    CONVERT_BATCH_SIZE = 500
+    
+    def __init__(self, db_path: str = None, migration_progress: Optional[ProgressCallback] = None):
+        """初始化数据库连接（migration_progress 用于接收结构迁移进度）"""
         if db_path is None:
             db_path = self._get_default_db_path()
         
         # 确保数据目录存在
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
         
         self.db_path = db_path
         self.conn = None
-        self._init_db()
+        self._lock = threading.RLock()
+        self._readers: Optional[ReaderPool] = None
+        
+        # 变更事件：写方法把事件暂存在 _pending_events，释放锁后统一发布
+        self.events = EventBus()
+        self._pending_events: list = []
+        self._data_version = 0
+        
+        # 附件文件存放在数据库所在目录的 attachments/ 下，数据库中只保存引用
+        self.attachments = AttachmentStore(os.path.join(os.path.dirname(db_path), 'attachments'))
+        
+        # 紧凑存储的内容编解码（读写连接都注册 SQL 函数 inflate_content）
+        self.codec = ContentCodec(self._load_content_dictionary)
+        
+        self._init_db(migration_progress)
+        self._data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
     
-    def _get_default_db_path(self) -> str:
-        """获取默认数据库路径"""
+    @staticmethod
+    def _get_default_db_path() -> str:
+        """获取默认数据库路径（环境变量 WORKTAG_DB_PATH 可以指定其他路径，如启动测量时）"""
+        override = os.environ.get('WORKTAG_DB_PATH')
+        if override:
+            return override
+        
         # 检查是否运行在PyInstaller打包的exe中
         if getattr(sys, 'frozen', False):
             # 如果是打包的exe，使用用户数据目录
@@ -41,10 +561,19 @@ class Database:
         
         return os.path.join(db_dir, 'worklog.db')
     
-    def _init_db(self):
-        """初始化数据库表"""
-        self.conn = sqlite3.connect(self.db_path)
+    def _init_db(self, migration_progress: Optional[ProgressCallback] = None):
+        """初始化数据库表，并执行未应用的结构迁移"""
+        # 唯一的写连接：允许后台线程在 writer() 中加锁使用
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        self._register_functions(self.conn)
+        
+        # 增量回收空闲页（只对新建的数据库立即生效，已有数据库由空闲维护任务 VACUUM 一次后生效）
+        self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        
+        # WAL 模式：后台只读连接和写连接互不阻塞
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
         
         cursor = self.conn.cursor()
         
@@ -70,98 +599,117 @@ class Database:
             )
         ''')
         
-        # 创建索引以提高查询性能
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_date ON work_log(date)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project ON work_log(project)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project_name ON projects(name)')
-        
         self.conn.commit()
-    
-    def add_log(self, content: str, project: Optional[str] = None, tags: Optional[str] = None):
-        """添加工作日志"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO work_log (date, content, project, tags, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (today, content, project, tags, now))
-        
-        self.conn.commit()
-        return cursor.lastrowid
+        # 索引和后续的结构变更由迁移统一维护（按 PRAGMA user_version 递增执行）
+        run_migrations(self.conn, migration_progress)
     
-    def get_today_logs(self) -> List[Dict]:
-        """获取今天的工作日志"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT id, date, content, project, tags, created_at
-            FROM work_log
-            WHERE date = ?
-            ORDER BY created_at DESC
-        ''', (today,))
-        
-        return [dict(row) for row in cursor.fetchall()]
+    def _register_functions(self, conn: sqlite3.Connection):
+        """注册自定义 SQL 函数（写连接和每个只读连接）"""
+        conn.create_function('inflate_content', 2, self.codec.decode, deterministic=True)
     
-    def get_logs_by_date_range(self, start_date: str, end_date: str) -> List[Dict]:
-        """获取指定日期范围内的日志"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT id, date, content, project, tags, created_at
-            FROM work_log
-            WHERE date BETWEEN ? AND ?
-            ORDER BY date, created_at
-        ''', (start_date, end_date))
-        
-        return [dict(row) for row in cursor.fetchall()]
+    def _load_content_dictionary(self, dict_id: int) -> Optional[bytes]:
+        """读取压缩字典（在解压函数中调用，使用单独的只读连接）"""
+        conn = sqlite3.connect(Path(self.db_path).resolve().as_uri() + '?mode=ro', uri=True)
+        try:
+            row = conn.execute('SELECT data FROM log_content_dicts WHERE id = ?', (dict_id,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
     
-    def get_weekly_stats(self, start_date: str, end_date: str) -> Dict:
-        """获取周统计信息"""
-        cursor = self.conn.cursor()
+    def _store_content(self, cursor: sqlite3.Cursor, content: str, compact: Optional[bool] = None
+                       ) -> Tuple[Optional[str], Optional[int]]:
+        """按存储方式决定写入 work_log 的 (content, content_id)
         
-        # 总记录数
-        cursor.execute('''
-            SELECT COUNT(*) as total_count
-            FROM work_log
-            WHERE date BETWEEN ? AND ?
-        ''', (start_date, end_date))
-        total_count = cursor.fetchone()[0]
+        紧凑存储时内容按哈希去重保存在 log_contents 中（新内容用最新的字典压缩）；
+        compact 为 None 时按 meta 中当前的存储方式。调用方持有连接锁并负责提交。
+        """
+        if compact is None:
+            row = cursor.execute('SELECT value FROM meta WHERE key = ?', (STORAGE_MODE_KEY,)).fetchone()
+            compact = bool(row) and row[0] == COMPACT_MODE
+        if not compact or not should_intern(content):
+            return content, None
         
-        # 按项目统计
+        # 查找和插入在同一个写事务中：找到的内容不会在写入引用之前被其他连接删除
+        if not self.conn.in_transaction:
+            cursor.execute('BEGIN IMMEDIATE')
+        digest = content_hash(content)
+        row = cursor.execute('SELECT id FROM log_contents WHERE hash = ?', (digest,)).fetchone()
+        if row:
+            return None, row[0]
+        dict_id, data = self.codec.encode(content, self.get_content_dictionary_id())
         cursor.execute('''
-            SELECT project, COUNT(*) as count
-            FROM work_log
-            WHERE date BETWEEN ? AND ? AND project IS NOT NULL
-            GROUP BY project
-            ORDER BY count DESC
-        ''', (start_date, end_date))
-        project_stats = cursor.fetchall()
+            INSERT INTO log_contents (hash, dict_id, size, data) VALUES (?, ?, ?, ?)
+        ''', (digest, dict_id, len(content.encode('utf-8')), data))
+        return None, cursor.lastrowid
+    
+    @_serialized
+    def add_log(self, content: str, project: Optional[str] = None, tags: Optional[str] = None,
+                duration: Optional[int] = None):
+        """添加工作日志（duration 为显式填写的耗时，单位分钟）"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # 获取所有项目列表
-        cursor.execute('''
-            SELECT DISTINCT project
-            FROM work_log
-            WHERE date BETWEEN ? AND ? AND project IS NOT NULL
-            ORDER BY project
-        ''', (start_date, end_date))
-        projects = [row[0] for row in cursor.fetchall()]
+        cursor = self.conn.cursor()
+        try:
+            stored, content_id = self._store_content(cursor, content)
+            cursor.execute('''
+                INSERT INTO work_log (date, content, content_id, project, tags, created_at, duration_minutes)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (today, stored, content_id, project, tags, now, duration))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
         
-        return {
-            'total_count': total_count,
-            'project_stats': project_stats,
-            'projects': projects
-        }
+        self._emit(LogAdded(LogEntry(cursor.lastrowid, today, content,
+                                     split_list(project), split_list(tags), now, duration)))
+        return cursor.lastrowid
     
+    @_serialized
     def delete_log(self, log_id: int) -> bool:
         """删除指定ID的日志"""
         cursor = self.conn.cursor()
+        row = cursor.execute('SELECT date FROM work_log WHERE id = ?', (log_id,)).fetchone()
         cursor.execute('DELETE FROM work_log WHERE id = ?', (log_id,))
         self.conn.commit()
+        if cursor.rowcount > 0:
+            self._emit(LogDeleted(log_id, row[0] if row else ''))
         return cursor.rowcount > 0
     
+    @_serialized
+    def import_commits(self, repo: str, entries: List[Tuple]) -> int:
+        """在一个事务中写入一批 git 提交，已导入过的提交（按哈希）跳过，返回新增记录数
+        
+        entries 中每项为 (提交哈希, 日期, 内容, 项目, 标签, 创建时间, 耗时)。
+        """
+        cursor = self.conn.cursor()
+        added = []
+        dates = set()
+        compact = self.get_meta(STORAGE_MODE_KEY) == COMPACT_MODE
+        try:
+            for sha, date, content, project, tags, created_at, duration in entries:
+                cursor.execute('INSERT OR IGNORE INTO imported_commits (sha, repo) VALUES (?, ?)', (sha, repo))
+                if cursor.rowcount == 0:
+                    continue
+                stored, content_id = self._store_content(cursor, content, compact)
+                cursor.execute('''
+                    INSERT INTO work_log (date, content, content_id, project, tags, created_at, duration_minutes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (date, stored, content_id, project, tags, created_at, duration))
+                cursor.execute('UPDATE imported_commits SET log_id = ? WHERE sha = ?', (cursor.lastrowid, sha))
+                added.append((project, tags, content))
+                dates.add(date)
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        if added:
+            self._emit(LogsImported(len(added), tuple(sorted(dates)), tuple(added)))
+        return len(added)
+    
     # 项目管理方法
+    @_serialized
     def add_project(self, name: str) -> bool:
         """添加项目"""
         try:
@@ -171,54 +719,338 @@ class Database:
                 VALUES (?)
             ''', (name,))
             self.conn.commit()
+            if cursor.rowcount > 0:
+                self._emit(ProjectsAdded((name,)))
             return cursor.rowcount > 0
         except:
             return False
     
-    def get_all_projects(self) -> List[Dict]:
-        """获取所有项目"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT id, name, created_at, usage_count
-            FROM projects
-            ORDER BY usage_count DESC, name ASC
-        ''')
-        return [dict(row) for row in cursor.fetchall()]
-    
+    @_serialized
     def delete_project(self, project_id: int) -> bool:
         """删除项目"""
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM projects WHERE id = ?', (project_id,))
         self.conn.commit()
+        if cursor.rowcount > 0:
+            self._emit(ProjectDeleted(project_id))
         return cursor.rowcount > 0
     
-    def increment_project_usage(self, name: str) -> bool:
-        """增加项目使用计数"""
-        try:
-            cursor = self.conn.cursor()
+    @_serialized
+    def record_project_usage(self, names: List[str]) -> int:
+        """记录一条日志对项目的一次使用（更新热度和使用次数），返回更新的项目数
+        
+        热度的更新是 O(1) 的：只读取并改写该项目自身的排序键，见 db/frecency.py。
+        """
+        now = datetime.now()
+        now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+        updated = []
+        
+        cursor = self.conn.cursor()
+        for name in dict.fromkeys(n.strip() for n in names if n and n.strip()):
+            row = cursor.execute('SELECT frecency FROM projects WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                continue
             cursor.execute('''
                 UPDATE projects 
-                SET usage_count = usage_count + 1 
+                SET frecency = ?, last_used_at = ?, usage_count = usage_count + 1 
                 WHERE name = ?
-            ''', (name,))
-            self.conn.commit()
-            return cursor.rowcount > 0
-        except:
-            return False
+            ''', (frecency.bump(row[0], now.timestamp()), now_str, name))
+            updated.append(name)
+        
+        self.conn.commit()
+        if updated:
+            self._emit(ProjectUsageChanged(tuple(updated)))
+        return len(updated)
     
-    def get_projects_from_history(self) -> List[str]:
-        """从历史日志中提取项目名"""
+    @_serialized
+    def import_projects_from_history(self) -> List[str]:
+        """增量导入历史日志中出现的项目，返回新导入的项目名
+        
+        以 work_log.id 作为高水位：只扫描上次导入之后新增的记录（主键范围查询），
+        拆分项目组合后一次性批量写入 projects，并为新项目补记这些记录的使用热度。
+        """
+        watermark = int(self.get_meta('project_import_watermark', '0'))
         cursor = self.conn.cursor()
+        
+        max_id = cursor.execute('SELECT MAX(id) FROM work_log').fetchone()[0]
+        if max_id is None or max_id <= watermark:
+            return []
+        
         cursor.execute('''
-            SELECT DISTINCT project
+            SELECT project, created_at
             FROM work_log
-            WHERE project IS NOT NULL AND project != ''
-            ORDER BY project
-        ''')
-        return [row[0] for row in cursor.fetchall()]
+            WHERE id > ? AND id <= ? AND project IS NOT NULL AND project != ''
+        ''', (watermark, max_id))
+        
+        # 项目名 -> (热度键, 使用次数, 最近使用时间)
+        uses: Dict[str, Tuple[float, int, str]] = {}
+        for project, created_at in cursor.fetchall():
+            try:
+                timestamp = datetime.strptime(str(created_at)[:19], "%Y-%m-%d %H:%M:%S").timestamp()
+            except ValueError:
+                timestamp = datetime.now().timestamp()
+            for name in project.split(','):
+                name = name.strip()
+                if name:
+                    key, count, last = uses.get(name, (0.0, 0, ''))
+                    uses[name] = (frecency.combine(key, frecency.use_key(timestamp)),
+                                  count + 1, max(last, str(created_at)))
+        
+        existing = set()
+        names = list(uses)
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor.execute(f'SELECT name FROM projects WHERE name IN ({placeholders})', chunk)
+            existing.update(row[0] for row in cursor.fetchall())
+        
+        # 已有项目的使用在添加记录时已经计入热度，这里只为新项目补记
+        new_names = [name for name in names if name not in existing]
+        cursor.executemany('''
+            INSERT OR IGNORE INTO projects (name, frecency, usage_count, last_used_at)
+            VALUES (?, ?, ?, ?)
+        ''', [(name, *uses[name]) for name in new_names])
+        cursor.execute('''
+            INSERT OR REPLACE INTO meta (key, value) VALUES ('project_import_watermark', ?)
+        ''', (str(max_id),))
+        
+        self.conn.commit()
+        if new_names:
+            self._emit(ProjectsAdded(tuple(new_names)))
+        return new_names
+    
+    @_serialized
+    def update_classifier_model(self, df: Dict[str, int], docs: Dict[str, int],
+                                weights: Dict[Tuple[str, str], float], watermark: int, reset: bool = False):
+        """在一个事务中把新记录的统计量累加进项目归类模型，并记录训练到的高水位
+    
+        reset 时先清空模型（全量重建）。
+        """
+        cursor = self.conn.cursor()
+        try:
+            if reset:
+                cursor.execute('DELETE FROM classifier_grams')
+                cursor.execute('DELETE FROM classifier_weights')
+                cursor.execute('DELETE FROM classifier_projects')
+            cursor.executemany('''
+                INSERT INTO classifier_grams (gram, df) VALUES (?, ?)
+                ON CONFLICT (gram) DO UPDATE SET df = df + excluded.df
+            ''', df.items())
+            cursor.executemany('''
+                INSERT INTO classifier_projects (project, docs) VALUES (?, ?)
+                ON CONFLICT (project) DO UPDATE SET docs = docs + excluded.docs
+            ''', docs.items())
+            cursor.executemany('''
+                INSERT INTO classifier_weights (project, gram, weight) VALUES (?, ?, ?)
+                ON CONFLICT (project, gram) DO UPDATE SET weight = weight + excluded.weight
+            ''', ((project, gram, weight) for (project, gram), weight in weights.items()))
+            cursor.execute('''
+                INSERT OR REPLACE INTO meta (key, value) VALUES ('classifier_watermark', ?)
+            ''', (str(watermark),))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+    
+    @_serialized
+    def assign_projects(self, assignments: Dict[int, str]) -> int:
+        """为未分类的记录批量设置项目（已有项目的记录不会被覆盖），返回更新的记录数"""
+        cursor = self.conn.cursor()
+        updated = []
+        dates = set()
+        try:
+            for log_id, project in assignments.items():
+                row = cursor.execute(f'SELECT date, tags, {_CONTENT} FROM work_log WHERE id = ? AND project IS NULL',
+                                     (log_id,)).fetchone()
+                if row is None:
+                    continue
+                cursor.execute('UPDATE work_log SET project = ? WHERE id = ?', (project, log_id))
+                updated.append((project, row[1], row[2]))
+                dates.add(row[0])
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        if updated:
+            self._emit(ProjectsAssigned(len(updated), tuple(sorted(dates)), tuple(updated)))
+        return len(updated)
+    
+    @_serialized
+    def add_content_dictionary(self, data: bytes, samples: int) -> int:
+        """保存新训练的压缩字典，返回字典 ID（之后新写入的内容使用它）"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO log_content_dicts (data, samples, created_at) VALUES (?, ?, ?)
+        ''', (data, samples, now))
+        self.conn.commit()
+        self.codec.add_dictionary(cursor.lastrowid, data)
+        return cursor.lastrowid
+    
+    @_serialized
+    def convert_contents(self, compact: bool, after_id: int = 0) -> Tuple[Optional[int], int]:
+        """把 ID 大于 after_id 的一批记录转换为紧凑存储（compact）或内联存储
+        
+        返回 (本批最后的记录 ID, 本批检查的记录数)；没有需要转换的记录时 ID 为 None。
+        太短的内容在紧凑存储中也保持内联（见 db/contents.py）。内容不变，不发布变更事件。
+        """
+        cursor = self.conn.cursor()
+        condition = 'content IS NOT NULL' if compact else 'content_id IS NOT NULL'
+        rows = cursor.execute(f'''
+            SELECT id, {_CONTENT} FROM work_log
+            WHERE id > ? AND {condition}
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, self.CONVERT_BATCH_SIZE)).fetchall()
+        if not rows:
+            return None, 0
+        
+        try:
+            for log_id, content in rows:
+                if compact:
+                    stored, content_id = self._store_content(cursor, content, True)
+                    if content_id is None:
+                        continue
+                else:
+                    stored, content_id = content, None
+                cursor.execute('UPDATE work_log SET content = ?, content_id = ? WHERE id = ?',
+                               (stored, content_id, log_id))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return rows[-1][0], len(rows)
+    
+    @_serialized
+    def recompress_contents(self, after_id: int = 0) -> Tuple[Optional[int], int]:
+        """用最新的字典重新压缩 ID 大于 after_id 的一批去重内容，返回 (本批最后的内容 ID, 处理数)"""
+        dict_id = self.get_content_dictionary_id()
+        cursor = self.conn.cursor()
+        rows = cursor.execute('''
+            SELECT id, inflate_content(dict_id, data) FROM log_contents
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, self.CONVERT_BATCH_SIZE)).fetchall()
+        if not rows:
+            return None, 0
+        
+        try:
+            cursor.executemany('UPDATE log_contents SET dict_id = ?, data = ? WHERE id = ?',
+                               [(*self.codec.encode(content, dict_id), content_id) for content_id, content in rows])
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return rows[-1][0], len(rows)
+    
+    def add_attachment(self, log_id: int, source: str, name: Optional[str] = None) -> Attachment:
+        """给日志添加附件：文件按块写入附件目录（不持有连接锁），再插入引用
+        
+        相同内容的文件只保存一份；name 默认取源文件名。
+        """
+        sha256, size = self.attachments.put_file(source)
+        return self._insert_attachment(log_id, sha256, name or os.path.basename(source), size)
+    
+    @_serialized
+    def _insert_attachment(self, log_id: int, sha256: str, name: str, size: int) -> Attachment:
+        cursor = self.conn.cursor()
+        row = cursor.execute('SELECT date FROM work_log WHERE id = ?', (log_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"记录不存在: {log_id}")
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.execute('''
+            INSERT INTO attachments (log_id, sha256, name, size, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (log_id, sha256, name, size, now))
+        self.conn.commit()
+        self._emit(AttachmentsChanged(log_id, row[0]))
+        return Attachment(cursor.lastrowid, log_id, sha256, name, size, now)
+    
+    @_serialized
+    def delete_attachment(self, attachment_id: int) -> bool:
+        """删除附件引用（没有其他引用的文件稍后由维护任务回收）"""
+        cursor = self.conn.cursor()
+        row = cursor.execute('''
+            SELECT a.log_id, w.date FROM attachments AS a LEFT JOIN work_log AS w ON w.id = a.log_id
+            WHERE a.id = ?
+        ''', (attachment_id,)).fetchone()
+        cursor.execute('DELETE FROM attachments WHERE id = ?', (attachment_id,))
+        self.conn.commit()
+        if cursor.rowcount > 0:
+            self._emit(AttachmentsChanged(row[0], row[1] or ''))
+        return cursor.rowcount > 0
+    
+    @_serialized
+    def set_meta(self, key: str, value: Optional[str]):
+        """写入 meta 表中的值"""
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+        self.conn.commit()
+    
+    @_serialized
+    def get_change_token(self) -> Tuple[int, int]:
+        """数据变更标记：本连接的累计修改数 + 其他连接提交后变化的 data_version"""
+        data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        return (self.conn.total_changes, data_version)
+    
+    def _emit(self, event):
+        """暂存事件（调用方持有连接锁），在最外层写方法返回前发布"""
+        self._pending_events.append(event)
+    
+    def _take_events(self) -> list:
+        events, self._pending_events = self._pending_events, []
+        return events
+    
+    @_serialized
+    def check_external_changes(self) -> bool:
+        """检查其他进程是否修改了数据库（PRAGMA data_version），有变化时发布 ExternalChange"""
+        version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        self._emit(ExternalChange(version))
+        return True
+    
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """独占写连接执行一个事务（供后台线程批量写入），异常时回滚"""
+        with self._lock:
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.rollback()
+                raise
+            else:
+                self.conn.commit()
+    
+    @property
+    def readers(self) -> ReaderPool:
+        """只读连接池（首次使用时创建）"""
+        with self._lock:
+            if self._readers is None:
+                self._readers = ReaderPool(self.db_path, self.MAX_READERS, self._register_functions)
+            return self._readers
+    
+    @contextmanager
+    def snapshot(self, timeout: Optional[float] = 10.0) -> Iterator[ReadSession]:
+        """借用只读连接，在一致快照中执行查询（可在任意线程使用）
+        
+        用法：
+            with db.snapshot() as view:
+                logs = view.get_logs_by_date_range(start, end)
+                stats = view.get_weekly_stats(start, end)
+        """
+        with self.readers.connection(timeout) as conn:
+            yield ReadSession(conn, self.attachments)
+    
+    def get_pool_stats(self) -> Dict[str, float]:
+        """只读连接池的等待时间与使用统计"""
+        return self.readers.stats()
     
     def close(self):
         """关闭数据库连接"""
+        if self._readers:
+            self._readers.close()
         if self.conn:
             self.conn.close()
     
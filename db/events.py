@@ -0,0 +1,101 @@
+import threading
+from typing import Callable, List, NamedTuple, Optional, Tuple, Type
+
+from db.models import LogEntry
+
+
+class LogAdded(NamedTuple):
+    """新增了一条日志"""
+    entry: LogEntry
+
+    @property
+    def date(self) -> str:
+        return self.entry.date
+
+
+class LogDeleted(NamedTuple):
+    """删除了一条日志"""
+    log_id: int
+    date: str
+
+
+class AttachmentsChanged(NamedTuple):
+    """日志的附件有增删"""
+    log_id: int
+    date: str
+
+
+class LogsImported(NamedTuple):
+    """批量导入了记录（如从 git 导入），订阅者应刷新受影响的日期
+
+    entries 为新增记录的 (项目, 标签, 内容)，可用于增量更新补全索引。
+    """
+    count: int
+    dates: Tuple[str, ...]
+    entries: Tuple[Tuple[Optional[str], Optional[str], str], ...] = ()
+
+
+class ProjectsAssigned(NamedTuple):
+    """批量为未分类的记录设置了项目（自动归类），订阅者应刷新受影响的日期
+
+    entries 为更新后记录的 (项目, 标签, 内容)。
+    """
+    count: int
+    dates: Tuple[str, ...]
+    entries: Tuple[Tuple[Optional[str], Optional[str], str], ...] = ()
+
+
+class ProjectUsageChanged(NamedTuple):
+    """项目的热度 / 使用次数变化（添加记录时）"""
+    names: Tuple[str, ...]
+
+
+class ProjectsAdded(NamedTuple):
+    """新增了项目（手动添加或从历史导入）"""
+    names: Tuple[str, ...]
+
+
+class ProjectDeleted(NamedTuple):
+    """删除了项目"""
+    project_id: int
+
+
+class ExternalChange(NamedTuple):
+    """其他进程修改了数据库（由 PRAGMA data_version 轮询发现），需要全量刷新"""
+    data_version: int
+
+
+Subscriber = Callable[[NamedTuple], None]
+
+
+class EventBus:
+    """数据库变更事件总线
+
+    Database 的写方法在提交后（释放连接锁之后）发布事件，订阅者在发布事件的
+    线程中被同步调用。需要在 GUI 线程处理的订阅者请通过 ui/events.py 的
+    QtEventBridge 转发。
+    """
+
+    def __init__(self):
+        self._subscribers: List[Tuple[Optional[Tuple[Type, ...]], Subscriber]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Subscriber, *event_types: Type) -> Callable[[], None]:
+        """订阅事件（不指定类型时接收全部事件），返回取消订阅的函数"""
+        item = (event_types or None, callback)
+        with self._lock:
+            self._subscribers = self._subscribers + [item]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s is not item]
+        return unsubscribe
+
+    def publish(self, event: NamedTuple):
+        # 订阅列表写时复制，发布时无需加锁
+        for event_types, callback in self._subscribers:
+            if event_types is None or isinstance(event, event_types):
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"处理数据库事件 {type(event).__name__} 失败: {e}")
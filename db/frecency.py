@@ -0,0 +1,44 @@
+import math
+import time
+from typing import Optional
+
+# 热度半衰期：7 天前的一次使用只相当于现在的半次
+HALF_LIFE_DAYS = 7.0
+_HALF_LIFE_SECONDS = HALF_LIFE_DAYS * 86400
+
+
+def _now_key(now: Optional[float] = None) -> float:
+    """当前时刻折算成“距纪元多少个半衰期”"""
+    return (time.time() if now is None else now) / _HALF_LIFE_SECONDS
+
+
+def use_key(timestamp: float, count: int = 1) -> float:
+    """在 timestamp 时刻发生 count 次使用所对应的排序键"""
+    return math.log2(count) + timestamp / _HALF_LIFE_SECONDS
+
+
+def combine(key_a: float, key_b: float) -> float:
+    """合并两个排序键（对数域求和，数值稳定）"""
+    if key_a <= 0:
+        return key_b
+    if key_b <= 0:
+        return key_a
+    high, low = max(key_a, key_b), min(key_a, key_b)
+    return high + math.log2(1.0 + 2.0 ** (low - high))
+
+
+def bump(key: float, now: Optional[float] = None) -> float:
+    """记录一次使用：O(1) 更新排序键
+
+    数据库中保存的不是随时间衰减的分数本身，而是 log2(分数) + 时间/半衰期。
+    这个值不随时间变化，因此可以直接建索引排序，排序结果与“当前衰减后的
+    分数”完全一致；每次使用只需把一个新的使用键合并进去。0 表示从未使用。
+    """
+    return combine(key, _now_key(now))
+
+
+def score(key: float, now: Optional[float] = None) -> float:
+    """把排序键还原成当前时刻的衰减分数（约等于“最近的有效使用次数”）"""
+    if key <= 0:
+        return 0.0
+    return 2.0 ** (key - _now_key(now))
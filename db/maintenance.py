@@ -0,0 +1,302 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# 每个维护步骤默认的时间预算（毫秒）；超时由 SQLite 进度回调中断
+STEP_BUDGET_MS = 200
+# 每次 incremental_vacuum 回收的页数
+VACUUM_PAGES_PER_BATCH = 64
+# 单张表 quick_check 的硬上限（在只读连接上执行，不阻塞写入，可以比预算宽松）
+CHECK_TABLE_LIMIT_MS = 2000
+# 空闲时一次性完整 VACUUM 的数据库大小上限；更大的数据库重写耗时太长，改为退出程序后手动执行
+# （python update_db_schema.py --vacuum）
+FULL_VACUUM_MAX_BYTES = 64 * 1024 * 1024
+# 完整 VACUUM 等待写锁的时间（秒）：程序正在写入时放弃，下次空闲再试
+FULL_VACUUM_BUSY_TIMEOUT = 0.1
+
+_META_PREFIX = 'maintenance:'
+_CHECK_CURSOR_KEY = 'maintenance_check_cursor'
+_GC_CURSOR_KEY = 'maintenance_attachments_cursor'
+
+
+class MaintenanceResult(NamedTuple):
+    """一次维护步骤的执行结果"""
+    step: str
+    elapsed_ms: float
+    detail: str
+    completed: bool = True
+
+    def __str__(self):
+        status = '' if self.completed else '（超时中止，下次继续）'
+        return f"{self.step}: {self.detail}，耗时 {self.elapsed_ms:.0f}ms{status}"
+
+
+class StepTimeout(Exception):
+    """维护步骤超出时间预算"""
+
+
+@contextmanager
+def _time_box(conn: sqlite3.Connection, deadline: float):
+    """超过 deadline 后通过进度回调中断正在执行的语句"""
+    conn.set_progress_handler(lambda: 1 if time.perf_counter() > deadline else 0, 1000)
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        if 'interrupt' in str(e):
+            raise StepTimeout()
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+def _optimize(db, deadline: float) -> str:
+    """更新查询规划器统计信息"""
+    with db.writer() as conn, _time_box(conn, deadline):
+        has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone()
+        # 限制每个索引的采样行数，让 ANALYZE 的耗时与数据量无关
+        conn.execute('PRAGMA analysis_limit = 400')
+        if has_stats:
+            conn.execute('PRAGMA optimize')
+            return 'PRAGMA optimize'
+        conn.execute('ANALYZE')
+        return 'ANALYZE（首次收集统计信息）'
+
+
+def _database_size(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA page_count').fetchone()[0] * conn.execute('PRAGMA page_size').fetchone()[0]
+
+
+def convert_auto_vacuum(db_path: str, busy_timeout: float = FULL_VACUUM_BUSY_TIMEOUT) -> Tuple[int, int]:
+    """完整 VACUUM 一次，让已有数据库的 auto_vacuum=INCREMENTAL 生效（迁移 v6 只记录了模式），
+    返回 VACUUM 前后的数据库大小（字节）
+
+    使用单独的连接，不占用 Database 写连接的锁：期间程序的写入得到 SQLITE_BUSY 后按
+    各自的超时重试，只读连接照常读取旧快照。取不到写锁时抛出 sqlite3.OperationalError。
+    """
+    conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None)
+    try:
+        before = _database_size(conn)
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+        after = _database_size(conn)
+        mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+    finally:
+        conn.close()
+    if mode != 2:
+        raise sqlite3.DatabaseError("VACUUM 后 auto_vacuum 仍未切换为 INCREMENTAL")
+    return before, after
+
+
+def _convert_auto_vacuum(db, deadline: float) -> str:
+    """空闲时执行一次完整 VACUUM（见 convert_auto_vacuum），转换完成后每次都直接跳过
+
+    VACUUM 会重写整个文件，中途中断就白做了，因此不受时间预算限制；
+    超过 FULL_VACUUM_MAX_BYTES 的数据库不在程序中执行。
+    """
+    with db.readers.connection() as conn:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return '已启用 auto_vacuum=INCREMENTAL，跳过'
+        size = _database_size(conn)
+    if size > FULL_VACUUM_MAX_BYTES:
+        return (f"数据库较大（{size / 1024 / 1024:.0f} MiB），跳过完整 VACUUM；"
+                f"请退出程序后运行 python update_db_schema.py --vacuum")
+    try:
+        before, after = convert_auto_vacuum(db.db_path)
+    except sqlite3.OperationalError as e:
+        if 'locked' in str(e) or 'busy' in str(e):
+            raise StepTimeout('数据库正在写入，下次空闲时重试')
+        raise
+    return f"完整 VACUUM，启用 auto_vacuum=INCREMENTAL（{before / 1024:.0f} KiB -> {after / 1024:.0f} KiB）"
+
+
+def _incremental_vacuum(db, deadline: float) -> str:
+    """分批回收空闲页"""
+    freed = 0
+    with db.writer() as conn:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            return '未启用 auto_vacuum=INCREMENTAL，跳过'
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        with _time_box(conn, deadline):
+            while free > 0 and time.perf_counter() < deadline:
+                conn.execute(f'PRAGMA incremental_vacuum({VACUUM_PAGES_PER_BATCH})').fetchall()
+                remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                freed += free - remaining
+                free = remaining
+    if free:
+        raise StepTimeout(f"回收 {freed} 页，剩余 {free} 页")
+    return f"回收 {freed} 页"
+
+
+def _checkpoint(db, deadline: float) -> str:
+    """把 WAL 写回主库；全部写回后截断 WAL 文件"""
+    with db.writer() as conn, _time_box(conn, deadline):
+        busy, log_frames, done = conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+        if log_frames <= 0:
+            return 'WAL 为空'
+        if busy == 0 and done == log_frames:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+            return f"写回 {done} 帧并截断 WAL"
+        return f"写回 {done}/{log_frames} 帧（有读者占用，未截断）"
+
+
+def _quick_check(db, deadline: float) -> str:
+    """逐表执行 quick_check，进度记录在 meta 中，多次空闲时分批完成一轮"""
+    last = db.get_meta(_CHECK_CURSOR_KEY, '')
+    checked: List[str] = []
+    skipped: List[str] = []
+    problems: List[str] = []
+
+    with db.readers.connection() as conn:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name > ? ORDER BY name", (last,)
+        )]
+        for table in tables:
+            if checked and time.perf_counter() > deadline:
+                break
+            table_deadline = time.perf_counter() + CHECK_TABLE_LIMIT_MS / 1000
+            checked.append(table)
+            try:
+                with _time_box(conn, table_deadline):
+                    rows = conn.execute(f'PRAGMA quick_check("{table}")').fetchall()
+            except StepTimeout:
+                # 单表过大时跳过，避免每次都卡在同一张表上
+                skipped.append(table)
+                continue
+            problems.extend(f"{table}: {row[0]}" for row in rows if row[0] != 'ok')
+
+    finished = len(checked) == len(tables)
+    db.set_meta(_CHECK_CURSOR_KEY, '' if finished else checked[-1])
+    if problems:
+        db.set_meta('maintenance_check_problems', json.dumps(problems, ensure_ascii=False))
+        raise sqlite3.DatabaseError("完整性检查发现问题：" + '；'.join(problems[:5]))
+
+    detail = f"检查 {len(checked)} 张表（{', '.join(checked) or '无'}）"
+    if skipped:
+        detail += f"，{', '.join(skipped)} 超时跳过"
+    if not finished:
+        raise StepTimeout(detail)
+    return detail + "，本轮完成"
+
+
+def _collect_attachments(db, deadline: float) -> str:
+    """删除没有任何引用的附件文件，按一级分片分批进行，进度记录在 meta 中
+
+    新写入或刚被复用的文件在宽限期内不会删除（见 db/attachments.py 的 GC_GRACE_SECONDS），
+    因此与正在添加附件的操作并发执行也是安全的。
+    """
+    store = db.attachments
+    last = db.get_meta(_GC_CURSOR_KEY, '')
+    removed = 0
+    freed = 0
+    shards = 0
+    finished = True
+
+    temp_removed = store.clean_temp()
+    for shard in store.iter_shards(last):
+        if shards and time.perf_counter() > deadline:
+            finished = False
+            break
+        referenced = db.get_attachment_hashes(shard)
+        for sha256, path in store.iter_shard_files(shard):
+            if sha256 in referenced:
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if store.remove_if_stale(path):
+                removed += 1
+                freed += size
+        try:
+            os.rmdir(os.path.join(store.root, shard))
+        except OSError:
+            pass
+        last = shard
+        shards += 1
+
+    db.set_meta(_GC_CURSOR_KEY, '' if finished else last)
+    detail = f"检查 {shards} 个分片，删除 {removed} 个无引用的附件（{freed / 1024:.0f} KiB）"
+    if temp_removed:
+        detail += f"、{temp_removed} 个临时文件"
+    if not finished:
+        raise StepTimeout(detail)
+    return detail + "，本轮完成"
+
+
+class MaintenanceStep(NamedTuple):
+    name: str
+    description: str
+    func: Callable
+    interval: float  # 两次执行的最短间隔（秒）
+
+
+STEPS: List[MaintenanceStep] = [
+    MaintenanceStep('checkpoint', 'WAL 检查点', _checkpoint, 10 * 60),
+    MaintenanceStep('optimize', '更新统计信息', _optimize, 24 * 3600),
+    MaintenanceStep('auto_vacuum', '启用增量 VACUUM', _convert_auto_vacuum, 24 * 3600),
+    MaintenanceStep('vacuum', '增量 VACUUM', _incremental_vacuum, 24 * 3600),
+    MaintenanceStep('quick_check', '完整性检查', _quick_check, 7 * 24 * 3600),
+    MaintenanceStep('attachments', '回收附件', _collect_attachments, 24 * 3600),
+]
+
+
+class MaintenanceRunner:
+    """数据库维护任务：决定哪些步骤到期，并在时间预算内执行
+
+    每个步骤上次执行的时间、耗时和结果保存在 meta 表（键 maintenance:<步骤名>），
+    未完成的步骤（超时中止）下次空闲时优先继续。
+    """
+
+    def __init__(self, db, budget_ms: int = STEP_BUDGET_MS):
+        self.db = db
+        self.budget_ms = budget_ms
+
+    def last_run(self, step: MaintenanceStep) -> Optional[Dict]:
+        value = self.db.get_meta(_META_PREFIX + step.name)
+        try:
+            return json.loads(value) if value else None
+        except ValueError:
+            return None
+
+    def due_steps(self, now: Optional[float] = None) -> List[MaintenanceStep]:
+        """到期（或上次未完成）的步骤，按 STEPS 中的顺序"""
+        now = now if now is not None else time.time()
+        due = []
+        for step in STEPS:
+            last = self.last_run(step)
+            if not last or not last.get('completed', True) or now - last.get('at', 0) >= step.interval:
+                due.append(step)
+        return due
+
+    def run_step(self, step: MaintenanceStep) -> MaintenanceResult:
+        """在时间预算内执行一个步骤并记录结果（可在后台线程调用）"""
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000
+        completed = True
+        try:
+            detail = step.func(self.db, deadline)
+        except StepTimeout as e:
+            detail = str(e) or '超出时间预算'
+            completed = False
+        result = MaintenanceResult(step.description, (time.perf_counter() - start) * 1000, detail, completed)
+
+        self.db.set_meta(_META_PREFIX + step.name, json.dumps({
+            'at': time.time(),
+            'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'elapsed_ms': round(result.elapsed_ms, 1),
+            'detail': detail,
+            'completed': completed,
+        }, ensure_ascii=False))
+        return result
+
+    def run_next(self) -> Optional[MaintenanceResult]:
+        """执行下一个到期的步骤；没有到期步骤时返回 None"""
+        due = self.due_steps()
+        return self.run_step(due[0]) if due else None
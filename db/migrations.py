@@ -0,0 +1,509 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from db import frecency
+
+# 进度回调：(描述, 已完成数量, 总数量)
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class Migration:
+    """一次结构迁移：版本号对应 PRAGMA user_version"""
+
+    def __init__(self, version: int, description: str, func: Callable[['MigrationContext'], None]):
+        self.version = version
+        self.description = description
+        self.func = func
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """注册迁移的装饰器（版本号必须递增且不能复用）"""
+    def decorator(func):
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+
+class MigrationContext:
+    """迁移执行上下文，提供短事务和分批搬移数据的工具方法"""
+
+    # 每批搬移的行数：保证每次写锁只持有几毫秒
+    CHUNK_SIZE = 2000
+
+    def __init__(self, conn: sqlite3.Connection, description: str, progress: Optional[ProgressCallback] = None):
+        self.conn = conn
+        self.description = description
+        self.progress = progress
+
+    @contextmanager
+    def transaction(self):
+        """短写事务（BEGIN IMMEDIATE，出错时回滚）"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        else:
+            self.conn.execute('COMMIT')
+
+    def report(self, done: int, total: int):
+        if self.progress:
+            self.progress(self.description, done, total)
+
+    def table_sql(self, table: str) -> str:
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        return row[0] if row else ''
+
+    def columns(self, table: str) -> List[str]:
+        return [row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')]
+
+    def add_column(self, table: str, column: str, definition: str):
+        """ALTER TABLE ADD COLUMN（列已存在时跳过，便于中断后重跑）"""
+        if column not in self.columns(table):
+            with self.transaction():
+                self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+    def rebuild_table(self, table: str, create_sql: str, columns: Sequence[str], indexes: Sequence[str] = (),
+                      on_replaced: Optional[Callable[[sqlite3.Connection], None]] = None):
+        """按新结构重建表：新表 + 同步触发器 + 分批搬移，最后原子替换
+
+        - 搬移期间旧表的增删改由触发器实时同步到新表，业务可以照常读写；
+        - 每批数据在独立的短事务中提交，进度记录在 _migration_state 中，
+          进程中断后下次启动会从上次的位置继续；
+        - 只有最后的删表/改名/建索引需要一次很短的写事务；旧表上的触发器随旧表删除，
+          需要保留的由 on_replaced 在同一个事务中重新创建。
+        """
+        new_table = f'{table}__new'
+        cols = ', '.join(columns)
+        new_values = ', '.join(f'NEW.{c}' for c in columns)
+
+        with self.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS _migration_state (
+                    name TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL
+                )
+            ''')
+            conn.execute(create_sql.replace(f'CREATE TABLE {table}', f'CREATE TABLE IF NOT EXISTS {new_table}', 1))
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {new_table}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT OR REPLACE INTO {new_table} ({cols}) VALUES ({new_values});
+                END
+            ''')
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {new_table}_au AFTER UPDATE ON {table} BEGIN
+                    DELETE FROM {new_table} WHERE id = OLD.id;
+                    INSERT OR REPLACE INTO {new_table} ({cols}) VALUES ({new_values});
+                END
+            ''')
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {new_table}_ad AFTER DELETE ON {table} BEGIN
+                    DELETE FROM {new_table} WHERE id = OLD.id;
+                END
+            ''')
+            conn.execute('INSERT OR IGNORE INTO _migration_state (name, last_id) VALUES (?, 0)', (table,))
+
+        last_id = self.conn.execute('SELECT last_id FROM _migration_state WHERE name = ?', (table,)).fetchone()[0]
+        total = self.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        done = self.conn.execute(f'SELECT COUNT(*) FROM {table} WHERE id <= ?', (last_id,)).fetchone()[0]
+        self.report(done, total)
+
+        while True:
+            with self.transaction() as conn:
+                # 已被触发器同步过的行更新，INSERT OR IGNORE 保留触发器写入的版本
+                rows = conn.execute(f'''
+                    SELECT {cols} FROM {table}
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_id, self.CHUNK_SIZE)).fetchall()
+                if rows:
+                    placeholders = ', '.join('?' for _ in columns)
+                    conn.executemany(
+                        f'INSERT OR IGNORE INTO {new_table} ({cols}) VALUES ({placeholders})',
+                        [tuple(row) for row in rows]
+                    )
+                    last_id = rows[-1][0]
+                    conn.execute('UPDATE _migration_state SET last_id = ? WHERE name = ?', (last_id, table))
+
+            if not rows:
+                break
+            done += len(rows)
+            self.report(min(done, total), total)
+
+        with self.transaction() as conn:
+            # 保留 AUTOINCREMENT 序列，避免已删除的 id 被复用
+            seq = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+            if seq:
+                conn.execute('DELETE FROM sqlite_sequence WHERE name = ?', (new_table,))
+                conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (new_table, seq[0]))
+
+            for suffix in ('ai', 'au', 'ad'):
+                conn.execute(f'DROP TRIGGER IF EXISTS {new_table}_{suffix}')
+            conn.execute(f'DROP TABLE {table}')
+            conn.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+            for index_sql in indexes:
+                conn.execute(index_sql)
+            if on_replaced:
+                on_replaced(conn)
+            conn.execute('DELETE FROM _migration_state WHERE name = ?', (table,))
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def run_migrations(conn: sqlite3.Connection, progress: Optional[ProgressCallback] = None) -> int:
+    """执行所有未应用的迁移，返回迁移后的结构版本"""
+    current = get_schema_version(conn)
+    pending = [m for m in MIGRATIONS if m.version > current]
+    if not pending:
+        return current
+
+    # 迁移自行管理事务，期间切换为自动提交模式
+    isolation_level = conn.isolation_level
+    conn.commit()
+    conn.isolation_level = None
+    try:
+        for m in pending:
+            m.func(MigrationContext(conn, m.description, progress))
+            # user_version 不能在事务外回滚，放在每个迁移成功之后单独设置
+            conn.execute(f'PRAGMA user_version = {int(m.version)}')
+            current = m.version
+    finally:
+        conn.isolation_level = isolation_level
+
+    return current
+
+
+WORK_LOG_SQL = '''CREATE TABLE work_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    content TEXT NOT NULL,
+    project TEXT,
+    tags TEXT,
+    created_at TIMESTAMP
+)'''
+
+WORK_LOG_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_date ON work_log(date)',
+    'CREATE INDEX IF NOT EXISTS idx_project ON work_log(project)',
+)
+
+PROJECTS_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_project_name ON projects(name)',
+)
+
+
+@migration(1, '移除 work_log.created_at 的 DEFAULT CURRENT_TIMESTAMP（改为写入本地时间）')
+def _drop_created_at_default(ctx: MigrationContext):
+    if 'DEFAULT CURRENT_TIMESTAMP' in ctx.table_sql('work_log').upper():
+        ctx.rebuild_table(
+            'work_log', WORK_LOG_SQL,
+            ['id', 'date', 'content', 'project', 'tags', 'created_at'],
+            WORK_LOG_INDEXES
+        )
+
+
+@migration(2, '补齐 work_log 和 projects 的索引')
+def _ensure_indexes(ctx: MigrationContext):
+    with ctx.transaction() as conn:
+        for index_sql in WORK_LOG_INDEXES + PROJECTS_INDEXES:
+            conn.execute(index_sql)
+
+
+def _parse_timestamp(value: Optional[str], fallback_date: str) -> float:
+    """解析 created_at（本地时间字符串），无法解析时取当天中午"""
+    for text, fmt in ((value, '%Y-%m-%d %H:%M:%S'), (f'{fallback_date} 12:00:00', '%Y-%m-%d %H:%M:%S')):
+        try:
+            return datetime.strptime(str(text)[:19], fmt).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return datetime.now().timestamp()
+
+
+@migration(3, '项目排序改为按时间衰减的热度（frecency），并按历史记录重算使用次数')
+def _add_project_frecency(ctx: MigrationContext):
+    ctx.add_column('projects', 'frecency', 'REAL NOT NULL DEFAULT 0')
+    ctx.add_column('projects', 'last_used_at', 'TIMESTAMP')
+
+    # 按 (项目组合, 日期) 聚合后重放历史，得到与逐条记录使用完全一致的热度
+    keys: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    last_used: Dict[str, str] = {}
+    rows = ctx.conn.execute('''
+        SELECT project, date, COUNT(*), MAX(created_at)
+        FROM work_log
+        WHERE project IS NOT NULL AND project != ''
+        GROUP BY project, date
+    ''').fetchall()
+    for combo, day, count, last in rows:
+        key = frecency.use_key(_parse_timestamp(last, day), count)
+        for name in combo.split(','):
+            name = name.strip()
+            if name:
+                keys[name] = frecency.combine(keys.get(name, 0.0), key)
+                counts[name] = counts.get(name, 0) + count
+                if last and str(last) > last_used.get(name, ''):
+                    last_used[name] = str(last)
+
+    with ctx.transaction() as conn:
+        conn.executemany('''
+            UPDATE projects
+            SET frecency = ?, last_used_at = ?, usage_count = ?
+            WHERE name = ?
+        ''', [(keys[name], last_used.get(name), counts[name], name) for name in keys])
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_projects_frecency ON projects(frecency DESC, name)')
+
+
+@migration(4, '新增 meta 键值表（记录增量任务的进度等元数据）')
+def _add_meta_table(ctx: MigrationContext):
+    with ctx.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+
+
+@migration(5, '新增 work_log.duration_minutes（输入中显式填写的耗时）')
+def _add_duration_column(ctx: MigrationContext):
+    ctx.add_column('work_log', 'duration_minutes', 'INTEGER')
+
+
+@migration(6, '启用增量 VACUUM（auto_vacuum=INCREMENTAL），空闲时由维护任务回收空闲页')
+def _enable_incremental_vacuum(ctx: MigrationContext):
+    # 只记录模式：已有数据库需要一次完整 VACUUM 才能生效，它会重写整个文件并长时间持有
+    # 排他锁，不能放在启动时执行，由空闲维护任务执行一次（见 db/maintenance.py）
+    ctx.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+
+
+def _split_values_sql(column: str) -> str:
+    """把 'a, b' 这样的逗号分隔列展开成 json_each 行（可用于触发器，触发器中不能使用 CTE）"""
+    array = (f"'[\"' || replace(replace(replace({column}, '\\', '\\\\'), '\"', '\\\"'), ',', '\",\"') || '\"]'")
+    return f"json_each(CASE WHEN json_valid({array}) THEN {array} ELSE '[]' END)"
+
+
+# 项目 / 标签关联表：log_projects(name, log_id)、log_tags(tag, log_id)，由触发器与 work_log 保持同步
+LINK_TABLES = (
+    ('log_projects', 'name', 'project'),
+    ('log_tags', 'tag', 'tags'),
+)
+
+
+def create_link_triggers(conn: sqlite3.Connection):
+    """创建关联表的同步触发器（重建 work_log 后需要重新创建）"""
+    for table, key, column in LINK_TABLES:
+        insert_links = f'''
+            INSERT OR IGNORE INTO {table} ({key}, log_id)
+            SELECT trim(value), NEW.id FROM {_split_values_sql(f'NEW.{column}')}
+            WHERE NEW.{column} IS NOT NULL AND trim(value) != '';
+        '''
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON work_log BEGIN
+                {insert_links}
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {column} ON work_log BEGIN
+                DELETE FROM {table} WHERE log_id = OLD.id;
+                {insert_links}
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON work_log BEGIN
+                DELETE FROM {table} WHERE log_id = OLD.id;
+            END
+        ''')
+
+
+@migration(7, '新增项目/标签关联表（log_projects、log_tags），用于按项目和标签走索引筛选')
+def _add_link_tables(ctx: MigrationContext):
+    with ctx.transaction() as conn:
+        for table, key, _column in LINK_TABLES:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key} TEXT NOT NULL COLLATE NOCASE,
+                    log_id INTEGER NOT NULL,
+                    PRIMARY KEY ({key}, log_id)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_log_id ON {table}(log_id)')
+        # 先建触发器：回填期间新增的记录由触发器处理，回填用 INSERT OR IGNORE 不会重复
+        create_link_triggers(conn)
+
+    # 按主键范围分批回填历史记录
+    total = ctx.conn.execute('SELECT COUNT(*) FROM work_log').fetchone()[0]
+    last_id = 0
+    done = 0
+    ctx.report(0, total)
+    while True:
+        with ctx.transaction() as conn:
+            row = conn.execute('''
+                SELECT MAX(id), COUNT(*) FROM (
+                    SELECT id FROM work_log WHERE id > ? ORDER BY id LIMIT ?
+                )
+            ''', (last_id, ctx.CHUNK_SIZE)).fetchone()
+            if not row[1]:
+                break
+            for table, key, column in LINK_TABLES:
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO {table} ({key}, log_id)
+                    SELECT trim(value), w.id FROM work_log AS w, {_split_values_sql(f'w.{column}')}
+                    WHERE w.id > ? AND w.id <= ? AND w.{column} IS NOT NULL AND trim(value) != ''
+                ''', (last_id, row[0]))
+            last_id = row[0]
+        done += row[1]
+        ctx.report(min(done, total), total)
+
+
+def create_attachment_triggers(conn: sqlite3.Connection):
+    """删除日志时一并删除其附件引用（文件本身由维护任务回收；重建 work_log 后需要重新创建）"""
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS attachments_ad AFTER DELETE ON work_log BEGIN
+            DELETE FROM attachments WHERE log_id = OLD.id;
+        END
+    ''')
+
+
+@migration(8, '新增附件引用表 attachments（文件按内容哈希存放在数据库目录的 attachments/ 下）')
+def _add_attachments(ctx: MigrationContext):
+    with ctx.transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS attachments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                log_id INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at TIMESTAMP
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_attachments_log_id ON attachments(log_id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_attachments_sha256 ON attachments(sha256)')
+        create_attachment_triggers(conn)
+
+
+@migration(9, '新增 imported_commits（从 git 导入的提交，按提交哈希去重）')
+def _add_imported_commits(ctx: MigrationContext):
+    with ctx.transaction() as conn:
+        # 记录删除后保留这里的哈希，重新导入时不会再次出现
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS imported_commits (
+                sha TEXT PRIMARY KEY,
+                repo TEXT NOT NULL,
+                log_id INTEGER
+            ) WITHOUT ROWID
+        ''')
+
+
+@migration(10, '新增项目自动归类模型表（classifier_*，按项目累计的字符 n-gram 统计量，可增量更新）')
+def _add_classifier_tables(ctx: MigrationContext):
+    with ctx.transaction() as conn:
+        # 每个 n-gram 出现在多少条已归类记录中（文档频率）
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS classifier_grams (
+                gram TEXT PRIMARY KEY,
+                df INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        # 每个项目下各记录归一化词频向量之和（质心 = 该和 × idf 后归一化）
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS classifier_weights (
+                project TEXT NOT NULL,
+                gram TEXT NOT NULL,
+                weight REAL NOT NULL,
+                PRIMARY KEY (project, gram)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS classifier_projects (
+                project TEXT PRIMARY KEY,
+                docs INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+
+
+WORK_LOG_COMPACT_SQL = '''CREATE TABLE work_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    content TEXT,
+    project TEXT,
+    tags TEXT,
+    created_at TIMESTAMP,
+    duration_minutes INTEGER,
+    content_id INTEGER,
+    CHECK (content IS NOT NULL OR content_id IS NOT NULL)
+)'''
+
+
+def create_content_triggers(conn: sqlite3.Connection):
+    """记录删除或不再引用某条内容后，删除没有其他引用的内容（重建 work_log 后需要重新创建）"""
+    delete_orphan = '''
+        DELETE FROM log_contents WHERE id = OLD.content_id
+            AND NOT EXISTS (SELECT 1 FROM work_log WHERE content_id = OLD.content_id);
+    '''
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS log_contents_ad AFTER DELETE ON work_log
+        WHEN OLD.content_id IS NOT NULL BEGIN
+            {delete_orphan}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS log_contents_au AFTER UPDATE OF content_id ON work_log
+        WHEN OLD.content_id IS NOT NULL AND OLD.content_id IS NOT NEW.content_id BEGIN
+            {delete_orphan}
+        END
+    ''')
+
+
+def _recreate_work_log_triggers(conn: sqlite3.Connection):
+    create_link_triggers(conn)
+    create_attachment_triggers(conn)
+    create_content_triggers(conn)
+
+
+@migration(11, '新增内容去重表 log_contents 和压缩字典表 log_content_dicts（紧凑存储），work_log.content 改为可空')
+def _add_content_tables(ctx: MigrationContext):
+    with ctx.transaction() as conn:
+        # 相同内容只保存一份（按哈希查找）；dict_id 为 NULL 时 data 为原文，否则为压缩数据
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS log_contents (
+                id INTEGER PRIMARY KEY,
+                hash BLOB NOT NULL UNIQUE,
+                dict_id INTEGER,
+                size INTEGER NOT NULL,
+                data NOT NULL
+            )
+        ''')
+        # 从历史记录训练的 deflate 预置字典（写入后不再修改）
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS log_content_dicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data BLOB NOT NULL,
+                samples INTEGER NOT NULL,
+                created_at TIMESTAMP
+            )
+        ''')
+
+    if 'content_id' not in ctx.columns('work_log'):
+        ctx.rebuild_table(
+            'work_log', WORK_LOG_COMPACT_SQL,
+            ['id', 'date', 'content', 'project', 'tags', 'created_at', 'duration_minutes'],
+            WORK_LOG_INDEXES + ('CREATE INDEX IF NOT EXISTS idx_work_log_content_id ON work_log(content_id)',),
+            _recreate_work_log_triggers,
+        )
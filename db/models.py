@@ -0,0 +1,93 @@
+from typing import Dict, NamedTuple, Optional, Tuple
+
+
+def split_list(value: Optional[str]) -> Tuple[str, ...]:
+    """把 'Unity, Ads' 这样的逗号分隔字符串拆成 ('Unity', 'Ads')"""
+    if not value:
+        return ()
+    return tuple(part.strip() for part in value.split(',') if part.strip())
+
+
+class LogEntry:
+    """一条工作日志
+
+    projects / tags 在读出时拆分一次，之后直接使用元组，不再反复 split。
+    duration 为输入中显式填写的耗时（分钟），没有填写时为 None。
+    使用 __slots__，大范围查询时比每行一个 dict 占用更少内存。
+    """
+
+    __slots__ = ('id', 'date', 'content', 'projects', 'tags', 'created_at', 'duration')
+
+    def __init__(self, id: int, date: str, content: str,
+                 projects: Tuple[str, ...] = (), tags: Tuple[str, ...] = (),
+                 created_at: Optional[str] = None, duration: Optional[int] = None):
+        self.id = id
+        self.date = date
+        self.content = content
+        self.projects = projects
+        self.tags = tags
+        self.created_at = created_at
+        self.duration = duration
+
+    @classmethod
+    def from_row(cls, row, split_cache: Optional[Dict[str, Tuple[str, ...]]] = None) -> 'LogEntry':
+        """从 (id, date, content, project, tags, created_at, duration_minutes) 行构造
+
+        split_cache 用于在一次查询中复用相同的拆分结果（同一项目组合只拆一次）。
+        """
+        id_, date, content, project, tags, created_at, duration = row
+        if split_cache is None:
+            return cls(id_, date, content, split_list(project), split_list(tags), created_at, duration)
+
+        projects = split_cache.get(project) if project else ()
+        if projects is None:
+            projects = split_cache[project] = split_list(project)
+        tag_list = split_cache.get(tags) if tags else ()
+        if tag_list is None:
+            tag_list = split_cache[tags] = split_list(tags)
+        return cls(id_, date, content, projects, tag_list, created_at, duration)
+
+    @property
+    def project(self) -> Optional[str]:
+        """与数据库中存储格式一致的项目字符串（多个项目用 ', ' 连接）"""
+        return ', '.join(self.projects) if self.projects else None
+
+    @property
+    def time(self) -> str:
+        """记录时间 HH:MM"""
+        created_at = self.created_at
+        if not created_at:
+            return ''
+        if isinstance(created_at, str):
+            return created_at.split()[1][:5] if ' ' in created_at else ''
+        return created_at.strftime("%H:%M")
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'date': self.date,
+            'content': self.content,
+            'project': self.project,
+            'tags': ', '.join(self.tags) if self.tags else None,
+            'created_at': self.created_at,
+            'duration': self.duration,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, LogEntry):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return (f"LogEntry(id={self.id!r}, date={self.date!r}, content={self.content!r}, "
+                f"projects={self.projects!r}, tags={self.tags!r})")
+
+
+class Attachment(NamedTuple):
+    """日志的一个附件引用（文件内容在 AttachmentStore 中，按 sha256 寻址）"""
+    id: int
+    log_id: int
+    sha256: str
+    name: str
+    size: int
+    created_at: Optional[str] = None
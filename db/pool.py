@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from queue import LifoQueue, Empty
+from typing import Callable, Dict, Iterator, Optional
+
+
+class PoolTimeout(Exception):
+    """在等待时间内没有借到只读连接"""
+
+
+class ReaderPool:
+    """只读连接池
+
+    写操作统一走 Database 持有的唯一写连接；后台线程（报表、搜索、导出等）
+    从这里借用只读连接。数据库处于 WAL 模式，读写互不阻塞。每次借用都在
+    一个读事务中执行，整个借用期间看到的是同一个一致快照。
+    on_connect 在每个新建的连接上调用一次（注册自定义 SQL 函数等）。
+    """
+
+    def __init__(self, db_path: str, max_readers: int = 4,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+        self.max_readers = max_readers
+        self.on_connect = on_connect
+
+        self._idle: LifoQueue = LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+        # 统计信息（用于确定连接池大小）
+        self._borrows = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._total_hold = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def _acquire(self, timeout: Optional[float]) -> sqlite3.Connection:
+        start = time.perf_counter()
+
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            conn = None
+            with self._lock:
+                if self._closed:
+                    raise PoolTimeout("连接池已关闭")
+                if self._created < self.max_readers:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=timeout)
+                except Empty:
+                    raise PoolTimeout(f"等待只读连接超时（{timeout} 秒）")
+                with self._lock:
+                    self._waits += 1
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._borrows += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection, held: float):
+        with self._lock:
+            self._in_use -= 1
+            self._total_hold += held
+            closed = self._closed
+        if closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = 10.0) -> Iterator[sqlite3.Connection]:
+        """借用一个只读连接，并在快照读事务中使用"""
+        conn = self._acquire(timeout)
+        start = time.perf_counter()
+        try:
+            conn.execute('BEGIN')
+            # 立即读取一次，确定本次借用的快照
+            conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    conn.execute('COMMIT')
+            except sqlite3.Error:
+                # 连接异常时丢弃，不放回池中
+                conn.close()
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+            else:
+                self._release(conn, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, float]:
+        """连接池使用统计：借用次数、等待次数、等待时间（毫秒）、并发峰值等"""
+        with self._lock:
+            borrows = self._borrows
+            return {
+                'max_readers': self.max_readers,
+                'created': self._created,
+                'in_use': self._in_use,
+                'peak_in_use': self._peak_in_use,
+                'borrows': borrows,
+                'waits': self._waits,
+                'avg_wait_ms': self._total_wait * 1000 / borrows if borrows else 0.0,
+                'max_wait_ms': self._max_wait * 1000,
+                'avg_hold_ms': self._total_hold * 1000 / borrows if borrows else 0.0,
+            }
+
+    def close(self):
+        """关闭所有空闲连接；借出中的连接在归还时关闭"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
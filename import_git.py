@@ -0,0 +1,54 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db.database import Database
+from service.git_import import GitImporter, MAX_WORKERS
+
+
+def print_progress(percent: int, project: str):
+    print(f"\r导入中 {percent:3d}%  [{project}]", end="", flush=True)
+
+
+def import_git(paths, db_path: str = None, project: str = None, author: str = None,
+               workers: int = MAX_WORKERS):
+    """把本地 git 仓库的提交导入为工作记录
+
+    paths 中的目录（及其下一级子目录中的仓库）会被记住，之后不带参数运行即可增量同步；
+    数据库路径与程序保持一致（开发环境为 data/worklog.db，打包环境为用户数据目录）。
+    """
+    db_path = os.path.abspath(db_path) if db_path else Database._get_default_db_path()
+
+    with Database(db_path) as db:
+        importer = GitImporter(db, author, workers)
+        if paths:
+            added = importer.add_repositories(paths, project)
+            for repo, name in added.items():
+                print(f"添加仓库 [{name}] {repo}")
+
+        repos = importer.get_repositories()
+        if not repos:
+            print("还没有添加 git 仓库，请在参数中指定仓库目录")
+            return
+
+        results = importer.run(repos, progress=print_progress)
+        print()
+        for result in sorted(results, key=lambda r: r.project):
+            if result.error:
+                print(f"  [{result.project}] 失败: {result.error}")
+            else:
+                print(f"  [{result.project}] 新提交 {result.commits}，导入 {result.added} 条")
+        print(f"共导入 {sum(r.added for r in results)} 条记录")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="从本地 git 仓库导入提交为 WorkTag 记录")
+    parser.add_argument("paths", nargs="*", help="仓库目录，或包含多个仓库的目录（省略时同步已添加的仓库）")
+    parser.add_argument("--db", help="数据库文件路径（默认与程序使用的路径一致）")
+    parser.add_argument("--project", help="新添加仓库对应的项目名（默认取目录名）")
+    parser.add_argument("--author", help="只导入该作者的提交（默认为仓库配置的 user.email）")
+    parser.add_argument("--all-authors", action="store_true", help="导入所有作者的提交")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="同时处理的仓库数")
+    args = parser.parse_args()
+    import_git(args.paths, args.db, args.project, "" if args.all_authors else args.author, args.workers)
@@ -6,13 +6,14 @@ WorkTag - Windows 桌面工作日志工具
 
 import sys
 import os
-from PySide6.QtWidgets import QApplication
+import time
+
+# 主程序开始执行的时间（启动测量用：此前为启动器解包和解释器初始化）
+_MAIN_STARTED_AT = time.time()
 
 # 添加项目根目录到 Python 路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from ui.main_window import main as ui_main
-
 
 def check_dependencies():
     """检查依赖是否安装"""
@@ -31,8 +32,28 @@ def check_dependencies():
         print("✗ SQLite3 未安装")
 
 
+def build_instance_message(args):
+    """命令行参数 -> 发给正在运行实例的消息
+
+    WorkTag.exe                          显示窗口
+    WorkTag.exe "[Unity] 修复回调 #bug"  添加一条记录
+    """
+    text = ' '.join(args).strip()
+    if text:
+        return {"action": "add", "text": text}
+    return {"action": "show"}
+
+
 def main():
     """主函数"""
+    message = build_instance_message(sys.argv[1:])
+    
+    # 已有实例在运行：把请求转交给它后立即退出（不加载界面、不打开数据库）
+    from ui.single_instance import send_to_running_instance
+    if send_to_running_instance(message):
+        print("WorkTag 已在运行，已通知现有窗口")
+        return
+    
     print("=" * 50)
     print("WorkTag - Windows 桌面工作日志工具")
     print("=" * 50)
@@ -50,7 +71,11 @@ def main():
     print("=" * 50)
     
     # 启动 UI
-    ui_main()
+    from ui.profiler import mark_startup
+    mark_startup('main', _MAIN_STARTED_AT)
+    from ui.main_window import main as ui_main
+    mark_startup('imports')
+    ui_main(message.get("text"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db.database import Database
+from service.parser import InputParser
+from service.query import QueryError, explain_query, search_logs
+
+
+def run_search(query: str, db_path: str = None, limit: int = None, explain: bool = False):
+    """按筛选语句查找记录并输出（语法见 service/query.py）
+
+    数据库路径与程序保持一致（开发环境为 data/worklog.db，打包环境为用户数据目录）。
+    """
+    if db_path is None:
+        db_path = Database._get_default_db_path()
+
+    if not os.path.exists(db_path):
+        print(f"数据库文件不存在: {db_path}")
+        sys.exit(1)
+
+    with Database(db_path) as db:
+        try:
+            if explain:
+                for line in explain_query(db, query):
+                    print(line)
+                return
+
+            count = 0
+            for log in search_logs(db, query, limit):
+                text = InputParser.format_entry(log.content, log.projects, log.tags, log.duration)
+                print(f"{log.date} {log.time} {text}")
+                count += 1
+            print(f"共 {count} 条记录")
+        except QueryError as e:
+            print(f"筛选条件有误: {e}")
+            sys.exit(2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="按筛选条件查找 WorkTag 记录",
+        epilog='示例: python search_logs.py \'project:Unity tag:bug since:2026-01-01 "回调"\'',
+    )
+    parser.add_argument("query", help="筛选语句，如 project:Unity tag:bug since:7d 关键词")
+    parser.add_argument("--db", help="数据库文件路径（默认与程序使用的路径一致）")
+    parser.add_argument("--limit", type=int, help="最多输出的记录数")
+    parser.add_argument("--explain", action="store_true", help="只输出编译后的 SQL 和查询计划")
+    args = parser.parse_args()
+    run_search(args.query, args.db, args.limit, args.explain)
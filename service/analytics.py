@@ -0,0 +1,291 @@
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖，缺失时使用纯 Python 实现
+    np = None
+
+
+def _to_day(value: str) -> int:
+    """'YYYY-MM-DD' 转为儒略日序号（与 SQLite julianday 取整一致）"""
+    return date.fromisoformat(value).toordinal() + 1721425
+
+
+def _to_date(day: int) -> str:
+    """儒略日序号转回 'YYYY-MM-DD'"""
+    return date.fromordinal(day - 1721425).isoformat()
+
+
+class _Columns:
+    """统计用的列式数据
+
+    rows 维度：每条日志一行的日期序号；
+    项目/标签维度：展开后的 (行号, 编号) 对，一条日志可能对应多个项目或标签。
+    """
+
+    def __init__(self, days, project_rows, project_ids, project_names,
+                 tag_rows, tag_ids, tag_names):
+        self.days = days
+        self.labels = {
+            'project': (project_rows, project_ids, project_names),
+            'tag': (tag_rows, tag_ids, tag_names),
+        }
+
+
+class AnalyticsEngine:
+    """图表统计引擎
+
+    从数据库一次性读取紧凑列，按日/周生成 项目×时间、标签×时间 计数矩阵，
+    并计算滑动平均、时间占比和连续记录天数。安装 NumPy 时使用向量化计算
+    （返回 ndarray），否则回退到纯 Python 实现（返回列表）。
+    结果按数据库变更标记缓存，数据未变化时重复调用不会重新计算。
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._token = None
+        self._columns: Optional[_Columns] = None
+        self._cache: Dict[tuple, object] = {}
+
+    @property
+    def vectorized(self) -> bool:
+        return np is not None
+
+    # ---------- 数据加载 ----------
+
+    def _load(self) -> _Columns:
+        """数据变化时重新加载列，并清空结果缓存"""
+        token = self.db.get_change_token()
+        if self._columns is not None and token == self._token:
+            return self._columns
+
+        if hasattr(self.db, 'snapshot'):
+            # 在只读快照中读取，不占用写连接的锁（可在后台线程调用）
+            with self.db.snapshot() as view:
+                rows = view.get_analytics_columns()
+        else:
+            rows = self.db.get_analytics_columns()
+        days = [row[0] for row in rows]
+        project_rows, project_ids, project_names = self._explode([row[1] for row in rows])
+        tag_rows, tag_ids, tag_names = self._explode([row[2] for row in rows])
+
+        if np is not None:
+            days = np.asarray(days, dtype=np.int64)
+
+        self._columns = _Columns(days, project_rows, project_ids, project_names,
+                                 tag_rows, tag_ids, tag_names)
+        self._token = token
+        self._cache.clear()
+        return self._columns
+
+    @staticmethod
+    def _explode(values: List[Optional[str]]):
+        """把逗号分隔的组合字符串展开为 (行号, 名称编号) 对
+
+        只对去重后的组合做字符串拆分，行级展开使用向量化索引。
+        """
+        combo_ids: Dict[Optional[str], int] = {}
+        row_combos = [combo_ids.setdefault(value, len(combo_ids)) for value in values]
+
+        names: List[str] = []
+        name_ids: Dict[str, int] = {}
+        members: List[List[int]] = [[] for _ in combo_ids]
+        for combo, combo_id in combo_ids.items():
+            for name in (combo or '').split(','):
+                name = name.strip()
+                if name:
+                    if name not in name_ids:
+                        name_ids[name] = len(names)
+                        names.append(name)
+                    members[combo_id].append(name_ids[name])
+
+        if np is None:
+            rows, ids = [], []
+            for row, combo_id in enumerate(row_combos):
+                for name_id in members[combo_id]:
+                    rows.append(row)
+                    ids.append(name_id)
+            return rows, ids, names
+
+        lengths = np.array([len(m) for m in members], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(members) else lengths
+        flat = np.array([i for m in members for i in m], dtype=np.int64)
+
+        row_combos = np.asarray(row_combos, dtype=np.int64)
+        row_lengths = lengths[row_combos]
+        total = int(row_lengths.sum())
+
+        rows = np.repeat(np.arange(len(row_combos), dtype=np.int64), row_lengths)
+        # 每个展开位置在其组合成员中的偏移 = 全局位置 - 该行起点
+        starts = np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+        positions = np.arange(total, dtype=np.int64) - starts + np.repeat(offsets[row_combos], row_lengths)
+        return rows, flat[positions], names
+
+    def _cached(self, key: tuple, compute):
+        self._load()
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    # ---------- 时间轴 ----------
+
+    @staticmethod
+    def _period_bounds(columns: _Columns, start_date: Optional[str], end_date: Optional[str]) -> Tuple[int, int]:
+        """计算统计区间的首尾日期序号（未指定时取数据的实际范围）"""
+        days = columns.days
+        if len(days) == 0:
+            first = last = _to_day(date.today().isoformat())
+        else:
+            first, last = int(min(days)), int(max(days))
+        if start_date:
+            first = _to_day(start_date)
+        if end_date:
+            last = _to_day(end_date)
+        return first, last
+
+    @staticmethod
+    def _bucket(day: int, first: int, period: str) -> int:
+        """日期序号 -> 时间桶编号（周以周一为起点）"""
+        if period == 'week':
+            return (day - day % 7) // 7 - (first - first % 7) // 7
+        return day - first
+
+    def _period_labels(self, first: int, last: int, period: str) -> List[str]:
+        if period == 'week':
+            monday = first - first % 7
+            return [_to_date(d) for d in range(monday, last + 1, 7)]
+        return [_to_date(d) for d in range(first, last + 1)]
+
+    # ---------- 聚合 ----------
+
+    def daily_counts(self, start_date: Optional[str] = None, end_date: Optional[str] = None):
+        """每天的记录数，返回 (日期列表, 计数向量)"""
+        return self.count_series('day', start_date, end_date)
+
+    def count_series(self, period: str = 'day', start_date: Optional[str] = None,
+                     end_date: Optional[str] = None):
+        """按日/周统计记录数，返回 (时间标签, 计数向量)"""
+        def compute():
+            columns = self._columns
+            first, last = self._period_bounds(columns, start_date, end_date)
+            labels = self._period_labels(first, last, period)
+
+            if np is not None:
+                days = columns.days
+                mask = (days >= first) & (days <= last)
+                buckets = self._bucket_array(days[mask], first, period)
+                return labels, np.bincount(buckets, minlength=len(labels))[:len(labels)]
+
+            counts = [0] * len(labels)
+            for day in columns.days:
+                if first <= day <= last:
+                    counts[self._bucket(day, first, period)] += 1
+            return labels, counts
+
+        return self._cached(('series', period, start_date, end_date), compute)
+
+    def count_matrix(self, by: str = 'project', period: str = 'day',
+                     start_date: Optional[str] = None, end_date: Optional[str] = None):
+        """按 项目/标签 × 日/周 统计记录数
+
+        返回 (时间标签, 名称列表, 矩阵)，矩阵形状为 [时间桶数, 名称数]。
+        """
+        def compute():
+            columns = self._columns
+            rows, ids, names = columns.labels[by]
+            first, last = self._period_bounds(columns, start_date, end_date)
+            labels = self._period_labels(first, last, period)
+            width = len(names)
+
+            if np is not None:
+                days = columns.days[rows] if len(rows) else np.zeros(0, dtype=np.int64)
+                mask = (days >= first) & (days <= last)
+                buckets = self._bucket_array(days[mask], first, period)
+                flat = np.bincount(buckets * width + ids[mask], minlength=len(labels) * width)
+                return labels, names, flat[:len(labels) * width].reshape(len(labels), width)
+
+            matrix = [[0] * width for _ in labels]
+            for row, name_id in zip(rows, ids):
+                day = columns.days[row]
+                if first <= day <= last:
+                    matrix[self._bucket(day, first, period)][name_id] += 1
+            return labels, names, matrix
+
+        return self._cached(('matrix', by, period, start_date, end_date), compute)
+
+    @staticmethod
+    def _bucket_array(days, first: int, period: str):
+        if period == 'week':
+            return (days - days % 7) // 7 - (first - first % 7) // 7
+        return days - first
+
+    @staticmethod
+    def rolling_average(series, window: int = 7):
+        """尾随窗口滑动平均（前 window-1 个点按已有数据取平均）"""
+        if np is not None:
+            values = np.asarray(series, dtype=np.float64)
+            sums = np.concatenate(([0.0], np.cumsum(values)))
+            index = np.arange(1, len(values) + 1)
+            lower = np.maximum(index - window, 0)
+            return (sums[index] - sums[lower]) / (index - lower)
+
+        result, total = [], 0.0
+        for i, value in enumerate(series):
+            total += value
+            if i >= window:
+                total -= series[i - window]
+            result.append(total / min(i + 1, window))
+        return result
+
+    def share_of_time(self, by: str = 'project', start_date: Optional[str] = None,
+                      end_date: Optional[str] = None) -> Dict[str, float]:
+        """各 项目/标签 在区间内的记录占比（按占比降序）"""
+        def compute():
+            _, names, matrix = self.count_matrix(by, 'day', start_date, end_date)
+            if np is not None:
+                totals = matrix.sum(axis=0) if len(matrix) else np.zeros(len(names))
+                grand = totals.sum()
+                shares = totals / grand if grand else totals.astype(np.float64)
+                order = np.argsort(-shares, kind='stable')
+                return {names[i]: float(shares[i]) for i in order if totals[i]}
+
+            totals = [sum(column) for column in zip(*matrix)] if matrix else [0] * len(names)
+            grand = sum(totals)
+            pairs = sorted(((t / grand, n) for n, t in zip(names, totals) if t),
+                           key=lambda pair: -pair[0])
+            return {name: share for share, name in pairs}
+
+        return self._cached(('share', by, start_date, end_date), compute)
+
+    def streaks(self) -> Dict[str, int]:
+        """连续记录天数：当前连续天数（截至今天或昨天）与历史最长连续天数"""
+        def compute():
+            _, counts = self.count_series('day', None, date.today().isoformat())
+            if len(counts) == 0:
+                return {'current': 0, 'longest': 0}
+
+            if np is not None:
+                active = np.concatenate(([0], (np.asarray(counts) > 0).astype(np.int8), [0]))
+                edges = np.diff(active)
+                starts = np.flatnonzero(edges == 1)
+                ends = np.flatnonzero(edges == -1)
+                runs = ends - starts
+                longest = int(runs.max()) if len(runs) else 0
+                # 最后一段连续记录结束于今天或昨天时，才算作当前连续天数
+                current = int(runs[-1]) if len(runs) and ends[-1] >= len(counts) - 1 else 0
+            else:
+                longest = run = 0
+                for value in counts:
+                    run = run + 1 if value > 0 else 0
+                    longest = max(longest, run)
+                current = run
+                if current == 0:
+                    for value in reversed(counts[:-1]):
+                        if value <= 0:
+                            break
+                        current += 1
+
+            return {'current': current, 'longest': longest}
+
+        return self._cached(('streaks', date.today().isoformat()), compute)
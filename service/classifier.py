@@ -0,0 +1,280 @@
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖，缺失时使用纯 Python 实现
+    np = None
+
+# 字符 n-gram 的长度：不依赖分词，中文的二字词和英文的词根都能覆盖
+NGRAM_SIZES = (2, 3)
+# 记录数少于此值的项目不参与归类（样本太少，质心不可靠）
+MIN_PROJECT_DOCS = 3
+# 自动应用的门槛：与最近质心的余弦相似度，以及领先第二名的差距
+MIN_SCORE = 0.2
+MIN_MARGIN = 0.05
+
+# meta 键：模型已训练到的最大记录 ID
+WATERMARK_META_KEY = 'classifier_watermark'
+# classifier_grams 中用空串记录已训练的记录总数（每条记录都“包含”空串）
+_TOTAL_KEY = ''
+# 标签特征的前缀（内容经过空白规范化，不会出现制表符，不会与字符 n-gram 冲突）
+_TAG_PREFIX = '\t#'
+
+
+class Prediction(NamedTuple):
+    """一条记录的归类结果"""
+    project: Optional[str]
+    score: float      # 与最近质心的余弦相似度
+    margin: float     # 领先第二近质心的差距
+
+    @property
+    def confident(self) -> bool:
+        return self.project is not None and self.score >= MIN_SCORE and self.margin >= MIN_MARGIN
+
+
+class Suggestion(NamedTuple):
+    """给一条未分类记录建议的项目"""
+    log_id: int
+    date: str
+    content: str
+    project: Optional[str]
+    score: float
+    margin: float
+
+    @property
+    def confident(self) -> bool:
+        return Prediction(self.project, self.score, self.margin).confident
+
+
+def extract_features(content: str, tags: Sequence[str] = ()) -> Dict[str, float]:
+    """记录 -> 归一化的词频向量 {特征: 权重}
+
+    特征为内容的字符 2/3-gram（前后补空格）和标签；词频取 1 + log(tf) 抑制重复，
+    再做 L2 归一化，长短不同的记录权重相当。
+    """
+    text = ' ' + ' '.join((content or '').lower().split()) + ' '
+    counts = Counter(text[i:i + n] for n in NGRAM_SIZES for i in range(len(text) - n + 1))
+    for tag in tags:
+        counts[_TAG_PREFIX + tag.lower()] += 1
+    weights = {gram: 1.0 + math.log(count) for gram, count in counts.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {gram: w / norm for gram, w in weights.items()}
+
+
+class ProjectClassifier:
+    """按项目的最近质心分类器（字符 n-gram TF-IDF）
+
+    模型只保存可累加的统计量：每个 n-gram 的文档频率、每个项目的记录数、每个项目下
+    各记录归一化词频向量之和（都在数据库的 classifier_* 表中）。新增已归类的记录时
+    只需把它们的统计量加进去（见 update），不必重新训练；质心在预测时由统计量乘以
+    当前的 idf 得到。安装 NumPy 时批量预测使用向量化计算，否则回退到纯 Python 实现。
+    """
+
+    def __init__(self, df: Optional[Dict[str, int]] = None, docs: Optional[Dict[str, int]] = None,
+                 weights: Iterable[Tuple[str, str, float]] = ()):
+        self.df: Dict[str, int] = dict(df or {})
+        self.docs: Dict[str, int] = dict(docs or {})
+        self.weights: Dict[str, Dict[str, float]] = {}
+        for project, gram, weight in weights:
+            self.weights.setdefault(project, {})[gram] = weight
+        self._compiled = None
+
+    @classmethod
+    def load(cls, db) -> 'ProjectClassifier':
+        return cls(*db.get_classifier_model())
+
+    @property
+    def projects(self) -> List[str]:
+        """参与归类的项目"""
+        return sorted(p for p, n in self.docs.items() if n >= MIN_PROJECT_DOCS and p in self.weights)
+
+    @property
+    def vectorized(self) -> bool:
+        return np is not None
+
+    # ---------- 训练 ----------
+
+    def learn(self, entries: Iterable) -> Tuple[Dict[str, int], Dict[str, int], Dict[Tuple[str, str], float], int]:
+        """把已归类的记录（LogEntry）加入模型，返回新增的统计量和记录数，供持久化"""
+        df_delta: Dict[str, int] = Counter()
+        docs_delta: Dict[str, int] = Counter()
+        weight_delta: Dict[Tuple[str, str], float] = {}
+        learned = 0
+        for entry in entries:
+            if not entry.projects:
+                continue
+            features = extract_features(entry.content, entry.tags)
+            df_delta[_TOTAL_KEY] += 1
+            df_delta.update(features.keys())
+            for project in entry.projects:
+                docs_delta[project] += 1
+                for gram, weight in features.items():
+                    key = (project, gram)
+                    weight_delta[key] = weight_delta.get(key, 0.0) + weight
+            learned += 1
+
+        for gram, count in df_delta.items():
+            self.df[gram] = self.df.get(gram, 0) + count
+        for project, count in docs_delta.items():
+            self.docs[project] = self.docs.get(project, 0) + count
+        for (project, gram), weight in weight_delta.items():
+            sums = self.weights.setdefault(project, {})
+            sums[gram] = sums.get(gram, 0.0) + weight
+        self._compiled = None
+        return dict(df_delta), dict(docs_delta), weight_delta, learned
+
+    def clear(self):
+        self.df.clear()
+        self.docs.clear()
+        self.weights.clear()
+        self._compiled = None
+
+    def update(self, db, rebuild: bool = False) -> int:
+        """增量训练：只读取上次训练之后新增的已归类记录，返回本次训练的记录数
+
+        rebuild 时清空模型、用全部已归类的记录重新训练（记录被删除或修改后可以用它校正）。
+        """
+        watermark = 0 if rebuild else int(db.get_meta(WATERMARK_META_KEY, '0') or 0)
+        max_id = db.get_max_log_id()
+        if rebuild:
+            self.clear()
+        elif max_id <= watermark:
+            return 0
+
+        entries = db.iter_logs_where('id > :after AND id <= :max AND project IS NOT NULL',
+                                     {'after': watermark, 'max': max_id})
+        df, docs, weights, learned = self.learn(entries)
+        db.update_classifier_model(df, docs, weights, max_id, reset=rebuild)
+        return learned
+
+    # ---------- 预测 ----------
+
+    def _idf(self, gram: str) -> float:
+        total = self.df.get(_TOTAL_KEY, 0)
+        return math.log((1 + total) / (1 + self.df.get(gram, 0))) + 1.0
+
+    def _compile(self):
+        """由统计量计算归一化的质心；NumPy 可用时组织成 [特征数, 项目数] 的矩阵（附各特征的 idf）"""
+        if self._compiled is not None:
+            return self._compiled
+
+        projects = self.projects
+        centroids = []
+        for project in projects:
+            centroid = {gram: weight * self._idf(gram) for gram, weight in self.weights[project].items()}
+            norm = math.sqrt(sum(w * w for w in centroid.values())) or 1.0
+            centroids.append({gram: w / norm for gram, w in centroid.items()})
+
+        if np is None:
+            self._compiled = (projects, centroids)
+            return self._compiled
+
+        vocab: Dict[str, int] = {}
+        for centroid in centroids:
+            for gram in centroid:
+                vocab.setdefault(gram, len(vocab))
+        idf = np.fromiter((self._idf(g) for g in vocab), dtype=np.float64, count=len(vocab))
+        matrix = np.zeros((len(vocab), len(projects)), dtype=np.float64)
+        for column, centroid in enumerate(centroids):
+            rows = np.fromiter((vocab[g] for g in centroid), dtype=np.int64, count=len(centroid))
+            matrix[rows, column] = np.fromiter(centroid.values(), dtype=np.float64, count=len(centroid))
+        self._compiled = (projects, vocab, matrix, idf)
+        return self._compiled
+
+    def predict(self, items: Sequence[Tuple[str, Sequence[str]]]) -> List[Prediction]:
+        """批量预测 [(内容, 标签)] 的项目"""
+        if not items:
+            return []
+        compiled = self._compile()
+        if not compiled[0]:
+            return [Prediction(None, 0.0, 0.0) for _ in items]
+        if np is None:
+            return self._predict_python(items, *compiled)
+        return self._predict_numpy(items, *compiled)
+
+    def _query_vector(self, content: str, tags: Sequence[str]) -> Dict[str, float]:
+        """记录的 TF-IDF 向量（L2 归一化）；训练中没见过的特征也计入范数，新内容的相似度会更低"""
+        vector = {gram: w * self._idf(gram) for gram, w in extract_features(content, tags).items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {gram: w / norm for gram, w in vector.items()}
+
+    def _predict_numpy(self, items, projects, vocab, matrix, idf) -> List[Prediction]:
+        # 稀疏的 [记录数, 特征数] 矩阵按 (行, 列, 值) 三元组展开：idf 加权和归一化按数组计算，
+        # 与质心矩阵相乘时每个非零元素取出质心矩阵的一行，再按记录分段求和
+        rows, columns, values = [], [], []
+        outside = np.zeros(len(items), dtype=np.float64)  # 词表外特征对范数的贡献
+        for row, (content, tags) in enumerate(items):
+            for gram, weight in extract_features(content, tags).items():
+                column = vocab.get(gram)
+                if column is None:
+                    outside[row] += (weight * self._idf(gram)) ** 2
+                else:
+                    rows.append(row)
+                    columns.append(column)
+                    values.append(weight)
+
+        scores = np.zeros((len(items), len(projects)), dtype=np.float64)
+        if values:
+            rows = np.asarray(rows, dtype=np.int64)
+            columns = np.asarray(columns, dtype=np.int64)
+            values = np.asarray(values) * idf[columns]
+            norms = np.sqrt(np.bincount(rows, values * values, minlength=len(items)) + outside)
+            values /= norms[rows]
+            contributions = matrix[columns] * values[:, None]
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            scores[rows[starts]] = np.add.reduceat(contributions, starts, axis=0)
+
+        if len(projects) > 1:
+            top2 = np.argpartition(-scores, 1, axis=1)[:, :2]
+            first = np.take_along_axis(scores, top2, axis=1)
+            swap = first[:, 1] > first[:, 0]
+            best = np.where(swap, top2[:, 1], top2[:, 0])
+            best_score = first.max(axis=1)
+            margin = best_score - first.min(axis=1)
+        else:
+            best = np.zeros(len(items), dtype=np.int64)
+            best_score = scores[:, 0]
+            margin = best_score
+
+        return [Prediction(projects[b] if s > 0 else None, float(s), float(m))
+                for b, s, m in zip(best.tolist(), best_score.tolist(), margin.tolist())]
+
+    def _predict_python(self, items, projects, centroids) -> List[Prediction]:
+        predictions = []
+        for content, tags in items:
+            vector = self._query_vector(content, tags)
+            scores = sorted(
+                ((sum(w * centroid.get(gram, 0.0) for gram, w in vector.items()), project)
+                 for project, centroid in zip(projects, centroids)),
+                reverse=True,
+            )
+            best, project = scores[0]
+            second = scores[1][0] if len(scores) > 1 else 0.0
+            predictions.append(Prediction(project if best > 0 else None, best, best - second))
+        return predictions
+
+    def suggest(self, db, limit: Optional[int] = None) -> List[Suggestion]:
+        """为已训练范围内（不含训练之后新增的）未分类记录建议项目，最新的在前"""
+        watermark = int(db.get_meta(WATERMARK_META_KEY, '0') or 0)
+        entries = list(db.iter_logs_where('project IS NULL AND id <= :max', {'max': watermark}, limit))
+        predictions = self.predict([(entry.content, entry.tags) for entry in entries])
+        return [Suggestion(entry.id, entry.date, entry.content, *prediction)
+                for entry, prediction in zip(entries, predictions)]
+
+
+def classify_unlabeled(db, progress=None, rebuild: bool = False) -> List[Suggestion]:
+    """增量更新模型后为全部未分类记录给出建议（可在后台线程中执行）"""
+    classifier = ProjectClassifier.load(db)
+    if progress:
+        progress(10, "更新模型")
+    classifier.update(db, rebuild)
+    if progress:
+        progress(50, "归类")
+    return classifier.suggest(db)
+
+
+def apply_suggestions(db, suggestions: Iterable[Suggestion], progress=None) -> int:
+    """把置信度足够的建议写入数据库，返回更新的记录数"""
+    return db.assign_projects({s.log_id: s.project for s in suggestions if s.confident})
@@ -0,0 +1,243 @@
+import html
+import io
+import os
+import zipfile
+from typing import Iterable, Iterator, Tuple
+from xml.sax.saxutils import escape
+
+# 报告内容块：(类型, 文本)
+# title 标题 / heading 一级小节 / subheading 二级小节 / item 列表项 /
+# subitem 二级列表项 / text 段落 / note 备注（斜体） / break 段落分隔（仅 Markdown 输出空行）
+# 以及 ('link', 文本, 地址)：显示为二级列表项的链接（如附件）
+Block = Tuple[str, ...]
+BREAK: Block = ('break', '')
+
+
+def link_block(text: str, url: str) -> Block:
+    return ('link', text, url)
+
+
+def markdown_link_text(text: str) -> str:
+    """转义 Markdown 链接文字中的方括号"""
+    return text.replace('[', '\\[').replace(']', '\\]')
+
+
+class MarkdownExporter:
+    """Markdown 导出"""
+
+    PREFIXES = {
+        'title': '# ',
+        'heading': '## ',
+        'subheading': '### ',
+        'item': '- ',
+        'subitem': '  - ',
+        'text': '',
+        'break': '',
+    }
+
+    @staticmethod
+    def iter_lines(blocks: Iterable[Block]) -> Iterator[str]:
+        for kind, text, *extra in blocks:
+            if kind == 'note':
+                yield f"*{text}*"
+            elif kind == 'link':
+                yield f"  - [{markdown_link_text(text)}](<{extra[0]}>)"
+            else:
+                yield MarkdownExporter.PREFIXES.get(kind, '') + text
+
+    @staticmethod
+    def export(blocks: Iterable[Block], filepath: str):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            first = True
+            for line in MarkdownExporter.iter_lines(blocks):
+                if not first:
+                    f.write("\n")
+                f.write(line)
+                first = False
+
+
+class HtmlExporter:
+    """独立 HTML 导出（内联样式，逐块写入文件）"""
+
+    HEAD = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: "Microsoft YaHei", "PingFang SC", sans-serif; max-width: 860px; margin: 32px auto; padding: 0 16px; color: #222; line-height: 1.6; }}
+h1 {{ border-bottom: 2px solid #4a9cff; padding-bottom: 6px; }}
+h2 {{ margin-top: 28px; color: #2b6cb0; }}
+h3 {{ margin-bottom: 4px; }}
+ul {{ margin-top: 4px; }}
+.note {{ color: #888; font-style: italic; margin-top: 32px; }}
+</style>
+</head>
+<body>
+"""
+
+    TAGS = {
+        'title': 'h1',
+        'heading': 'h2',
+        'subheading': 'h3',
+        'text': 'p',
+    }
+
+    @staticmethod
+    def export(blocks: Iterable[Block], filepath: str):
+        blocks = iter(blocks)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            # 列表嵌套深度：0 不在列表中；1 在一级列表中（最后一个 <li> 未闭合）；2 在二级列表中
+            depth = 0
+            started = False
+
+            def close_lists():
+                nonlocal depth
+                if depth == 2:
+                    f.write("</ul></li>\n</ul>\n")
+                elif depth == 1:
+                    f.write("</li>\n</ul>\n")
+                depth = 0
+
+            for kind, text, *extra in blocks:
+                if not started:
+                    title = text if kind == 'title' else 'WorkTag 报告'
+                    f.write(HtmlExporter.HEAD.format(title=html.escape(title)))
+                    started = True
+
+                text = html.escape(text)
+                if kind == 'item':
+                    if depth == 2:
+                        f.write("</ul></li>\n")
+                    elif depth == 1:
+                        f.write("</li>\n")
+                    else:
+                        f.write("<ul>\n")
+                    f.write(f"<li>{text}")
+                    depth = 1
+                elif kind in ('subitem', 'link'):
+                    if depth == 0:
+                        f.write("<ul>\n<li>")
+                        depth = 1
+                    if depth == 1:
+                        f.write("\n<ul>\n")
+                        depth = 2
+                    if kind == 'link':
+                        text = f'<a href="{html.escape(extra[0])}">{text}</a>'
+                    f.write(f"<li>{text}</li>\n")
+                elif kind == 'break':
+                    close_lists()
+                elif kind == 'note':
+                    close_lists()
+                    f.write(f'<p class="note">{text}</p>\n')
+                else:
+                    close_lists()
+                    tag = HtmlExporter.TAGS.get(kind, 'p')
+                    f.write(f"<{tag}>{text}</{tag}>\n")
+
+            if not started:
+                f.write(HtmlExporter.HEAD.format(title='WorkTag 报告'))
+            close_lists()
+            f.write("</body>\n</html>\n")
+
+
+class DocxExporter:
+    """Word (.docx) 导出
+
+    只用标准库：直接把 OOXML 各部件写入 zip，正文 document.xml 逐段流式写入，
+    不在内存中构建 DOM。
+    """
+
+    CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+</Types>"""
+
+    ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+    DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+    STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+<w:docDefaults>
+<w:rPrDefault><w:rPr><w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:eastAsia="Microsoft YaHei"/><w:sz w:val="21"/></w:rPr></w:rPrDefault>
+<w:pPrDefault><w:pPr><w:spacing w:after="60" w:line="300" w:lineRule="auto"/></w:pPr></w:pPrDefault>
+</w:docDefaults>
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>
+<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:pPr><w:spacing w:after="240"/></w:pPr><w:rPr><w:b/><w:sz w:val="36"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:pPr><w:keepNext/><w:spacing w:before="240" w:after="120"/><w:outlineLvl w:val="0"/></w:pPr><w:rPr><w:b/><w:color w:val="2B6CB0"/><w:sz w:val="28"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:pPr><w:keepNext/><w:spacing w:before="160" w:after="60"/><w:outlineLvl w:val="1"/></w:pPr><w:rPr><w:b/><w:sz w:val="24"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="ListItem"><w:name w:val="List Item"/><w:basedOn w:val="Normal"/><w:pPr><w:ind w:left="360" w:hanging="240"/></w:pPr></w:style>
+<w:style w:type="paragraph" w:styleId="ListItem2"><w:name w:val="List Item 2"/><w:basedOn w:val="Normal"/><w:pPr><w:ind w:left="720" w:hanging="240"/></w:pPr></w:style>
+<w:style w:type="paragraph" w:styleId="Note"><w:name w:val="Note"/><w:basedOn w:val="Normal"/><w:pPr><w:spacing w:before="240"/></w:pPr><w:rPr><w:i/><w:color w:val="888888"/></w:rPr></w:style>
+</w:styles>"""
+
+    DOCUMENT_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                     '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>\n')
+    DOCUMENT_TAIL = ('<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+                     '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" w:header="720" w:footer="720" w:gutter="0"/>'
+                     '</w:sectPr></w:body></w:document>\n')
+
+    # 块类型 -> (段落样式, 文本前缀)
+    STYLE_MAP = {
+        'title': ('Title', ''),
+        'heading': ('Heading1', ''),
+        'subheading': ('Heading2', ''),
+        'item': ('ListItem', '• '),
+        'subitem': ('ListItem2', '◦ '),
+        'link': ('ListItem2', '◦ '),
+        'text': ('Normal', ''),
+        'note': ('Note', ''),
+    }
+
+    @staticmethod
+    def paragraph(kind: str, text: str) -> str:
+        style, prefix = DocxExporter.STYLE_MAP.get(kind, ('Normal', ''))
+        return (f'<w:p><w:pPr><w:pStyle w:val="{style}"/></w:pPr>'
+                f'<w:r><w:t xml:space="preserve">{escape(prefix + text)}</w:t></w:r></w:p>\n')
+
+    @staticmethod
+    def export(blocks: Iterable[Block], filepath: str):
+        with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('[Content_Types].xml', DocxExporter.CONTENT_TYPES)
+            zf.writestr('_rels/.rels', DocxExporter.ROOT_RELS)
+            zf.writestr('word/_rels/document.xml.rels', DocxExporter.DOCUMENT_RELS)
+            zf.writestr('word/styles.xml', DocxExporter.STYLES)
+
+            with zf.open('word/document.xml', 'w', force_zip64=True) as raw:
+                out = io.TextIOWrapper(io.BufferedWriter(raw, 64 * 1024), encoding='utf-8')
+                out.write(DocxExporter.DOCUMENT_HEAD)
+                for kind, text, *extra in blocks:
+                    if kind == 'link':
+                        # Word 中不建超链接关系，直接写出地址
+                        text = f"{text}（{extra[0]}）"
+                    if kind != 'break':
+                        out.write(DocxExporter.paragraph(kind, text))
+                out.write(DocxExporter.DOCUMENT_TAIL)
+                out.flush()
+                out.detach().flush()
+
+
+EXPORTERS = {
+    '.md': MarkdownExporter,
+    '.html': HtmlExporter,
+    '.htm': HtmlExporter,
+    '.docx': DocxExporter,
+}
+
+
+def get_exporter(filepath: str):
+    """根据文件扩展名选择导出器"""
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext not in EXPORTERS:
+        raise ValueError(f"不支持的导出格式: {ext}")
+    return EXPORTERS[ext]
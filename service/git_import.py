@@ -0,0 +1,209 @@
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .parser import InputParser
+
+# 同时执行 git log 的仓库数
+MAX_WORKERS = 8
+# 每个写事务包含的提交数
+BATCH_SIZE = 500
+# 单个仓库 git 命令的超时（秒）
+GIT_TIMEOUT = 120
+
+# meta 键：已添加的仓库 {路径: 项目名}，以及每个仓库上次导入到的提交
+REPOS_META_KEY = 'git_import_repos'
+_HEAD_META_PREFIX = 'git_import_head:'
+
+# git log 输出格式：字段用 \x1f 分隔，提交之间用 \x1e 分隔
+_LOG_FORMAT = '%H%x1f%aI%x1f%s%x1e'
+
+ProgressCallback = Callable[[int, str], None]
+
+
+class GitImportError(Exception):
+    """执行 git 命令失败"""
+
+
+class GitCommit(NamedTuple):
+    """git log 中的一个提交"""
+    sha: str
+    time: str      # 本地时间 YYYY-MM-DD HH:MM:SS（取作者时间，即提交最初写下的时间）
+    subject: str
+
+
+class RepoResult(NamedTuple):
+    """一个仓库的导入结果"""
+    repo: str
+    project: str
+    commits: int
+    added: int
+    error: Optional[str] = None
+
+
+def _git(repo: str, *args: str) -> str:
+    try:
+        result = subprocess.run(
+            ['git', '-C', repo, *args],
+            capture_output=True, timeout=GIT_TIMEOUT,
+            # Windows 下不弹出控制台窗口
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise GitImportError(f"{repo}: {e}")
+    if result.returncode != 0:
+        raise GitImportError(f"{repo}: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout.decode('utf-8', 'replace')
+
+
+def is_repository(path: str) -> bool:
+    return os.path.exists(os.path.join(path, '.git'))
+
+
+def find_repositories(path: str) -> List[str]:
+    """path 本身是仓库时返回它，否则返回其下一级子目录中的仓库"""
+    path = os.path.abspath(path)
+    if is_repository(path):
+        return [path]
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return []
+    return [os.path.join(path, name) for name in names if is_repository(os.path.join(path, name))]
+
+
+def _local_time(iso_time: str) -> str:
+    return datetime.fromisoformat(iso_time).astimezone().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def read_commits(repo: str, since: Optional[str] = None, author: Optional[str] = None) -> Tuple[str, List[GitCommit]]:
+    """读取仓库 HEAD 上的提交（不含合并提交），返回 (HEAD 哈希, 提交列表)
+
+    since 为上次导入到的提交：仍在当前历史中时只读取之后的提交，
+    否则（如历史被改写）读取全部提交，由提交哈希去重。
+    author 为 None 时使用仓库配置的 user.email，空字符串表示不限作者。
+    """
+    head = _git(repo, 'rev-parse', 'HEAD').strip()
+    if since == head:
+        return head, []
+
+    args = ['log', '--no-merges', f'--format={_LOG_FORMAT}']
+    if author is None:
+        try:
+            author = _git(repo, 'config', 'user.email').strip()
+        except GitImportError:
+            author = ''
+    if author:
+        args.append(f'--author={author}')
+
+    if since:
+        try:
+            _git(repo, 'merge-base', '--is-ancestor', since, head)
+            args.append(f'{since}..{head}')
+        except GitImportError:
+            args.append(head)
+    else:
+        args.append(head)
+
+    commits = []
+    for record in _git(repo, *args).split('\x1e'):
+        fields = record.strip('\n').split('\x1f')
+        if len(fields) != 3:
+            continue
+        sha, iso_time, subject = fields
+        commits.append(GitCommit(sha, _local_time(iso_time), subject.strip()))
+    commits.reverse()  # 按时间先后写入
+    return head, commits
+
+
+def commit_to_entry(commit: GitCommit, project: str) -> Optional[Tuple]:
+    """提交 -> (哈希, 日期, 内容, 项目, 标签, 创建时间, 耗时)
+
+    提交说明按输入框的格式解析：其中的 [项目]、#标签、@耗时 同样生效，仓库对应的项目排在最前。
+    """
+    prefix = f"[{project}] " if project else ''
+    parsed = InputParser.parse_input(prefix + commit.subject)
+    if not parsed['content']:
+        return None
+    return (commit.sha, commit.time[:10], parsed['content'], parsed['project'],
+            parsed['tags'], commit.time, parsed['duration'])
+
+
+def _batches(items: Sequence, size: int) -> Iterator[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class GitImporter:
+    """把多个本地仓库的 git 提交导入为工作记录
+
+    各仓库的 git log 在线程池中并发执行（子进程不受 GIL 限制）；结果在调用线程中
+    按 BATCH_SIZE 分批、每批一个事务写入。每个仓库导入完成后记录当时的 HEAD，
+    下次只读取之后的新提交；提交哈希记录在 imported_commits 表中，不会重复导入。
+    """
+
+    def __init__(self, db, author: Optional[str] = None, max_workers: int = MAX_WORKERS):
+        self.db = db
+        self.author = author
+        self.max_workers = max_workers
+
+    def get_repositories(self) -> Dict[str, str]:
+        """已添加的仓库 {路径: 项目名}"""
+        try:
+            return json.loads(self.db.get_meta(REPOS_META_KEY, '{}'))
+        except ValueError:
+            return {}
+
+    def add_repositories(self, paths: Sequence[str], project: Optional[str] = None) -> Dict[str, str]:
+        """添加仓库（目录下的一级子仓库也会被找到），项目名默认取目录名，返回新增的仓库"""
+        repos = self.get_repositories()
+        added = {}
+        for path in paths:
+            for repo in find_repositories(path):
+                if repo not in repos:
+                    added[repo] = project or os.path.basename(repo.rstrip(os.sep))
+        if added:
+            repos.update(added)
+            self.db.set_meta(REPOS_META_KEY, json.dumps(repos, ensure_ascii=False))
+        return added
+
+    def run(self, repos: Optional[Dict[str, str]] = None,
+            progress: Optional[ProgressCallback] = None) -> List[RepoResult]:
+        """导入 repos（默认为全部已添加的仓库）中的新提交"""
+        repos = repos if repos is not None else self.get_repositories()
+        if not repos:
+            return []
+
+        results = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(repos))) as pool:
+            futures = {
+                pool.submit(read_commits, repo, self.db.get_meta(_HEAD_META_PREFIX + repo), self.author): repo
+                for repo in repos
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                repo = futures[future]
+                project = repos[repo]
+                if progress:
+                    progress((done - 1) * 100 // len(repos), project)
+                try:
+                    head, commits = future.result()
+                except GitImportError as e:
+                    results.append(RepoResult(repo, project, 0, 0, str(e)))
+                    continue
+
+                entries = [entry for entry in (commit_to_entry(c, project) for c in commits) if entry]
+                added = 0
+                for batch in _batches(entries, BATCH_SIZE):
+                    added += self.db.import_commits(repo, batch)
+                self.db.set_meta(_HEAD_META_PREFIX + repo, head)
+                results.append(RepoResult(repo, project, len(commits), added))
+        return results
+
+
+def import_git_history(db, repos: Optional[Dict[str, str]] = None, progress: Optional[ProgressCallback] = None,
+                       author: Optional[str] = None) -> List[RepoResult]:
+    """导入已添加仓库的新提交（可在后台线程中执行）"""
+    return GitImporter(db, author).run(repos, progress)
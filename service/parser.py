@@ -1,8 +1,13 @@
 import re
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Sequence, Tuple
+
+# @耗时：@30m / @45 / @1h / @1.5h / @1h30m / @2小时 / @20分钟
+DURATION_PATTERN = r'(?<!\S)@(\d+(?:\.\d+)?(?:h|小时)(?:\d+(?:m|min|分钟)?)?|\d+(?:m|min|分钟)?)(?!\S)'
+_DURATION_PART = re.compile(r'(?:(\d+(?:\.\d+)?)(?:h|小时))?(?:(\d+)(?:m|min|分钟)?)?')
+
 
 class InputParser:
-    """解析用户输入，提取项目、标签和内容"""
+    """解析用户输入，提取项目、标签、耗时和内容"""
     
     @staticmethod
     def parse_input(text: str) -> Dict[str, Optional[str]]:
@@ -13,18 +18,21 @@ class InputParser:
         - "[Unity][Ads] 修复激励广告回调 #bug #hook"
         - "分析 BillingClient 卡死"
         - "[AOSP] 绕过 OAID 校验"
+        - "[Unity] 接入新版 SDK @1h30m"
         
         规则：
         1. [项目名] 表示 project（可以有多个，用逗号分隔）
         2. #xxx 表示标签（可以有多个，用逗号分隔）
-        3. 剩余文本作为 content
+        3. @耗时 表示 duration（分钟），如 @45m、@1.5h、@1h30m
+        4. 剩余文本作为 content
         """
         if not text or not text.strip():
-            return {"content": "", "project": None, "tags": None}
+            return {"content": "", "project": None, "tags": None, "duration": None}
         
         text = text.strip()
         project = None
         tags = None
+        duration = None
         
         # 提取项目（[项目名] 格式）
         project_pattern = r'\[([^\]]+)\]'
@@ -46,32 +54,68 @@ class InputParser:
             # 用逗号连接标签
             tags = ', '.join(tag_matches)
         
+        # 提取耗时（@耗时 格式，多个时累加）
+        duration_matches = re.findall(DURATION_PATTERN, text)
+        if duration_matches:
+            text = re.sub(DURATION_PATTERN, '', text).strip()
+            duration = sum(InputParser.parse_duration(token) for token in duration_matches)
+        
         # 清理多余的空格
         content = ' '.join(text.split())
         
         return {
             "content": content,
             "project": project if project else None,
-            "tags": tags if tags else None
+            "tags": tags if tags else None,
+            "duration": duration
         }
     
+    @staticmethod
+    def parse_duration(token: str) -> int:
+        """'1h30m' / '1.5h' / '45' -> 分钟数"""
+        match = _DURATION_PART.fullmatch(token)
+        if not match:
+            return 0
+        hours, minutes = match.groups()
+        return int(round(float(hours or 0) * 60)) + int(minutes or 0)
+    
+    @staticmethod
+    def format_duration(minutes: int) -> str:
+        """分钟数 -> 输入格式的耗时，如 90 -> '1h30m'"""
+        hours, rest = divmod(int(minutes), 60)
+        if hours and rest:
+            return f"{hours}h{rest}m"
+        if hours:
+            return f"{hours}h"
+        return f"{rest}m"
+    
+    @staticmethod
+    def format_minutes(minutes) -> str:
+        """分钟数格式化为 “X小时Y分钟”"""
+        minutes = int(round(minutes or 0))
+        hours, rest = divmod(minutes, 60)
+        if hours and rest:
+            return f"{hours}小时{rest}分钟"
+        if hours:
+            return f"{hours}小时"
+        return f"{rest}分钟"
+    
     @staticmethod
     def format_for_display(log_entry: Dict) -> str:
         """格式化日志条目用于显示"""
-        parts = []
-        
-        if log_entry.get('project'):
-            projects = log_entry['project'].split(', ')
-            for proj in projects:
-                parts.append(f"[{proj}]")
-        
-        parts.append(log_entry.get('content', ''))
-        
-        if log_entry.get('tags'):
-            tags = log_entry['tags'].split(', ')
-            for tag in tags:
-                parts.append(f"#{tag}")
-        
+        projects = log_entry['project'].split(', ') if log_entry.get('project') else ()
+        tags = log_entry['tags'].split(', ') if log_entry.get('tags') else ()
+        return InputParser.format_entry(log_entry.get('content', ''), projects, tags, log_entry.get('duration'))
+    
+    @staticmethod
+    def format_entry(content: str, projects: Sequence[str] = (), tags: Sequence[str] = (),
+                     duration: Optional[int] = None) -> str:
+        """按输入格式拼接：[项目] 内容 #标签 @耗时（LogEntry 的 projects/tags 已拆分好，直接传入）"""
+        parts = [f"[{proj}]" for proj in projects]
+        parts.append(content)
+        parts.extend(f"#{tag}" for tag in tags)
+        if duration:
+            parts.append(f"@{InputParser.format_duration(duration)}")
         return ' '.join(parts)
     
     @staticmethod
@@ -86,3 +130,18 @@ class InputParser:
         end_date = start_date + timedelta(days=6)
         
         return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+    
+    @staticmethod
+    def extract_period_dates(period: str = "week") -> Tuple[str, str]:
+        """获取当前周期的起止日期（day 今天 / week 本周 / month 本月）"""
+        from datetime import datetime, timedelta
+        
+        today = datetime.now()
+        if period == "day":
+            return today.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+        if period == "month":
+            start_date = today.replace(day=1)
+            next_month = (start_date + timedelta(days=32)).replace(day=1)
+            end_date = next_month - timedelta(days=1)
+            return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        return InputParser.extract_week_dates()
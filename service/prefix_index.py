@@ -0,0 +1,47 @@
+import bisect
+from typing import Iterable, List, Tuple
+
+
+class PrefixIndex:
+    """内存前缀索引（有序数组 + 二分查找），用于项目名和标签的自动补全"""
+
+    def __init__(self, words: Iterable[str] = ()):
+        # 元素为 (小写键, 原始词)，按小写键排序，实现大小写不敏感的前缀匹配
+        self._entries: List[Tuple[str, str]] = []
+        self._keys = set()
+        self.load(words)
+
+    def load(self, words: Iterable[str]):
+        """批量加载词条（一次排序，避免逐个插入）"""
+        for word in words:
+            word = word.strip() if word else ''
+            if word and word.lower() not in self._keys:
+                self._keys.add(word.lower())
+                self._entries.append((word.lower(), word))
+        self._entries.sort()
+
+    def add(self, word: str) -> bool:
+        """增量插入一个词条，已存在时返回 False"""
+        word = word.strip() if word else ''
+        if not word or word.lower() in self._keys:
+            return False
+        self._keys.add(word.lower())
+        bisect.insort(self._entries, (word.lower(), word))
+        return True
+
+    def search(self, prefix: str, limit: int = 10) -> List[str]:
+        """返回以 prefix 开头的词条（按字母序，最多 limit 个）"""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._entries, (prefix, ''))
+        results = []
+        for key, word in self._entries[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            results.append(word)
+        return results
+
+    def __contains__(self, word: str) -> bool:
+        return bool(word) and word.lower() in self._keys
+
+    def __len__(self) -> int:
+        return len(self._entries)
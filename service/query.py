@@ -0,0 +1,238 @@
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from db.contents import content_sql
+from db.models import LogEntry
+
+# 全文索引表（存在时文本条件走 MATCH，否则退回 LIKE）
+FTS_TABLE = 'work_log_fts'
+# 全文索引只对不短于该长度的词生效（trigram 分词器的要求）
+FTS_MIN_TERM_LENGTH = 3
+# 编译结果缓存的条数
+COMPILE_CACHE_SIZE = 256
+
+# 一个查询词：[-][字段:]值，值可以用双引号包住（支持空格，\" 转义）
+_TOKEN_PATTERN = re.compile(r'(-?)(?:([A-Za-z_]+):)?("(?:[^"\\]|\\.)*"|\S+)')
+_RELATIVE_DATE = re.compile(r'-?(\d+)([dwm])')
+
+_FIELD_ALIASES = {
+    'project': 'project', 'p': 'project',
+    'tag': 'tag', 't': 'tag',
+    'since': 'since', 'from': 'since', 'after': 'since',
+    'until': 'until', 'to': 'until', 'before': 'until',
+    'on': 'on', 'date': 'on',
+    'text': 'text',
+}
+# 字段 -> (关联表, 键列, work_log 中的原始列)
+_LINK_FIELDS = {
+    'project': ('log_projects', 'name', 'project'),
+    'tag': ('log_tags', 'tag', 'tags'),
+}
+_NONE_VALUES = ('none', '无')
+
+
+class QueryError(ValueError):
+    """查询语句有误"""
+
+
+class QueryTerm(NamedTuple):
+    """解析后的一个查询条件"""
+    field: str
+    values: Tuple[str, ...]
+    negated: bool = False
+
+
+class CompiledQuery(NamedTuple):
+    """编译后的查询：where 为 SQL 条件（命名参数 :q0、:q1 …），params 为参数
+
+    params 只读，与其他参数合并时请复制：{**compiled.params, ...}
+    """
+    text: str
+    where: str
+    params: Mapping
+    terms: Tuple[QueryTerm, ...]
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.terms
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _month_end(day: date) -> date:
+    next_month = day.replace(day=28) + timedelta(days=4)
+    return next_month - timedelta(days=next_month.day)
+
+
+def _parse_date(value: str, today: date) -> Tuple[str, str]:
+    """日期值 -> (起始日期, 结束日期)
+
+    支持 2026-01-05、2026-01（整月）、2026（整年）、today/今天、yesterday/昨天、
+    week/本周、month/本月，以及相对日期 7d / 2w / 1m（若干天 / 周 / 月前）。
+    """
+    lowered = value.lower()
+    if lowered in ('today', '今天'):
+        first = last = today
+    elif lowered in ('yesterday', '昨天'):
+        first = last = today - timedelta(days=1)
+    elif lowered in ('week', '本周'):
+        first, last = today - timedelta(days=today.weekday()), today
+    elif lowered in ('month', '本月'):
+        first, last = today.replace(day=1), today
+    else:
+        relative = _RELATIVE_DATE.fullmatch(lowered)
+        if relative:
+            count, unit = int(relative.group(1)), relative.group(2)
+            first = today - timedelta(days=count * {'d': 1, 'w': 7, 'm': 30}[unit])
+            return first.isoformat(), first.isoformat()
+        try:
+            if re.fullmatch(r'\d{4}-\d{1,2}-\d{1,2}', value):
+                first = last = datetime.strptime(value, "%Y-%m-%d").date()
+            elif re.fullmatch(r'\d{4}-\d{1,2}', value):
+                first = datetime.strptime(value, "%Y-%m").date()
+                last = _month_end(first)
+            elif re.fullmatch(r'\d{4}', value):
+                first, last = date(int(value), 1, 1), date(int(value), 12, 31)
+            else:
+                raise ValueError(value)
+        except ValueError:
+            raise QueryError(f"无法识别的日期: {value}")
+    return first.isoformat(), last.isoformat()
+
+
+class QueryParser:
+    """解析筛选语句并编译为参数化 SQL 条件
+
+    语法示例：
+    - project:Unity tag:bug since:2026-01-01 until:2026-03-31 "回调"
+    - p:Unity,AOSP          多个值用逗号分隔，满足任一即可
+    - [Unity] #bug          与输入框相同的写法，等价于 project:Unity tag:bug
+    - project:none          没有项目的记录
+    - on:2026-03 / since:7d 整月 / 最近 7 天
+    - -tag:meeting 广告      前缀 - 表示排除；其余的词在内容中查找
+
+    所有条件之间是“并且”的关系。项目和标签走 log_projects / log_tags 关联表的主键，
+    日期走 idx_date，内容在存在全文索引表时用 MATCH，否则用 LIKE。
+    """
+
+    @staticmethod
+    def parse(text: str) -> List[QueryTerm]:
+        """把筛选语句拆分为条件列表"""
+        terms = []
+        for negated, field, raw in _TOKEN_PATTERN.findall(text or ''):
+            if not field and not raw.startswith('"'):
+                # 输入框写法：[项目]、#标签
+                if raw.startswith('[') and raw.endswith(']') and len(raw) > 2:
+                    field, raw = 'project', raw[1:-1]
+                elif raw.startswith('#') and len(raw) > 1:
+                    field, raw = 'tag', raw[1:]
+
+            name = _FIELD_ALIASES.get((field or 'text').lower())
+            if name is None:
+                raise QueryError(f"未知的筛选字段: {field}（可用：project、tag、since、until、on）")
+
+            value = _unquote(raw)
+            if name in _LINK_FIELDS:
+                values = tuple(v.strip() for v in value.split(',') if v.strip())
+            else:
+                values = (value,) if value else ()
+            if not values:
+                raise QueryError(f"筛选条件缺少值: {field or raw}")
+            terms.append(QueryTerm(name, values, bool(negated)))
+        return terms
+
+    @staticmethod
+    def compile(text: str, fts: bool = False, today: Optional[date] = None) -> CompiledQuery:
+        """编译筛选语句（结果按 语句、当天日期、是否有全文索引 缓存）
+
+        today 影响 today / 7d 等相对日期，默认取当天。
+        """
+        today = today or date.today()
+        return _compile_cached(' '.join((text or '').split()), today, fts)
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile_cached(text: str, today: date, fts: bool) -> CompiledQuery:
+    terms = QueryParser.parse(text)
+    params = {}
+
+    def bind(value) -> str:
+        name = f"q{len(params)}"
+        params[name] = value
+        return ':' + name
+
+    has_date = any(term.field in ('since', 'until', 'on') and not term.negated for term in terms)
+    conditions = []
+    for term in terms:
+        if term.field in _LINK_FIELDS:
+            table, key, column = _LINK_FIELDS[term.field]
+            if term.values[0].lower() in _NONE_VALUES and len(term.values) == 1:
+                condition = f"{column} IS NULL"
+            else:
+                placeholders = ', '.join(bind(v) for v in term.values)
+                if has_date:
+                    # 有日期条件时由 idx_date 驱动，逐行用关联表主键 (键, log_id) 探测
+                    condition = (f"EXISTS (SELECT 1 FROM {table} "
+                                 f"WHERE {key} IN ({placeholders}) AND log_id = work_log.id)")
+                else:
+                    # 否则由关联表主键取出 log_id 列表，再按主键取记录
+                    condition = f"id IN (SELECT log_id FROM {table} WHERE {key} IN ({placeholders}))"
+        elif term.field == 'text':
+            word = term.values[0]
+            if fts and len(word) >= FTS_MIN_TERM_LENGTH:
+                phrase = '"' + word.replace('"', '""') + '"'
+                condition = f"id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH {bind(phrase)})"
+            else:
+                # 紧凑存储的内容需要取出（解压）后再匹配；有其他条件时 SQLite 先用它们缩小范围
+                condition = f"{content_sql()} LIKE {bind('%' + _escape_like(word) + '%')} ESCAPE '\\'"
+        else:
+            first, last = _parse_date(term.values[0], today)
+            if term.field == 'since':
+                condition = f"date >= {bind(first)}"
+            elif term.field == 'until':
+                condition = f"date <= {bind(last)}"
+            elif first == last:
+                condition = f"date = {bind(first)}"
+            else:
+                condition = f"date BETWEEN {bind(first)} AND {bind(last)}"
+
+        conditions.append(f"NOT ({condition})" if term.negated else condition)
+
+    return CompiledQuery(
+        text=text,
+        where=' AND '.join(conditions) or '1',
+        params=MappingProxyType(params),
+        terms=tuple(terms),
+    )
+
+
+def compile_for(db, text: str) -> CompiledQuery:
+    """按数据库实际拥有的表（是否有全文索引）编译筛选语句"""
+    return QueryParser.compile(text, fts=db.has_table(FTS_TABLE))
+
+
+def search_logs(db, text: str, limit: Optional[int] = None) -> Iterator[LogEntry]:
+    """逐条产出满足筛选语句的日志（最新的在前）
+
+    db 可以是 Database，也可以是 db.snapshot() 得到的只读快照。
+    """
+    compiled = compile_for(db, text)
+    return db.iter_logs_where(compiled.where, dict(compiled.params), limit)
+
+
+def explain_query(db, text: str) -> List[str]:
+    """筛选语句的 SQL 及 SQLite 查询计划（EXPLAIN QUERY PLAN），用于确认走了索引"""
+    compiled = compile_for(db, text)
+    sql, plan = db.explain_logs_where(compiled.where, dict(compiled.params))
+    return [' '.join(sql.split())] + plan
@@ -1,89 +1,240 @@
-from datetime import datetime
-from typing import List, Dict
+import math
+import os
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, Iterator, Dict, List, Optional, Tuple
+from db.models import LogEntry
 from .parser import InputParser
+from .exporters import Block, BREAK, MarkdownExporter, get_exporter, link_block
+from .templates import TemplateLoader, BUILTIN_TEMPLATE_DIR
+from .query import compile_for
+
+# 进度回调：(百分比, 阶段说明)；回调中抛出 ReportCancelled 即可取消生成
+ProgressCallback = Callable[[int, str], None]
+# 附件链接：{log_id: [(文件名, 地址)]}
+AttachmentLinks = Dict[int, List[Tuple[str, str]]]
+
+# 报告周期：(文件名前缀, 报告名称, 本期, 下期)
+PERIODS = {
+    'week': ('week', '周报', '本周', '下周'),
+    'sprint': ('sprint', '迭代报告', '本迭代', '下个迭代'),
+    'month': ('month', '月报', '本月', '下月'),
+}
+# 迭代（sprint）的天数，从周一开始
+SPRINT_DAYS = 14
+
+
+class ReportCancelled(Exception):
+    """周报生成被用户取消"""
+
 
 class ReportGenerator:
     """周报生成器"""
     
     @staticmethod
-    def generate_weekly_report(logs: List[Dict], stats: Dict, start_date: str, end_date: str) -> str:
+    def iter_weekly_report_blocks(logs: Iterable[LogEntry], stats: Dict, start_date: str, end_date: str,
+                                  query: Optional[str] = None,
+                                  attachments: Optional[AttachmentLinks] = None,
+                                  period: str = 'week') -> Iterator[Block]:
         """
-        生成周报 Markdown 格式
+        按顺序逐块产出周报内容（与输出格式无关），供 Markdown/HTML/Word 导出共用
         
-        参数:
-            logs: 日志列表
-            stats: 统计信息
-            start_date: 开始日期
-            end_date: 结束日期
+        块的类型见 service/exporters.py：title / heading / subheading / item /
+        subitem / text / note，以及只影响 Markdown 空行的 break。
+        period 只影响标题和小节名称（见 PERIODS），批量生成迭代报告、月报时使用。
         """
-        # 按项目分组日志
+        _prefix, name, this_period, next_period = PERIODS[period]
+        
+        # 按项目分组日志（没有项目的记录归入“未分类”）
         projects_logs = {}
         for log in logs:
-            project = log.get('project', '未分类')
+            project = log.project or '未分类'
             if project not in projects_logs:
                 projects_logs[project] = []
             projects_logs[project].append(log)
         
-        # 构建周报
-        report_lines = []
-        
         # 标题
-        report_lines.append(f"# 周报（{start_date} ～ {end_date}）")
-        report_lines.append("")
+        yield ('title', f"{name}（{start_date} ～ {end_date}）")
+        yield BREAK
+        if query:
+            yield ('note', f"筛选条件：{query}")
+            yield BREAK
         
         # 本周完成
-        report_lines.append("## 一、本周完成")
-        report_lines.append("")
+        yield ('heading', f"一、{this_period}完成")
+        yield BREAK
         
         if not projects_logs:
-            report_lines.append("本周无工作记录")
-            report_lines.append("")
+            yield ('text', f"{this_period}无工作记录")
+            yield BREAK
         else:
             for project, project_logs in sorted(projects_logs.items()):
-                report_lines.append(f"### {project}")
+                yield ('subheading', project)
                 for log in project_logs:
-                    content = log.get('content', '')
+                    content = log.content
                     if content:
-                        report_lines.append(f"- {content}")
-                report_lines.append("")
+                        yield ('item', content)
+                        for name, url in (attachments or {}).get(log.id, ()):
+                            yield link_block(f"📎 {name}", url)
+                yield BREAK
         
         # 本周数据
-        report_lines.append("## 二、本周数据")
-        report_lines.append("")
+        yield ('heading', f"二、{this_period}数据")
+        yield BREAK
         
-        report_lines.append(f"- 总记录数：{stats.get('total_count', 0)}")
+        yield ('item', f"总记录数：{stats.get('total_count', 0)}")
+        
+        total_minutes = stats.get('total_minutes', 0)
+        if total_minutes:
+            yield ('item', f"总耗时（估算）：{InputParser.format_minutes(total_minutes)}")
         
         projects = stats.get('projects', [])
         if projects:
             projects_str = " / ".join(projects)
-            report_lines.append(f"- 涉及项目：{projects_str}")
+            yield ('item', f"涉及项目：{projects_str}")
         
         # 项目统计详情
         project_stats = stats.get('project_stats', [])
         if project_stats:
-            report_lines.append("- 项目分布：")
+            yield ('item', "项目分布：")
             for project, count in project_stats:
-                report_lines.append(f"  - {project}: {count} 条")
+                yield ('subitem', f"{project}: {count} 条")
+        
+        # 项目耗时（显式填写的耗时优先，其余按记录间隔估算）
+        project_minutes = stats.get('project_minutes', [])
+        if project_minutes:
+            yield ('item', "项目耗时：")
+            for project, minutes in project_minutes:
+                yield ('subitem', f"{project}: {InputParser.format_minutes(minutes)}")
         
-        report_lines.append("")
+        yield BREAK
         
         # 下周计划（预留部分）
-        report_lines.append("## 三、下周计划")
-        report_lines.append("")
-        report_lines.append("- [请填写下周计划]")
-        report_lines.append("")
+        yield ('heading', f"三、{next_period}计划")
+        yield BREAK
+        yield ('item', f"[请填写{next_period}计划]")
+        yield BREAK
         
         # 生成时间
         generated_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        report_lines.append(f"*生成时间：{generated_time}*")
+        yield ('note', f"生成时间：{generated_time}")
+    
+    @staticmethod
+    def generate_weekly_report(logs: Iterable[LogEntry], stats: Dict, start_date: str, end_date: str,
+                               query: Optional[str] = None,
+                               attachments: Optional[AttachmentLinks] = None) -> str:
+        """
+        生成周报 Markdown 格式
+        
+        参数:
+            logs: 日志列表
+            stats: 统计信息
+            start_date: 开始日期
+            end_date: 结束日期
+            query: 筛选条件（写在标题下方）
+            attachments: 附件链接（列在对应记录下方）
+        """
+        blocks = ReportGenerator.iter_weekly_report_blocks(logs, stats, start_date, end_date, query, attachments)
+        return "\n".join(MarkdownExporter.iter_lines(blocks))
+    
+    @staticmethod
+    def build_report_context(logs: Iterable[LogEntry], stats: Dict, start_date: str, end_date: str,
+                             query: Optional[str] = None) -> Dict:
+        """构建报告模板的上下文变量（见 service/report_templates/ 中的示例）"""
+        logs = list(logs)
+        groups = {}
+        for log in logs:
+            groups.setdefault(log.project or '未分类', []).append(log)
+        
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'query': query or '',
+            'logs': logs,
+            'groups': [{'project': project, 'logs': project_logs}
+                       for project, project_logs in sorted(groups.items())],
+            'total_count': stats.get('total_count', 0),
+            'projects': stats.get('projects', []),
+            'project_stats': [{'project': project, 'count': count}
+                              for project, count in stats.get('project_stats', [])],
+            'total_minutes': stats.get('total_minutes', 0),
+            'project_minutes': [{'project': project, 'minutes': minutes}
+                                for project, minutes in stats.get('project_minutes', [])],
+            # 每条记录的耗时 {id: 分钟}、附件 {id: [{name, url}]}，按模板生成报告时填充
+            'durations': {},
+            'attachments': {},
+            'generated_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    
+    @staticmethod
+    def generate_and_export_templated_report(db, template: str, loader: TemplateLoader = None,
+                                             start_date: str = None, end_date: str = None,
+                                             progress: Optional[ProgressCallback] = None,
+                                             query: Optional[str] = None):
+        """按模板生成并导出报告
+        
+        template 为模板名称（如 daily / monthly / project）或模板文件路径；
+        未指定日期时按模板声明的周期（{# period: ... #}）取当前日、周或月。
+        query 为筛选语句（语法见 service/query.py），只统计满足条件的记录。
+        模板编译结果按文件修改时间缓存，渲染结果直接流式写入文件。
+        """
+        def report_progress(percent: int, stage: str):
+            if progress:
+                progress(percent, stage)
         
-        return "\n".join(report_lines)
+        loader = loader or TemplateLoader([BUILTIN_TEMPLATE_DIR])
+        report_progress(0, "加载模板")
+        compiled = loader.load(template)
+        
+        if not start_date or not end_date:
+            start_date, end_date = InputParser.extract_period_dates(compiled.period)
+        
+        where, params = ReportGenerator._compile_filter(db, query)
+        if where is None:
+            query = None
+        report_progress(10, "查询记录")
+        logs = db.get_logs_by_date_range(start_date, end_date, where, params)
+        report_progress(40, "统计数据")
+        stats = db.get_weekly_stats(start_date, end_date, where, params)
+        
+        report_progress(70, "生成并写入文件")
+        context = ReportGenerator.build_report_context(logs, stats, start_date, end_date, query)
+        context['durations'] = db.get_entry_durations(start_date, end_date, where, params)
+        context['attachments'] = {
+            log_id: [{'name': name, 'url': url} for name, url in links]
+            for log_id, links in ReportGenerator.attachment_links(db, start_date, end_date, where, params).items()
+        }
+        name = os.path.basename(compiled.path).split('.', 1)[0]
+        ext = TemplateLoader.output_extension(compiled.path)
+        suffix = "_filtered" if query else ""
+        filepath = compiled.render_to_file(context, f"export/{name}_report_{start_date}_to_{end_date}{suffix}{ext}")
+        
+        return filepath, None
+    
+    @staticmethod
+    def _compile_filter(db, query: Optional[str]):
+        """筛选语句 -> (where, params)；没有筛选条件时返回 (None, None)"""
+        if not query or not query.strip():
+            return None, None
+        compiled = compile_for(db, query)
+        if compiled.is_empty:
+            return None, None
+        return compiled.where, dict(compiled.params)
+    
+    @staticmethod
+    def attachment_links(db, start_date: str, end_date: str,
+                         where: Optional[str] = None, params: Optional[Dict] = None) -> AttachmentLinks:
+        """日期范围内各条记录的附件链接（只查询引用表，不读取附件内容）"""
+        store = getattr(db, 'attachments', None)
+        if store is None:
+            return {}
+        return {
+            log_id: [(item.name, store.uri_for(item.sha256)) for item in items]
+            for log_id, items in db.get_attachments_by_date_range(start_date, end_date, where, params).items()
+        }
     
     @staticmethod
     def export_to_file(report_content: str, filepath: str = "export/week_report.md"):
         """将周报导出到文件"""
-        import os
-        
         # 确保导出目录存在
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
@@ -93,21 +244,154 @@ class ReportGenerator:
         return filepath
     
     @staticmethod
-    def generate_and_export_weekly_report(db, start_date: str = None, end_date: str = None):
-        """生成并导出周报"""
+    def export_blocks(blocks: Iterator[Block], filepath: str) -> str:
+        """把内容块流式导出到文件，格式由扩展名决定（.md / .html / .docx）"""
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        get_exporter(filepath).export(blocks, filepath)
+        return filepath
+    
+    @staticmethod
+    def generate_and_export_weekly_report(db, start_date: str = None, end_date: str = None,
+                                          progress: Optional[ProgressCallback] = None,
+                                          fmt: str = "md", query: Optional[str] = None):
+        """生成并导出周报
+        
+        db 可以是 Database，也可以是 db.snapshot() 得到的只读快照（后台线程中使用）。
+        progress 会在每个阶段开始时被调用。
+        fmt 为 md / html / docx；后两种格式直接把内容块流式写入文件，返回的 report 为 None。
+        query 为筛选语句（如 "project:Unity tag:bug"），只统计满足条件的记录。
+        """
+        def report_progress(percent: int, stage: str):
+            if progress:
+                progress(percent, stage)
+        
         # 如果没有提供日期，使用本周
         if not start_date or not end_date:
             start_date, end_date = InputParser.extract_week_dates()
         
-        # 获取日志和统计
-        logs = db.get_logs_by_date_range(start_date, end_date)
-        stats = db.get_weekly_stats(start_date, end_date)
+        # 获取日志和统计（日志按需从游标逐条读取，生成报告时才真正取数）
+        where, params = ReportGenerator._compile_filter(db, query)
+        if where is None:
+            query = None
+        report_progress(0, "统计数据")
+        stats = db.get_weekly_stats(start_date, end_date, where, params)
+        report_progress(30, "查询记录")
+        logs = db.iter_logs_by_date_range(start_date, end_date, where, params)
+        attachments = ReportGenerator.attachment_links(db, start_date, end_date, where, params)
+        
+        suffix = "_filtered" if query else ""
+        filename = f"export/week_report_{start_date}_to_{end_date}{suffix}.{fmt}"
+        
+        if fmt != "md":
+            # 边生成边写入，不在内存中拼接整份文档
+            report_progress(60, "生成并写入文件")
+            blocks = ReportGenerator.iter_weekly_report_blocks(logs, stats, start_date, end_date, query, attachments)
+            filepath = ReportGenerator.export_blocks(blocks, filename)
+            return filepath, None
         
         # 生成周报
-        report = ReportGenerator.generate_weekly_report(logs, stats, start_date, end_date)
+        report_progress(60, "生成周报")
+        report = ReportGenerator.generate_weekly_report(logs, stats, start_date, end_date, query, attachments)
         
         # 导出到文件
-        filename = f"export/week_report_{start_date}_to_{end_date}.md"
+        report_progress(85, "写入文件")
         filepath = ReportGenerator.export_to_file(report, filename)
         
         return filepath, report
+    
+    @staticmethod
+    def split_periods(start_date: str, end_date: str, period: str = 'week') -> List[Tuple[str, str]]:
+        """把日期范围切分为完整的周期 [(起, 止)]
+        
+        首尾扩展到完整的周期（周和迭代从周一开始，月为自然月），
+        每个周期的起止日期与单独生成该周期报告时相同。
+        """
+        if period not in PERIODS:
+            raise ValueError(f"未知的报告周期: {period}")
+        first = date.fromisoformat(start_date)
+        last = date.fromisoformat(end_date)
+        
+        periods = []
+        if period == 'month':
+            current = first.replace(day=1)
+            while current <= last:
+                following = (current + timedelta(days=32)).replace(day=1)
+                periods.append((current.isoformat(), (following - timedelta(days=1)).isoformat()))
+                current = following
+            return periods
+        
+        days = 7 if period == 'week' else SPRINT_DAYS
+        current = first - timedelta(days=first.weekday())
+        while current <= last:
+            periods.append((current.isoformat(), (current + timedelta(days=days - 1)).isoformat()))
+            current += timedelta(days=days)
+        return periods
+    
+    @staticmethod
+    def stats_from_entries(entries: Iterable[Tuple[LogEntry, float]]) -> Dict:
+        """由 (日志, 耗时分钟) 计算与 Database.get_weekly_stats 相同结构的统计"""
+        counts: Dict[Optional[str], int] = {}
+        minutes: Dict[Optional[str], float] = {}
+        total_count = 0
+        for log, log_minutes in entries:
+            project = log.project
+            counts[project] = counts.get(project, 0) + 1
+            minutes[project] = minutes.get(project, 0.0) + log_minutes
+            total_count += 1
+        
+        # 与 SQLite 的 ROUND 一致：耗时非负，四舍五入
+        rounded = {project: int(math.floor(value + 0.5)) for project, value in minutes.items()}
+        return {
+            'total_count': total_count,
+            'project_stats': sorted(((p, c) for p, c in counts.items() if p is not None),
+                                    key=lambda item: (-item[1], item[0])),
+            'projects': sorted(p for p in counts if p is not None),
+            'total_minutes': sum(rounded.values()),
+            'project_minutes': sorted(((p, m) for p, m in rounded.items() if p is not None),
+                                      key=lambda item: (-item[1], item[0])),
+        }
+    
+    @staticmethod
+    def generate_and_export_batch_reports(db, start_date: str, end_date: str, period: str = 'week',
+                                          progress: Optional[ProgressCallback] = None,
+                                          fmt: str = "md", query: Optional[str] = None) -> List[str]:
+        """批量生成一段时间内每个周期（week / sprint / month）的报告，返回文件路径列表
+        
+        不再逐个周期查询：整个范围的记录和每条记录的耗时在一次有序扫描中读出，
+        在周期边界处切分，边读边统计并写出该周期的报告文件；附件引用也只查询一次。
+        文件名与单独生成时相同（如 export/week_report_<起>_to_<止>.md），已有文件会被覆盖。
+        """
+        def report_progress(percent: int, stage: str):
+            if progress:
+                progress(percent, stage)
+        
+        periods = ReportGenerator.split_periods(start_date, end_date, period)
+        if not periods:
+            return []
+        first, last = periods[0][0], periods[-1][1]
+        
+        where, params = ReportGenerator._compile_filter(db, query)
+        if where is None:
+            query = None
+        report_progress(0, "查询记录")
+        attachments = ReportGenerator.attachment_links(db, first, last, where, params)
+        rows = db.iter_logs_with_minutes(first, last, where, params)
+        
+        prefix = PERIODS[period][0]
+        suffix = "_filtered" if query else ""
+        paths = []
+        pending = next(rows, None)
+        for index, (period_start, period_end) in enumerate(periods):
+            report_progress(index * 100 // len(periods), f"{period_start} ～ {period_end}")
+            entries = []
+            while pending is not None and pending[0].date <= period_end:
+                entries.append(pending)
+                pending = next(rows, None)
+            
+            stats = ReportGenerator.stats_from_entries(entries)
+            blocks = ReportGenerator.iter_weekly_report_blocks(
+                [log for log, _minutes in entries], stats, period_start, period_end, query, attachments, period
+            )
+            filename = f"export/{prefix}_report_{period_start}_to_{period_end}{suffix}.{fmt}"
+            paths.append(ReportGenerator.export_blocks(blocks, filename))
+        return paths
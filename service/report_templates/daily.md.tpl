@@ -0,0 +1,23 @@
+{# period: day #}
+# 日报 {{ start_date }}
+
+## 今日完成
+{% if not logs %}
+
+今日无工作记录
+{% endif %}
+{% for group in groups %}
+
+**{{ group.project }}**
+{% for log in group.logs %}
+- {{ log.content }}{% if log.tags %}（{{ join(log.tags) }}）{% endif %}{% if log.id in durations %} · {{ fmt_minutes(durations[log.id]) }}{% endif %}
+{% endfor %}
+{% endfor %}
+
+## 明日计划
+
+- [请填写明日计划]
+
+## 需要协助
+
+- 无
@@ -0,0 +1,34 @@
+{# period: month #}
+# 月报（{{ start_date }} ～ {{ end_date }}）
+
+{% if query %}
+*筛选条件：{{ query }}*
+
+{% endif %}## 一、本月概览
+
+- 总记录数：{{ total_count }}
+- 涉及项目：{{ len(projects) }} 个
+{% for stat in project_stats %}
+  - {{ stat.project }}: {{ stat.count }} 条（{{ round(stat.count * 100 / total_count) }}%）
+{% endfor %}
+{% if total_minutes %}
+- 总耗时（估算）：{{ fmt_minutes(total_minutes) }}
+{% for stat in project_minutes %}
+  - {{ stat.project }}: {{ fmt_minutes(stat.minutes) }}
+{% endfor %}
+{% endif %}
+
+## 二、分项目工作内容
+{% for group in groups %}
+
+### {{ group.project }}（{{ len(group.logs) }} 条）
+{% for log in group.logs %}
+- {{ log.date }} {{ log.content }}
+{% endfor %}
+{% endfor %}
+
+## 三、下月计划
+
+- [请填写下月计划]
+
+*生成时间：{{ generated_time }}*
@@ -0,0 +1,21 @@
+{# period: week #}
+# 项目周报（{{ start_date }} ～ {{ end_date }}）
+{% for group in groups %}
+
+## {{ group.project }}
+
+进展（{{ len(group.logs) }} 条记录）：
+{% for log in group.logs %}
+- [{{ log.date }}] {{ log.content }}{% if log.tags %} `{{ join(log.tags) }}`{% endif %}
+{% endfor %}
+
+风险与问题：
+
+- [请填写]
+{% endfor %}
+{% if not groups %}
+
+本周无工作记录
+{% endif %}
+
+*生成时间：{{ generated_time }}*
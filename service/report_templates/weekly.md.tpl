@@ -0,0 +1,50 @@
+{# period: week #}
+{# 与内置周报相同的版式，可复制到用户数据目录的 templates/ 下修改 #}
+# 周报（{{ start_date }} ～ {{ end_date }}）
+
+{% if query %}
+*筛选条件：{{ query }}*
+
+{% endif %}## 一、本周完成
+
+{% if not groups %}
+本周无工作记录
+
+{% endif %}
+{% for group in groups %}
+### {{ group.project }}
+{% for log in group.logs %}
+- {{ log.content }}
+{% for file in attachments.get(log.id, []) %}
+  - [📎 {{ md_link_text(file.name) }}](<{{ file.url }}>)
+{% endfor %}
+{% endfor %}
+
+{% endfor %}
+## 二、本周数据
+
+- 总记录数：{{ total_count }}
+{% if total_minutes %}
+- 总耗时（估算）：{{ fmt_minutes(total_minutes) }}
+{% endif %}
+{% if projects %}
+- 涉及项目：{{ join(projects, " / ") }}
+{% endif %}
+{% if project_stats %}
+- 项目分布：
+{% for stat in project_stats %}
+  - {{ stat.project }}: {{ stat.count }} 条
+{% endfor %}
+{% endif %}
+{% if project_minutes %}
+- 项目耗时：
+{% for stat in project_minutes %}
+  - {{ stat.project }}: {{ fmt_minutes(stat.minutes) }}
+{% endfor %}
+{% endif %}
+
+## 三、下周计划
+
+- [请填写下周计划]
+
+*生成时间：{{ generated_time }}*
@@ -0,0 +1,260 @@
+import ast
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .parser import InputParser
+from .exporters import markdown_link_text
+
+
+class TemplateError(Exception):
+    """模板语法错误"""
+
+
+class AttrDict(dict):
+    """允许在模板中用 log.content 的写法访问字典键"""
+
+    def __getattr__(self, name):
+        try:
+            return _wrap(self[name])
+        except KeyError:
+            raise AttributeError(name)
+
+
+def _wrap(value):
+    if isinstance(value, dict) and not isinstance(value, AttrDict):
+        return AttrDict(value)
+    return value
+
+
+def _join(values, sep: str = ", ") -> str:
+    return sep.join(str(v) for v in values or [])
+
+
+# 模板中可直接使用的函数
+HELPERS: Dict[str, Any] = {
+    'len': len,
+    'sum': sum,
+    'min': min,
+    'max': max,
+    'sorted': sorted,
+    'enumerate': enumerate,
+    'range': range,
+    'round': round,
+    'str': str,
+    'int': int,
+    'join': _join,
+    'fmt_minutes': InputParser.format_minutes,
+    'md_link_text': markdown_link_text,
+    'True': True,
+    'False': False,
+    'None': None,
+}
+
+_TOKEN_RE = re.compile(r'({{.*?}}|{%.*?%}|{#.*?#})', re.S)
+# 独占一行的 {% %} / {# #} 标签不输出该行的缩进和换行
+_BLOCK_LINE_RE = re.compile(r'^[ \t]*({%.*?%}|{#.*?#})[ \t]*\r?\n', re.M | re.S)
+_PERIOD_RE = re.compile(r'{#\s*period:\s*(\w+)\s*#}')
+
+
+class Template:
+    """编译后的报告模板
+
+    语法：
+        {{ 表达式 }}                          输出表达式的值
+        {% for x in 表达式 %}...{% endfor %}  循环
+        {% if 表达式 %}...{% elif 表达式 %}...{% else %}...{% endif %}
+        {# 注释 #}                            注释；{# period: day|week|month #} 声明报告周期
+
+    模板在加载时被编译成一个 Python 生成器函数，渲染时逐段产出文本，
+    可以直接写入文件而不必先拼接成完整字符串。
+    """
+
+    def __init__(self, source: str, name: str = '<template>'):
+        self.name = name
+        match = _PERIOD_RE.search(source)
+        self.period = match.group(1) if match else 'week'
+        self.code = self._generate(source)
+
+        namespace: Dict[str, Any] = {'__builtins__': {}, '_w': _wrap, '_s': str}
+        namespace.update(HELPERS)
+        try:
+            exec(compile(self.code, name, 'exec'), namespace)
+        except SyntaxError as e:
+            raise TemplateError(f"{name}: 模板编译失败: {e}")
+        self._func: Callable[[Dict[str, Any]], Iterator[str]] = namespace['_render']
+
+    @staticmethod
+    def _check_expr(expr: str, name: str) -> ast.AST:
+        try:
+            return ast.parse(expr.strip(), mode='eval')
+        except SyntaxError:
+            raise TemplateError(f"{name}: 无效的表达式: {expr.strip()}")
+
+    def _generate(self, source: str) -> str:
+        """把模板翻译成 Python 生成器函数的源码"""
+        source = _BLOCK_LINE_RE.sub(r'\1', source)
+
+        body: List[str] = []
+        stack: List[str] = []
+        free_names: List[str] = []
+        bound = set()
+
+        # 相邻的文本和表达式合并成一次 yield，减少生成器切换次数
+        pending: List[str] = []
+
+        def flush():
+            if pending:
+                body.append('    ' * (len(stack) + 1) + 'yield ' + ' + '.join(pending))
+                pending.clear()
+
+        def emit(line: str):
+            flush()
+            body.append('    ' * (len(stack) + 1) + line)
+
+        def use(expr: str) -> str:
+            tree = self._check_expr(expr, self.name)
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Name) and node.id not in HELPERS and node.id not in free_names:
+                    free_names.append(node.id)
+            return expr.strip()
+
+        for token in _TOKEN_RE.split(source):
+            if not token:
+                continue
+            if token.startswith('{#'):
+                continue
+            if token.startswith('{{'):
+                pending.append(f'_s({use(token[2:-2])})')
+                continue
+            if not token.startswith('{%'):
+                pending.append(repr(token))
+                continue
+
+            statement = token[2:-2].strip()
+            keyword = statement.split(None, 1)[0] if statement else ''
+            rest = statement[len(keyword):].strip()
+
+            if keyword == 'for':
+                match = re.match(r'(\w+)\s+in\s+(.+)$', rest, re.S)
+                if not match:
+                    raise TemplateError(f"{self.name}: 无效的 for 语句: {statement}")
+                var, expr = match.groups()
+                emit(f'for {var} in {use(expr)}:')
+                stack.append('for')
+                bound.add(var)
+                emit(f'{var} = _w({var})')
+            elif keyword == 'if':
+                emit(f'if {use(rest)}:')
+                stack.append('if')
+                emit('pass')
+            elif keyword in ('elif', 'else'):
+                if not stack or stack[-1] != 'if':
+                    raise TemplateError(f"{self.name}: {keyword} 没有对应的 if")
+                stack.pop()
+                emit(f'elif {use(rest)}:' if keyword == 'elif' else 'else:')
+                stack.append('if')
+                emit('pass')
+            elif keyword in ('endfor', 'endif'):
+                if not stack or stack[-1] != keyword[3:]:
+                    raise TemplateError(f"{self.name}: 多余的 {keyword}")
+                flush()
+                stack.pop()
+            else:
+                raise TemplateError(f"{self.name}: 不支持的语句: {statement}")
+
+        if stack:
+            raise TemplateError(f"{self.name}: 缺少 end{stack[-1]}")
+        flush()
+
+        header = ['def _render(_ctx):']
+        for name in free_names:
+            if name not in bound:
+                header.append(f'    {name} = _w(_ctx.get({name!r}))')
+        header.append('    if False:')
+        header.append('        yield ""')
+        return '\n'.join(header + body) + '\n'
+
+    def iter_render(self, context: Dict[str, Any]) -> Iterator[str]:
+        """逐段渲染"""
+        return self._func(context)
+
+    def render(self, context: Dict[str, Any]) -> str:
+        return ''.join(self._func(context))
+
+    def render_to_file(self, context: Dict[str, Any], filepath: str) -> str:
+        """渲染结果直接流式写入文件"""
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for chunk in self._func(context):
+                f.write(chunk)
+        return filepath
+
+
+class TemplateLoader:
+    """按名称查找模板，并按文件修改时间缓存编译结果
+
+    模板文件命名为 <名称>.<输出扩展名>.tpl，例如 daily.md.tpl；
+    search_dirs 中靠前的目录优先（用户模板可以覆盖内置模板）。
+    """
+
+    TEMPLATE_SUFFIX = '.tpl'
+
+    def __init__(self, search_dirs: Sequence[str]):
+        self.search_dirs = list(search_dirs)
+        self._cache: Dict[str, Tuple[int, int, Template]] = {}
+        self._lock = threading.Lock()
+
+    def list_templates(self) -> List[str]:
+        """列出所有可用模板名称"""
+        names = []
+        for directory in self.search_dirs:
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith(self.TEMPLATE_SUFFIX):
+                    name = filename.split('.', 1)[0]
+                    if name not in names:
+                        names.append(name)
+        return names
+
+    def find(self, name: str) -> Optional[str]:
+        """模板名称 -> 文件路径"""
+        for directory in self.search_dirs:
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith(self.TEMPLATE_SUFFIX) and filename.split('.', 1)[0] == name:
+                    return os.path.join(directory, filename)
+        return None
+
+    @staticmethod
+    def output_extension(path: str) -> str:
+        """daily.md.tpl -> .md"""
+        inner = os.path.basename(path)[:-len(TemplateLoader.TEMPLATE_SUFFIX)]
+        ext = os.path.splitext(inner)[1]
+        return ext or '.txt'
+
+    def load(self, name_or_path: str) -> Template:
+        """加载模板；文件未修改时直接返回缓存的编译结果"""
+        path = name_or_path if os.path.isfile(name_or_path) else self.find(name_or_path)
+        if not path:
+            raise TemplateError(f"找不到模板: {name_or_path}")
+
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                return cached[2]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            template = Template(f.read(), os.path.basename(path))
+        template.path = path
+
+        with self._lock:
+            self._cache[path] = (stat.st_mtime_ns, stat.st_size, template)
+        return template
+
+
+BUILTIN_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_templates')
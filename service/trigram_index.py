@@ -0,0 +1,112 @@
+import math
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class Suggestion(NamedTuple):
+    """一条可复用的历史记录"""
+    content: str
+    project: Optional[str]
+    tags: Optional[str]
+    uses: int
+    score: float
+
+
+def _normalize(text: str) -> str:
+    return ' '.join((text or '').lower().split())
+
+
+def _grams(text: str) -> set:
+    """三字符切片；前面补一个空格，让开头的字也能参与匹配"""
+    text = ' ' + text
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """历史记录内容的内存三元组索引，用于容错的“重复上一条”提示
+
+    不依赖分词：中文、英文和混排文本都按连续三个字符切片，
+    少量错别字只会影响包含该字的几个切片。相同（内容, 项目, 标签）的记录
+    只保留一个条目并累计使用次数；新增记录时增量更新倒排表。
+    """
+
+    # 至少命中查询中多少比例的切片才算候选
+    MIN_SIMILARITY = 0.4
+    # 常见切片的倒排表可能很长，最多检查这么多个候选（从最近的记录开始）
+    MAX_CANDIDATES = 2000
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[str], Optional[str], int]] = ()):
+        # 条目编号 -> [原始内容, 项目, 标签, 使用次数, 最近使用序号, 规范化文本]
+        self._entries: List[list] = []
+        self._ids: Dict[Tuple[str, Optional[str], Optional[str]], int] = {}
+        self._postings: Dict[str, array] = {}
+        self._seq = 0
+        self.load(entries)
+
+    def load(self, entries: Iterable[Tuple[str, Optional[str], Optional[str], int]]):
+        """批量加载 (内容, 项目, 标签, 使用次数)，按时间先后排列"""
+        for content, project, tags, uses in entries:
+            self.add(content, project, tags, uses)
+
+    def add(self, content: str, project: Optional[str] = None, tags: Optional[str] = None,
+            uses: int = 1) -> bool:
+        """增量加入一条记录；已存在相同条目时只更新使用次数，返回 False"""
+        content = (content or '').strip()
+        if not content:
+            return False
+
+        self._seq += 1
+        key = (content, project or None, tags or None)
+        entry_id = self._ids.get(key)
+        if entry_id is not None:
+            entry = self._entries[entry_id]
+            entry[3] += uses
+            entry[4] = self._seq
+            return False
+
+        entry_id = len(self._entries)
+        text = _normalize(content)
+        self._entries.append([content, project or None, tags or None, uses, self._seq, ' ' + text])
+        self._ids[key] = entry_id
+        for gram in _grams(text):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('I')
+            posting.append(entry_id)
+        return True
+
+    def search(self, query: str, limit: int = 8) -> List[Suggestion]:
+        """按相似度返回历史记录，相似度相同时常用、最近的排在前面"""
+        query_grams = _grams(_normalize(query))
+        if not query_grams:
+            return []
+
+        total = len(query_grams)
+        need = max(1, math.ceil(total * self.MIN_SIMILARITY))
+
+        # 命中 need 个切片的条目，一定出现在最短的 total - need + 1 个倒排表之一中
+        postings = sorted((self._postings.get(g, ()) for g in query_grams), key=len)
+        candidates = set()
+        for posting in postings[:total - need + 1]:
+            # 倒排表按加入顺序排列，从尾部取最近的条目
+            candidates.update(posting[-self.MAX_CANDIDATES:])
+            if len(candidates) >= self.MAX_CANDIDATES:
+                break
+
+        scored = []
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            text = entry[5]
+            hits = sum(1 for g in query_grams if g in text)
+            if hits >= need:
+                scored.append((hits / total, entry[3], entry[4], entry_id))
+
+        scored.sort(reverse=True)
+        results = []
+        for score, uses, _seq, entry_id in scored[:limit]:
+            content, project, tags = self._entries[entry_id][:3]
+            results.append(Suggestion(content, project, tags, uses, score))
+        return results
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+EXE_SUFFIX = '.exe' if sys.platform == 'win32' else ''
+
+# 各启动方式的命令（打包产物见 build_exe.py）
+MODES = {
+    'source': [sys.executable, os.path.join(ROOT, 'main.py')],
+    'onefile': [os.path.join(ROOT, 'dist', 'WorkTag' + EXE_SUFFIX)],
+    'fast': [os.path.join(ROOT, 'dist', 'onedir', 'WorkTag', 'WorkTag' + EXE_SUFFIX)],
+}
+
+# 阶段：(名称, 起点, 终点)；起点 launch 为测量脚本启动进程的时间
+STAGES = [
+    ('解释器启动', 'launch', 'main'),
+    ('导入模块', 'main', 'imports'),
+    ('创建 QApplication', 'imports', 'qapplication'),
+    ('打开数据库', 'qapplication', 'database'),
+    ('创建主窗口', 'database', 'main_window'),
+    ('首次绘制', 'main_window', 'first_paint'),
+]
+
+# 与上次记录相比变慢超过这个比例时提示
+REGRESSION_RATIO = 0.2
+
+
+def measure_once(command, db_path: str, timeout: float) -> dict:
+    """启动一次程序，返回各时间点（相对启动时刻，毫秒）"""
+    fd, probe_path = tempfile.mkstemp(suffix='.json', prefix='worktag_startup_')
+    os.close(fd)
+    os.remove(probe_path)
+    env = dict(os.environ, WORKTAG_STARTUP_PROBE=probe_path, WORKTAG_DB_PATH=db_path)
+    try:
+        launched = time.time()
+        process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            _, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise RuntimeError(f"{timeout:.0f} 秒内没有完成首次绘制")
+
+        if not os.path.exists(probe_path):
+            detail = stderr.decode('utf-8', 'replace').strip().splitlines()[-1:] or ["（可能已有 WorkTag 在运行，请先退出）"]
+            raise RuntimeError(f"程序退出（返回码 {process.returncode}）但没有写出测量结果：{detail[0]}")
+        with open(probe_path, encoding='utf-8') as f:
+            marks = dict(json.load(f)['marks'])
+    finally:
+        if os.path.exists(probe_path):
+            os.remove(probe_path)
+
+    times = {'launch': 0.0}
+    times.update({stage: (at - launched) * 1000 for stage, at in marks.items()})
+    return times
+
+
+def summarize(runs) -> dict:
+    """首次启动和其余各次的中位数（首次通常最慢：文件还不在系统缓存中）"""
+    warm = runs[1:] or runs
+    result = {
+        'first_ms': round(runs[0]['first_paint']),
+        'median_ms': round(statistics.median(r['first_paint'] for r in warm)),
+        'min_ms': round(min(r['first_paint'] for r in runs)),
+        'stages_ms': {},
+    }
+    for name, start, end in STAGES:
+        values = [r[end] - r[start] for r in warm if start in r and end in r]
+        if values:
+            result['stages_ms'][name] = round(statistics.median(values))
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return ''
+
+
+def previous_results(history_path: str, machine: str) -> dict:
+    """历史记录中本机各启动方式最近一次的结果"""
+    latest = {}
+    if not os.path.exists(history_path):
+        return latest
+    with open(history_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('machine') == machine:
+                latest[record['mode']] = record
+    return latest
+
+
+def run_bench(modes, runs: int = 5, db_path: str = None, timeout: float = 60.0,
+              history_path: str = 'startup_history.jsonl') -> bool:
+    """依次测量各启动方式从启动进程到主窗口首次绘制完成的时间，结果追加到历史记录
+
+    数据库默认使用临时目录中的新库（不会读写真实数据）；指定 db_path 时复制一份使用。
+    返回是否有启动方式比本机上次的记录明显变慢。
+    """
+    machine = platform.node()
+    previous = previous_results(history_path, machine)
+    regressed = False
+    work_dir = tempfile.mkdtemp(prefix='worktag_bench_')
+    try:
+        for mode in modes:
+            command = MODES[mode]
+            if not os.path.exists(command[-1]):
+                print(f"[{mode}] 跳过：{command[-1]} 不存在（先运行 python build_exe.py --mode {mode}）")
+                continue
+
+            bench_db = os.path.join(work_dir, mode, 'worklog.db')
+            os.makedirs(os.path.dirname(bench_db), exist_ok=True)
+            if db_path:
+                shutil.copy2(db_path, bench_db)
+
+            results = []
+            try:
+                for index in range(runs):
+                    results.append(measure_once(command, bench_db, timeout))
+                    print(f"\r[{mode}] 第 {index + 1}/{runs} 次：{results[-1]['first_paint']:.0f}ms",
+                          end='', flush=True)
+            except RuntimeError as e:
+                print(f"\n[{mode}] 失败：{e}")
+                continue
+            print()
+
+            summary = summarize(results)
+            stages = '，'.join(f"{name} {ms}ms" for name, ms in summary['stages_ms'].items())
+            print(f"[{mode}] 首次 {summary['first_ms']}ms，中位数 {summary['median_ms']}ms，"
+                  f"最快 {summary['min_ms']}ms")
+            print(f"        {stages}")
+
+            last = previous.get(mode)
+            if last and last.get('median_ms'):
+                change = summary['median_ms'] / last['median_ms'] - 1
+                note = f"与上次（{last.get('revision') or '?'}，{last['median_ms']}ms）相比 {change:+.0%}"
+                if change > REGRESSION_RATIO:
+                    regressed = True
+                    note += "，启动变慢了"
+                print(f"        {note}")
+
+            record = {
+                'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'machine': machine,
+                'platform': platform.platform(),
+                'revision': git_revision(),
+                'mode': mode,
+                'runs': runs,
+                **summary,
+            }
+            with open(history_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="测量 WorkTag 各启动方式的冷启动时间（启动进程 -> 主窗口首次绘制完成）",
+        epilog="示例: python startup_bench.py source fast --runs 10",
+    )
+    parser.add_argument("modes", nargs="*",
+                        help="启动方式：source（python main.py）、onefile、fast（见 build_exe.py），默认全部")
+    parser.add_argument("--runs", type=int, default=5, help="每种方式启动的次数")
+    parser.add_argument("--db", help="复制该数据库用于测量（默认使用新建的空库）")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单次启动的超时（秒）")
+    parser.add_argument("--history", default="startup_history.jsonl", help="结果历史记录文件（JSON Lines）")
+    args = parser.parse_args()
+    unknown = [mode for mode in args.modes if mode not in MODES]
+    if unknown:
+        parser.error(f"未知的启动方式: {', '.join(unknown)}（可选 {', '.join(MODES)}）")
+    if run_bench(args.modes or list(MODES), args.runs, args.db, args.timeout, args.history):
+        sys.exit(3)
@@ -0,0 +1,118 @@
+import os
+import tempfile
+from typing import List, Optional
+
+from PySide6.QtWidgets import QFileDialog, QMenu, QMessageBox, QWidget
+from PySide6.QtCore import QObject, QUrl, Signal
+from PySide6.QtGui import QAction, QDesktopServices
+
+from db.models import Attachment
+from ui.workers import BackgroundJob
+
+
+def add_attachments(db, log_id: int, paths: List[str], progress=None) -> int:
+    """把文件逐个写入附件目录并关联到日志（在后台线程中执行）"""
+    for index, path in enumerate(paths):
+        if progress:
+            progress(index * 100 // len(paths), os.path.basename(path))
+        db.add_attachment(log_id, path)
+    return len(paths)
+
+
+def export_attachment(store, attachment: Attachment, destination: Optional[str] = None, progress=None) -> str:
+    """把附件按块复制出来（在后台线程中执行）；未指定目标时复制到临时目录供打开"""
+    if destination is None:
+        destination = os.path.join(tempfile.gettempdir(), 'WorkTag', 'attachments',
+                                   attachment.sha256[:12], attachment.name)
+        if os.path.exists(destination) and os.path.getsize(destination) == attachment.size:
+            return destination
+    return store.copy_to(attachment.sha256, destination)
+
+
+def format_size(size: int) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class AttachmentActions(QObject):
+    """日志列表右键菜单中的附件操作：添加、打开、另存为、删除
+
+    文件的写入和复制都在后台线程中按块进行，界面不会因为大文件卡住。
+    """
+
+    status = Signal(str, str)  # (消息, 类型)，交给主窗口的状态栏显示
+
+    def __init__(self, db, parent_widget: QWidget):
+        super().__init__(parent_widget)
+        self.db = db
+        self.parent_widget = parent_widget
+        self.jobs = set()
+
+    def populate_menu(self, menu: QMenu, log_id: int):
+        add_action = QAction("添加附件…", menu)
+        add_action.triggered.connect(lambda: self.choose_and_add(log_id))
+        menu.addAction(add_action)
+
+        for attachment in self.db.get_attachments(log_id):
+            submenu = menu.addMenu(f"📎 {attachment.name}（{format_size(attachment.size)}）")
+            open_action = QAction("打开", submenu)
+            open_action.triggered.connect(lambda checked=False, a=attachment: self.open(a))
+            save_action = QAction("另存为…", submenu)
+            save_action.triggered.connect(lambda checked=False, a=attachment: self.save_as(a))
+            delete_action = QAction("删除附件", submenu)
+            delete_action.triggered.connect(lambda checked=False, a=attachment: self.delete(a))
+            submenu.addAction(open_action)
+            submenu.addAction(save_action)
+            submenu.addAction(delete_action)
+
+    def _start(self, func, *args, on_finished=None, failure: str = "操作失败"):
+        job = BackgroundJob(func, *args)
+        self.jobs.add(job)
+
+        def finished(result):
+            self.jobs.discard(job)
+            if on_finished:
+                on_finished(result)
+
+        def failed(error: str):
+            self.jobs.discard(job)
+            self.status.emit(f"{failure}: {error}", "error")
+
+        job.signals.finished.connect(finished)
+        job.signals.failed.connect(failed)
+        job.start()
+
+    def choose_and_add(self, log_id: int):
+        paths, _ = QFileDialog.getOpenFileNames(self.parent_widget, "选择附件")
+        if not paths:
+            return
+        self.status.emit(f"正在添加 {len(paths)} 个附件…", "info")
+        self._start(add_attachments, self.db, log_id, paths,
+                    on_finished=lambda count: self.status.emit(f"已添加 {count} 个附件", "success"),
+                    failure="添加附件失败")
+
+    def open(self, attachment: Attachment):
+        self._start(export_attachment, self.db.attachments, attachment,
+                    on_finished=lambda path: QDesktopServices.openUrl(QUrl.fromLocalFile(path)),
+                    failure="打开附件失败")
+
+    def save_as(self, attachment: Attachment):
+        destination, _ = QFileDialog.getSaveFileName(self.parent_widget, "保存附件", attachment.name)
+        if not destination:
+            return
+        self._start(export_attachment, self.db.attachments, attachment, destination,
+                    on_finished=lambda path: self.status.emit(f"附件已保存到 {path}", "success"),
+                    failure="保存附件失败")
+
+    def delete(self, attachment: Attachment):
+        reply = QMessageBox.question(
+            self.parent_widget, '删除附件',
+            f'确定要删除附件“{attachment.name}”吗？',
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply == QMessageBox.Yes and self.db.delete_attachment(attachment.id):
+            self.status.emit("附件已删除", "success")
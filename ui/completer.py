@@ -0,0 +1,218 @@
+import re
+from typing import List, Optional, Tuple
+from PySide6.QtCore import QObject, Qt, QEvent, QStringListModel, QThreadPool
+from PySide6.QtWidgets import QCompleter, QLineEdit
+
+from service.parser import InputParser
+from service.prefix_index import PrefixIndex
+from service.trigram_index import TrigramIndex
+from ui.workers import BackgroundJob
+
+
+# 标签允许的字符需与 InputParser 的 #标签 规则保持一致
+TAG_PREFIX_PATTERN = re.compile(r'[a-zA-Z0-9_\-]*')
+
+
+def load_indexes(db, progress=None) -> Tuple[PrefixIndex, PrefixIndex, TrigramIndex]:
+    """在只读快照中读取项目、标签和历史记录，构建补全索引（在后台线程中执行）"""
+    with db.snapshot() as view:
+        project_names = [p['name'] for p in view.get_all_projects()]
+        project_names.extend(view.get_projects_from_history())
+        tags = view.get_all_tags()
+        history = view.get_entry_history()
+    return PrefixIndex(project_names), PrefixIndex(tags), TrigramIndex(history)
+
+
+class InputCompleter(QObject):
+    """输入框自动补全：在 [ 之后提示项目名，在 # 之后提示标签，
+    输入普通内容时模糊匹配相似的历史记录（连同项目和标签整条复用）
+
+    候选词全部来自内存中的前缀索引和三元组索引，启动时在后台线程从数据库加载一次，
+    之后随每次添加记录增量更新，输入过程中不会查询数据库。
+    """
+
+    MAX_SUGGESTIONS = 10
+    MAX_HISTORY_SUGGESTIONS = 6
+    # 内容至少输入这么多个字符才提示历史记录
+    MIN_HISTORY_QUERY = 3
+    # 表示“替换整行”的补全触发符
+    HISTORY_TRIGGER = '*'
+
+    def __init__(self, line_edit: QLineEdit, db, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.line_edit = line_edit
+        self.projects = PrefixIndex()
+        self.tags = PrefixIndex()
+        self.history = TrigramIndex()
+
+        # 后台加载索引的任务；加载期间又要求重新加载时，结束后再加载一次
+        self.db = db
+        self.reload_job: Optional[BackgroundJob] = None
+        self.reload_stale = False
+        # 加载期间的增量更新：快照可能不包含它们，换上新索引后重新应用
+        self._replay: List[tuple] = []
+        self.reload()
+
+        # 当前正在补全的片段：(触发符, 起始位置, 光标位置)
+        self._token: Optional[Tuple[str, int, int]] = None
+
+        self.model = QStringListModel(self)
+        self.completer = QCompleter(self.model, self)
+        self.completer.setWidget(line_edit)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.completer.activated.connect(self.insert_completion)
+
+        # 自己处理弹窗里的回车，避免回车同时触发输入框的提交
+        self.completer.popup().installEventFilter(self)
+
+        line_edit.textEdited.connect(self.update_completions)
+
+    def reload(self):
+        """在后台从数据库全量重建索引，完成后替换当前索引（期间继续使用旧索引）"""
+        if self.reload_job is not None:
+            self.reload_stale = True
+            return
+        self.reload_stale = False
+        self.reload_job = BackgroundJob(load_indexes, self.db)
+        self.reload_job.signals.finished.connect(self._on_reloaded)
+        self.reload_job.signals.failed.connect(self._on_reload_failed)
+        self.reload_job.start()
+
+    def _on_reloaded(self, indexes):
+        self.reload_job = None
+        self.projects, self.tags, self.history = indexes
+        # 快照已包含的记录重放后会多计一次使用次数，只影响历史提示的排序
+        replay, self._replay = self._replay, []
+        for method, args in replay:
+            method(*args)
+        if self.reload_stale:
+            self.reload()
+
+    def _on_reload_failed(self, error: str):
+        self.reload_job = None
+        self._replay = []
+        print(f"加载补全索引失败: {error}")
+
+    def stop(self, wait_ms: int = 2000):
+        """等待正在进行的加载结束（退出、关闭数据库前调用）"""
+        if self.reload_job is not None:
+            QThreadPool.globalInstance().waitForDone(wait_ms)
+
+    def add_entry(self, project: Optional[str], tags: Optional[str], content: Optional[str] = None):
+        """新记录写入后增量更新索引（project/tags 为逗号分隔的字符串）"""
+        if self.reload_job is not None:
+            self._replay.append((self.add_entry, (project, tags, content)))
+        for name in (project or '').split(','):
+            self.projects.add(name)
+        for tag in (tags or '').split(','):
+            self.tags.add(tag)
+        if content:
+            self.history.add(content, project, tags)
+
+    def add_project(self, name: str):
+        """新增项目后更新索引"""
+        if self.reload_job is not None:
+            self._replay.append((self.add_project, (name,)))
+        self.projects.add(name)
+
+    def current_token(self) -> Optional[Tuple[str, int, int]]:
+        """找出光标前正在输入的 [项目 或 #标签 片段"""
+        text = self.line_edit.text()
+        cursor = self.line_edit.cursorPosition()
+        before = text[:cursor]
+
+        bracket = before.rfind('[')
+        hash_pos = before.rfind('#')
+
+        if bracket > hash_pos and ']' not in before[bracket:]:
+            return ('[', bracket, cursor)
+
+        if hash_pos > bracket and hash_pos >= 0:
+            prefix = before[hash_pos + 1:]
+            if TAG_PREFIX_PATTERN.fullmatch(prefix):
+                return ('#', hash_pos, cursor)
+
+        return None
+
+    def update_completions(self, _text: str = ''):
+        """根据当前片段刷新候选列表"""
+        self._token = self.current_token()
+        if self._token is None:
+            self.update_history_suggestions()
+            return
+
+        trigger, start, end = self._token
+        prefix = self.line_edit.text()[start + 1:end]
+        index = self.projects if trigger == '[' else self.tags
+        suggestions = index.search(prefix, self.MAX_SUGGESTIONS)
+        self.show_suggestions(suggestions, self.line_edit.width() // 2, select_first=True)
+
+    def update_history_suggestions(self):
+        """按已输入的内容模糊匹配历史记录"""
+        text = self.line_edit.text()
+        content = InputParser.parse_input(text)['content']
+        if len(content) < self.MIN_HISTORY_QUERY:
+            self.completer.popup().hide()
+            return
+
+        suggestions = []
+        for entry in self.history.search(content, self.MAX_HISTORY_SUGGESTIONS):
+            line = InputParser.format_for_display(entry._asdict())
+            if line != text.strip():
+                suggestions.append(line)
+
+        self._token = (self.HISTORY_TRIGGER, 0, len(text))
+        # 不默认选中：直接回车仍然提交当前输入，按方向键选中后才替换
+        self.show_suggestions(suggestions, self.line_edit.width(), select_first=False)
+
+    def show_suggestions(self, suggestions: List[str], width: int, select_first: bool):
+        if not suggestions:
+            self.completer.popup().hide()
+            return
+
+        self.model.setStringList(suggestions)
+        self.completer.setCompletionPrefix('')
+
+        rect = self.line_edit.cursorRect()
+        rect.setWidth(width)
+        self.completer.complete(rect)
+        if select_first:
+            self.completer.popup().setCurrentIndex(self.completer.completionModel().index(0, 0))
+
+    def insert_completion(self, word: str):
+        """用选中的候选替换当前片段"""
+        if self._token is None:
+            return
+
+        trigger, start, end = self._token
+        text = self.line_edit.text()
+
+        if trigger == self.HISTORY_TRIGGER:
+            start, end = 0, len(text)
+            replacement = word
+        elif trigger == '[':
+            # 吞掉光标后已存在的右括号，避免出现 [Unity]]
+            if text[end:end + 1] == ']':
+                end += 1
+            replacement = f"[{word}]"
+        else:
+            replacement = f"#{word} "
+
+        self.line_edit.setText(text[:start] + replacement + text[end:])
+        self.line_edit.setCursorPosition(start + len(replacement))
+        self._token = None
+
+    def eventFilter(self, obj, event):
+        """拦截弹窗中的回车/Tab，只完成补全而不提交记录"""
+        if obj is self.completer.popup() and event.type() == QEvent.KeyPress:
+            if event.key() in (Qt.Key_Return, Qt.Key_Enter, Qt.Key_Tab):
+                index = self.completer.popup().currentIndex()
+                self.completer.popup().hide()
+                if index.isValid():
+                    self.insert_completion(index.data())
+                elif event.key() != Qt.Key_Tab:
+                    # 没有选中任何历史记录时，回车照常提交
+                    self.line_edit.returnPressed.emit()
+                return True
+        return super().eventFilter(obj, event)
@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from PySide6.QtCore import QObject, QThreadPool
+
+from service.parser import InputParser
+from ui.workers import BackgroundJob
+
+
+class PageRow(NamedTuple):
+    """日志列表中的一行（已格式化，可直接生成列表项）"""
+    log_id: int
+    text: str
+    attachments: int
+
+
+class DayPage(NamedTuple):
+    """某一天的日志列表（最新的在前）"""
+    day: str
+    rows: Tuple[PageRow, ...]
+
+
+def format_row(log, attachment_count: int = 0) -> PageRow:
+    """LogEntry -> 列表行（时间、项目、内容、标签、耗时）"""
+    text = InputParser.format_entry(log.content, log.projects, log.tags, log.duration)
+    if log.time:
+        text = f"[{log.time}] {text}"
+    return PageRow(log.id, text, attachment_count)
+
+
+def load_day_page(db, day: str) -> DayPage:
+    """查询并格式化某一天的日志（db 可以是 Database 或只读快照）"""
+    counts = db.get_attachment_counts(day, day)
+    return DayPage(day, tuple(format_row(log, counts.get(log.id, 0)) for log in db.iter_day_logs(day)))
+
+
+def load_day_pages(db, days: List[str], progress=None) -> List[DayPage]:
+    """在只读快照中加载多天的日志（在后台线程中执行）"""
+    with db.snapshot() as view:
+        return [load_day_page(view, day) for day in days]
+
+
+def shift_day(day: str, offset: int) -> str:
+    return (date.fromisoformat(day) + timedelta(days=offset)).isoformat()
+
+
+class DayPageCache(QObject):
+    """按天缓存格式化好的日志列表（LRU），并在后台预取相邻的日期
+
+    前后翻页时命中缓存即可直接显示；未命中时在 GUI 线程同步查询一天（单日查询走
+    date 索引，很快）。记录增删、附件变化时按天失效（见 invalidate）。每天有一个
+    版本号，预取开始后该天被失效的，预取结果作废，不会把旧数据放回缓存。
+    """
+
+    # 缓存的天数上限，以及所有缓存页的总行数上限（先到者为准）
+    MAX_PAGES = 60
+    MAX_ROWS = 3000
+    # 显示某一天时预取的相邻日期（按顺序：往前翻更常见，多取一天）
+    PREFETCH_OFFSETS = (-1, 1, -2)
+
+    def __init__(self, db, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.db = db
+        self._pages: "OrderedDict[str, DayPage]" = OrderedDict()
+        self._rows = 0
+        self._versions: Dict[str, int] = {}
+        self._pending = set()
+        self.jobs = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, day: str) -> DayPage:
+        """取某一天的页面：命中时移到最近使用，未命中时同步查询并放入缓存"""
+        page = self._pages.get(day)
+        if page is not None:
+            self._pages.move_to_end(day)
+            self.hits += 1
+            return page
+        self.misses += 1
+        page = load_day_page(self.db, day)
+        self._put(page)
+        return page
+
+    def _put(self, page: DayPage):
+        old = self._pages.pop(page.day, None)
+        if old is not None:
+            self._rows -= len(old.rows)
+        self._pages[page.day] = page
+        self._rows += len(page.rows)
+        # 淘汰最久未使用的页，但总保留刚放入的这一页
+        while len(self._pages) > 1 and (len(self._pages) > self.MAX_PAGES or self._rows > self.MAX_ROWS):
+            _, evicted = self._pages.popitem(last=False)
+            self._rows -= len(evicted.rows)
+
+    def invalidate(self, days: Iterable[str]):
+        """这些天的记录有变化：丢弃缓存页，正在进行的预取结果也作废"""
+        for day in days:
+            self._versions[day] = self._versions.get(day, 0) + 1
+            page = self._pages.pop(day, None)
+            if page is not None:
+                self._rows -= len(page.rows)
+
+    def clear(self):
+        """全部失效（其他进程修改了数据库等无法确定范围的变化）"""
+        self.invalidate(list(self._pages) + list(self._pending))
+
+    def stop(self, wait_ms: int = 2000):
+        """等待正在进行的预取结束（退出、关闭数据库前调用）"""
+        if self.jobs:
+            QThreadPool.globalInstance().waitForDone(wait_ms)
+
+    def prefetch(self, around: str, last_day: Optional[str] = None):
+        """在后台加载 around 相邻且尚未缓存的日期（不超过 last_day）"""
+        days = [shift_day(around, offset) for offset in self.PREFETCH_OFFSETS]
+        days = [d for d in days if d not in self._pages and d not in self._pending
+                and (last_day is None or d <= last_day)]
+        if not days:
+            return
+
+        versions = {day: self._versions.get(day, 0) for day in days}
+        self._pending.update(days)
+        job = BackgroundJob(load_day_pages, self.db, days)
+        self.jobs.add(job)
+        job.signals.finished.connect(lambda pages: self._on_prefetched(job, versions, pages))
+        job.signals.failed.connect(lambda error: self._on_prefetch_failed(job, days, error))
+        job.start()
+
+    def _on_prefetched(self, job, versions: Dict[str, int], pages: List[DayPage]):
+        self.jobs.discard(job)
+        self._pending.difference_update(versions)
+        for page in pages:
+            if self._versions.get(page.day, 0) == versions[page.day] and page.day not in self._pages:
+                self._put(page)
+
+    def _on_prefetch_failed(self, job, days: List[str], error: str):
+        self.jobs.discard(job)
+        self._pending.difference_update(days)
+        print(f"预取日志失败: {error}")
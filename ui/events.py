@@ -0,0 +1,36 @@
+from typing import Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class QtEventBridge(QObject):
+    """把数据库变更事件转发到 GUI 线程
+
+    事件可能在后台线程（报告、导入等任务）中发布；通过 Qt 信号转发后，
+    连接到 event 的槽函数总是在接收者所在的 GUI 线程中执行。
+    同时定时轮询 PRAGMA data_version，发现其他进程的修改。
+    """
+
+    POLL_INTERVAL_MS = 2000
+
+    event = Signal(object)
+
+    def __init__(self, db, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.db = db
+        self._unsubscribe = db.events.subscribe(self.event.emit)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.POLL_INTERVAL_MS)
+        self.poll_timer.timeout.connect(self.poll)
+        self.poll_timer.start()
+
+    def poll(self):
+        try:
+            self.db.check_external_changes()
+        except Exception as e:
+            print(f"检查外部修改失败: {e}")
+
+    def close(self):
+        self.poll_timer.stop()
+        self._unsubscribe()
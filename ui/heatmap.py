@@ -0,0 +1,272 @@
+from datetime import date, timedelta
+from typing import Dict, Optional
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QToolTip
+from PySide6.QtCore import Qt, QRect, QTimer, QThreadPool
+from PySide6.QtGui import QPainter, QPixmap, QColor, QFont
+
+from service.analytics import AnalyticsEngine
+from ui.workers import BackgroundJob
+
+
+def load_heatmap_stats(engine: AnalyticsEngine, year: int, top: int, progress=None):
+    """连续记录天数与某一年占比最高的项目（在后台线程中执行）"""
+    streaks = engine.streaks()
+    shares = engine.share_of_time('project', f"{year}-01-01", f"{year}-12-31")
+    return year, streaks, list(shares.items())[:top]
+
+
+class HeatmapCanvas(QWidget):
+    """年度热力图画布
+
+    每一年的按天计数只查询一次（GROUP BY 聚合），渲染结果缓存为 QPixmap；
+    记录增删时只重绘受影响的那一个格子，切换年份直接使用缓存。
+    """
+
+    CELL = 11
+    GAP = 2
+    LEFT = 26
+    TOP = 18
+
+    # 0 条 / 1-2 条 / 3-5 条 / 6-9 条 / 10 条及以上
+    LEVELS = [(0, "#3a3a3a"), (1, "#0e4429"), (3, "#006d32"), (6, "#26a641"), (10, "#39d353")]
+
+    WEEKDAYS = ["一", "", "三", "", "五", "", ""]
+
+    def __init__(self, db, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.db = db
+        self.year = date.today().year
+        self._counts: Dict[int, Dict[str, int]] = {}
+        self._pixmaps: Dict[int, QPixmap] = {}
+
+        self.setMouseTracking(True)
+        step = self.CELL + self.GAP
+        self.setFixedSize(self.LEFT + 54 * step, self.TOP + 7 * step)
+
+    def set_year(self, year: int):
+        """切换显示年份（已渲染过的年份直接使用缓存）"""
+        self.year = year
+        self.update()
+
+    def counts_for(self, year: int) -> Dict[str, int]:
+        if year not in self._counts:
+            self._counts[year] = self.db.get_daily_counts(f"{year}-01-01", f"{year}-12-31")
+        return self._counts[year]
+
+    def total_for(self, year: int) -> int:
+        return sum(self.counts_for(year).values())
+
+    def apply_delta(self, day: str, delta: int):
+        """某天记录数变化时更新计数并只重绘该格子"""
+        year = int(day[:4])
+        if year not in self._counts:
+            # 该年尚未加载，下次显示时会重新聚合
+            return
+
+        counts = self._counts[year]
+        counts[day] = max(counts.get(day, 0) + delta, 0)
+
+        pixmap = self._pixmaps.get(year)
+        if pixmap is not None:
+            painter = QPainter(pixmap)
+            self._draw_cell(painter, year, date.fromisoformat(day), counts[day])
+            painter.end()
+
+        if year == self.year:
+            self.update(self._cell_rect(year, date.fromisoformat(day)))
+
+    def invalidate(self):
+        """丢弃全部缓存（例如数据被其他进程修改时）"""
+        self._counts.clear()
+        self._pixmaps.clear()
+        self.update()
+
+    def _cell_rect(self, year: int, day: date) -> QRect:
+        jan1 = date(year, 1, 1)
+        index = (day - jan1).days + jan1.weekday()
+        step = self.CELL + self.GAP
+        return QRect(self.LEFT + (index // 7) * step, self.TOP + (index % 7) * step, self.CELL, self.CELL)
+
+    def _color(self, count: int) -> QColor:
+        color = self.LEVELS[0][1]
+        for threshold, level_color in self.LEVELS:
+            if count >= threshold:
+                color = level_color
+        return QColor(color)
+
+    def _draw_cell(self, painter: QPainter, year: int, day: date, count: int):
+        painter.fillRect(self._cell_rect(year, day), self._color(count))
+
+    def _render(self, year: int) -> QPixmap:
+        """把整年渲染到一张 QPixmap 中"""
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(QColor("#2b2b2b"))
+
+        counts = self.counts_for(year)
+        painter = QPainter(pixmap)
+        font = QFont()
+        font.setPixelSize(9)
+        painter.setFont(font)
+        painter.setPen(QColor("#888888"))
+
+        step = self.CELL + self.GAP
+        for row, name in enumerate(self.WEEKDAYS):
+            if name:
+                painter.drawText(0, self.TOP + row * step, self.LEFT - 4, self.CELL,
+                                 Qt.AlignRight | Qt.AlignVCenter, name)
+
+        day = date(year, 1, 1)
+        while day.year == year:
+            if day.day == 1:
+                rect = self._cell_rect(year, day)
+                painter.drawText(rect.x(), 0, 4 * step, self.TOP - 4,
+                                 Qt.AlignLeft | Qt.AlignBottom, f"{day.month}月")
+            self._draw_cell(painter, year, day, counts.get(day.isoformat(), 0))
+            day += timedelta(days=1)
+
+        painter.end()
+        return pixmap
+
+    def paintEvent(self, event):
+        if self.year not in self._pixmaps:
+            self._pixmaps[self.year] = self._render(self.year)
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._pixmaps[self.year])
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        """悬停显示当天记录数"""
+        pos = event.position().toPoint()
+        step = self.CELL + self.GAP
+        col = (pos.x() - self.LEFT) // step
+        row = (pos.y() - self.TOP) // step
+
+        jan1 = date(self.year, 1, 1)
+        if pos.x() >= self.LEFT and pos.y() >= self.TOP and 0 <= row < 7:
+            day = jan1 + timedelta(days=col * 7 + row - jan1.weekday())
+            if day.year == self.year:
+                count = self.counts_for(self.year).get(day.isoformat(), 0)
+                QToolTip.showText(event.globalPosition().toPoint(), f"{day.isoformat()}：{count} 条记录", self)
+                return
+        QToolTip.hideText()
+
+
+class HeatmapWindow(QWidget):
+    """记录热力图窗口（按年显示每天的记录数，以及连续记录天数和当年的项目占比）"""
+
+    # 项目占比最多显示的项目数
+    TOP_PROJECTS = 3
+    # 记录增删后延迟刷新统计行（统计引擎在数据变化后会重新读取全部记录，连续操作时只算一次）
+    STATS_DELAY_MS = 1000
+
+    def __init__(self, db, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setWindowTitle("WorkTag - 记录热力图")
+        self.setWindowFlags(Qt.Tool | Qt.WindowStaysOnTopHint)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #2b2b2b;
+                color: #aaaaaa;
+                font-size: 12px;
+            }
+            QPushButton {
+                background-color: #3c3c3c;
+                color: #ffffff;
+                border: 1px solid #555;
+                border-radius: 4px;
+                padding: 2px 8px;
+            }
+            QPushButton:hover {
+                background-color: #4a4a4a;
+            }
+        """)
+
+        self.engine = AnalyticsEngine(db)
+        self.canvas = HeatmapCanvas(db, self)
+
+        # 正在计算统计行的任务；计算期间又有变化时，结束后再算一次
+        self.stats_job: Optional[BackgroundJob] = None
+        self.stats_stale = False
+
+        self.stats_label = QLabel("统计中…")
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setSingleShot(True)
+        self.stats_timer.setInterval(self.STATS_DELAY_MS)
+        self.stats_timer.timeout.connect(self._update_stats)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(12, 12, 12, 12)
+
+        header = QHBoxLayout()
+        prev_btn = QPushButton("◀")
+        prev_btn.clicked.connect(lambda: self.set_year(self.canvas.year - 1))
+        next_btn = QPushButton("▶")
+        next_btn.clicked.connect(lambda: self.set_year(self.canvas.year + 1))
+        self.year_label = QLabel()
+        self.year_label.setStyleSheet("color: #4a9cff; font-size: 14px; font-weight: bold;")
+
+        header.addWidget(prev_btn)
+        header.addWidget(self.year_label)
+        header.addWidget(next_btn)
+        header.addStretch()
+
+        layout.addLayout(header)
+        layout.addWidget(self.canvas)
+        layout.addWidget(self.stats_label)
+        self.set_year(self.canvas.year)
+
+    def set_year(self, year: int):
+        self.canvas.set_year(year)
+        self._update_title()
+        self._update_stats()
+
+    def _update_title(self):
+        year = self.canvas.year
+        self.year_label.setText(f"{year} 年 · 共 {self.canvas.total_for(year)} 条记录")
+
+    def _update_stats(self):
+        """在后台计算连续记录天数与当年各项目的记录占比"""
+        if self.stats_job is not None:
+            self.stats_stale = True
+            return
+        self.stats_stale = False
+        self.stats_job = BackgroundJob(load_heatmap_stats, self.engine, self.canvas.year, self.TOP_PROJECTS)
+        self.stats_job.signals.finished.connect(self._on_stats_loaded)
+        self.stats_job.signals.failed.connect(self._on_stats_failed)
+        self.stats_job.start()
+
+    def _on_stats_loaded(self, result):
+        self.stats_job = None
+        year, streaks, top = result
+        if self.stats_stale or year != self.canvas.year:
+            self._update_stats()
+            return
+        text = f"连续记录 {streaks['current']} 天（最长 {streaks['longest']} 天）"
+        if top:
+            text += " · " + "、".join(f"{name} {share:.0%}" for name, share in top)
+        self.stats_label.setText(text)
+
+    def _on_stats_failed(self, error: str):
+        self.stats_job = None
+        print(f"热力图统计失败: {error}")
+
+    def stop(self, wait_ms: int = 2000):
+        """停止刷新统计，并等待正在进行的计算结束（退出、关闭数据库前调用）"""
+        self.stats_timer.stop()
+        if self.stats_job is not None:
+            QThreadPool.globalInstance().waitForDone(wait_ms)
+
+    def apply_delta(self, day: str, delta: int):
+        """记录增删后的增量更新"""
+        self.canvas.apply_delta(day, delta)
+        if int(day[:4]) == self.canvas.year:
+            self._update_title()
+        self.stats_timer.start()
+
+    def invalidate(self):
+        self.canvas.invalidate()
+        self._update_title()
+        self._update_stats()
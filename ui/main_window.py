@@ -2,27 +2,151 @@ import sys
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLineEdit, QListWidget, QListWidgetItem, QPushButton, QLabel,
-    QMenu, QSystemTrayIcon, QMessageBox, QScrollArea
+    QMenu, QSystemTrayIcon, QMessageBox, QScrollArea, QInputDialog, QFileDialog, QProgressDialog
 )
-from PySide6.QtCore import Qt, QTimer, QPoint, QSize
-from PySide6.QtGui import QIcon, QAction, QFont, QKeyEvent, QColor
+from PySide6.QtCore import Qt, QTimer, QPoint, QSize, QEventLoop
+from PySide6.QtGui import QIcon, QAction, QFont, QKeyEvent, QColor, QKeySequence, QShortcut
 import os
+import re
 from datetime import datetime
+from typing import Optional
 
 # 导入项目模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db.database import Database
 from service.parser import InputParser
+from ui.completer import InputCompleter
+from ui.heatmap import HeatmapWindow
+from ui.search import SearchWindow
+from ui.attachments import AttachmentActions
+from ui.day_pages import DayPageCache, PageRow, format_row, shift_day
+from ui.profiler import ProfileSession, StartupProbe, CAPTURE_SECONDS, mark_startup
+from ui.workers import BackgroundJob
+from ui.single_instance import SingleInstanceServer, send_with_retry
+from ui.maintenance import MaintenanceScheduler
+from ui.events import QtEventBridge
+from db.events import (
+    AttachmentsChanged, ExternalChange, LogAdded, LogDeleted, LogsImported, ProjectDeleted, ProjectsAdded,
+    ProjectsAssigned, ProjectUsageChanged
+)
+from service.report import ReportGenerator, ReportCancelled
+from service.templates import TemplateLoader, BUILTIN_TEMPLATE_DIR
+from service.query import QueryError, QueryParser
+from service.git_import import GitImporter, import_git_history
+from service.classifier import apply_suggestions, classify_unlabeled
+
+
+def create_database(progress=None):
+    """打开数据库并执行未应用的结构迁移（在后台线程中执行）"""
+    def report(description, done, total):
+        if progress:
+            progress(done * 100 // total if total else 0, description)
+    return Database(migration_progress=report)
+
+
+def open_database() -> Database:
+    """启动时打开数据库：迁移在后台线程执行，GUI 线程显示进度并继续处理事件
+
+    迁移很快时不会弹出进度框（QProgressDialog 超过 minimumDuration 才显示）；
+    迁移失败时提示错误并退出。
+    """
+    dialog = QProgressDialog("正在升级数据库结构…", None, 0, 100)
+    dialog.setWindowTitle("WorkTag")
+    dialog.setMinimumDuration(500)
+    dialog.setAutoClose(False)
+    dialog.setAutoReset(False)
+
+    outcome = {}
+    loop = QEventLoop()
+    job = BackgroundJob(create_database)
+
+    def on_progress(percent, stage):
+        dialog.setLabelText(f"正在升级数据库结构…\n{stage}")
+        dialog.setValue(percent)
+
+    def on_finished(db):
+        outcome['db'] = db
+        loop.quit()
+
+    def on_failed(error):
+        outcome['error'] = error
+        loop.quit()
+
+    job.signals.progress.connect(on_progress)
+    job.signals.finished.connect(on_finished)
+    job.signals.failed.connect(on_failed)
+    job.start()
+    loop.exec()
+    dialog.close()
+
+    if 'error' in outcome:
+        QMessageBox.critical(None, "WorkTag", f"打开数据库失败：{outcome['error']}")
+        sys.exit(1)
+    return outcome['db']
+
+
+def export_weekly_report(db, fmt="md", progress=None, query=None):
+    """在只读快照中生成并导出本周周报（在后台线程中执行），query 为筛选语句"""
+    with db.snapshot() as view:
+        return ReportGenerator.generate_and_export_weekly_report(view, progress=progress, fmt=fmt, query=query)
+
+
+def export_batch_reports(db, start_date, end_date, period, fmt="md", progress=None):
+    """在只读快照中一次扫描生成一段时间内每个周期的报告（在后台线程中执行）"""
+    with db.snapshot() as view:
+        return ReportGenerator.generate_and_export_batch_reports(
+            view, start_date, end_date, period, progress=progress, fmt=fmt)
+
+
+def export_templated_report(db, template, loader, progress=None):
+    """在只读快照中按模板生成并导出报告（在后台线程中执行）"""
+    with db.snapshot() as view:
+        return ReportGenerator.generate_and_export_templated_report(view, template, loader, progress=progress)
 
 
 class MainWindow(QMainWindow):
     """主窗口类"""
     
-    def __init__(self):
+    # 项目按钮栏最多显示的项目数（按热度取前 N 个）
+    MAX_PROJECT_BUTTONS = 20
+    
+    WEEKDAYS = "一二三四五六日"
+    
+    def __init__(self, db: Optional[Database] = None):
         super().__init__()
         
-        # 初始化数据库
-        self.db = Database()
+        # 初始化数据库（启动时由 open_database 在后台线程打开并迁移后传入）
+        self.db = db if db is not None else Database()
+        
+        # 日志列表当前显示的日期，及按天缓存的列表页（前后翻页时预取相邻日期）
+        self.current_day = datetime.now().strftime("%Y-%m-%d")
+        self.day_pages = DayPageCache(self.db, self)
+        
+        # 热力图窗口（首次打开时创建）
+        self.heatmap_window = None
+        
+        # 查找记录窗口（首次打开时创建）
+        self.search_window = None
+        
+        # 正在进行的性能采集
+        self.profile_session = None
+        
+        # 正在执行的 git 导入任务
+        self.git_import_job = None
+        
+        # 正在执行的自动归类任务（计算建议或写入结果）
+        self.classify_job = None
+        
+        # 正在执行的周报任务
+        self.report_job = None
+        # 上次生成筛选周报时使用的筛选条件
+        self.last_report_query = ""
+        
+        # 报告模板：数据目录下的 templates/ 优先，其次是内置模板
+        self.template_loader = TemplateLoader([
+            os.path.join(os.path.dirname(self.db.db_path), 'templates'),
+            BUILTIN_TEMPLATE_DIR,
+        ])
         
         # 窗口设置
         self.setWindowTitle("WorkTag - 工作日志")
@@ -98,6 +222,23 @@ class MainWindow(QMainWindow):
         # 系统托盘
         self.init_tray_icon()
         
+        # 后台增量导入项目：添加记录后延迟执行，只扫描上次导入之后的新记录
+        self.project_import_timer = QTimer(self)
+        self.project_import_timer.setSingleShot(True)
+        self.project_import_timer.setInterval(1000)
+        self.project_import_timer.timeout.connect(self.auto_import_projects)
+        self.project_import_timer.start()
+        
+        # 数据库变更事件：增量更新列表、补全、热力图和项目按钮；并发现其他进程的修改
+        self.db_events = QtEventBridge(self.db, self)
+        self.db_events.event.connect(self.on_db_event)
+        
+        # 空闲时执行数据库维护（检查点、统计信息、增量 VACUUM、完整性检查）
+        self.maintenance = MaintenanceScheduler(self.db, self, self)
+        self.maintenance.step_failed.connect(lambda error: self.show_status(f"数据库维护失败: {error}", "warning"))
+        self.input_field.textEdited.connect(self.maintenance.note_activity)
+        self.maintenance.start()
+        
         # 拖拽相关
         self.dragging = False
         self.drag_position = QPoint()
@@ -134,8 +275,24 @@ class MainWindow(QMainWindow):
         """)
         close_btn.clicked.connect(self.hide_window)
         
+        # 热力图按钮
+        heatmap_btn = QPushButton("▦")
+        heatmap_btn.setFixedSize(24, 24)
+        heatmap_btn.setToolTip("记录热力图")
+        heatmap_btn.setStyleSheet("padding: 0px; font-size: 14px;")
+        heatmap_btn.clicked.connect(self.show_heatmap)
+        
+        # 查找按钮
+        search_btn = QPushButton("🔍")
+        search_btn.setFixedSize(24, 24)
+        search_btn.setToolTip("查找记录（project:Unity tag:bug since:2026-01-01 \"关键词\"）")
+        search_btn.setStyleSheet("padding: 0px; font-size: 12px;")
+        search_btn.clicked.connect(self.show_search)
+        
         title_bar.addWidget(title_label)
         title_bar.addStretch()
+        title_bar.addWidget(search_btn)
+        title_bar.addWidget(heatmap_btn)
         title_bar.addWidget(close_btn)
         
         layout.addLayout(title_bar)
@@ -202,6 +359,9 @@ class MainWindow(QMainWindow):
         self.input_field.returnPressed.connect(self.add_log)
         layout.addWidget(self.input_field)
         
+        # 项目/标签自动补全（输入 [ 或 # 后弹出）
+        self.input_completer = InputCompleter(self.input_field, self.db, self)
+        
         # 按钮行
         button_layout = QHBoxLayout()
         
@@ -220,20 +380,72 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(button_layout)
         
-        # 今日记录标题
-        logs_label = QLabel("今日记录：")
-        logs_label.setStyleSheet("color: #aaaaaa; font-size: 14px; margin-top: 10px;")
-        layout.addWidget(logs_label)
+        # 记录标题和前后翻页（Alt+← / Alt+→，Alt+Home 回到今天）
+        day_nav_layout = QHBoxLayout()
+        
+        self.day_label = QLabel("今日记录：")
+        self.day_label.setStyleSheet("color: #aaaaaa; font-size: 14px; margin-top: 10px;")
+        
+        self.prev_day_btn = QPushButton("◀")
+        self.prev_day_btn.setFixedSize(24, 24)
+        self.prev_day_btn.setToolTip("前一天（Alt+←）")
+        self.prev_day_btn.setStyleSheet("padding: 0px; font-size: 11px; background-color: #555;")
+        self.prev_day_btn.clicked.connect(lambda: self.step_day(-1))
+        
+        self.next_day_btn = QPushButton("▶")
+        self.next_day_btn.setFixedSize(24, 24)
+        self.next_day_btn.setToolTip("后一天（Alt+→）")
+        self.next_day_btn.setStyleSheet("padding: 0px; font-size: 11px; background-color: #555;")
+        self.next_day_btn.clicked.connect(lambda: self.step_day(1))
+        self.next_day_btn.setEnabled(False)
+        
+        self.today_btn = QPushButton("今天")
+        self.today_btn.setFixedHeight(24)
+        self.today_btn.setToolTip("回到今天（Alt+Home）")
+        self.today_btn.setStyleSheet("padding: 0px 8px; font-size: 11px; background-color: #555;")
+        self.today_btn.clicked.connect(self.load_today_logs)
+        self.today_btn.hide()
+        
+        day_nav_layout.addWidget(self.day_label)
+        day_nav_layout.addStretch()
+        day_nav_layout.addWidget(self.today_btn)
+        day_nav_layout.addWidget(self.prev_day_btn)
+        day_nav_layout.addWidget(self.next_day_btn)
+        layout.addLayout(day_nav_layout)
+        
+        # 翻页快捷键（输入框有焦点时也可用）
+        QShortcut(QKeySequence("Alt+Left"), self, lambda: self.step_day(-1))
+        QShortcut(QKeySequence("Alt+Right"), self, lambda: self.step_day(1))
+        QShortcut(QKeySequence("Alt+Home"), self, self.load_today_logs)
         
         # 日志列表
         self.log_list = QListWidget()
         self.log_list.itemDoubleClicked.connect(self.delete_log_item)
+        self.log_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.log_list.customContextMenuRequested.connect(self.show_log_menu)
         layout.addWidget(self.log_list)
         
+        # 附件操作（右键菜单）
+        self.attachment_actions = AttachmentActions(self.db, self)
+        self.attachment_actions.status.connect(self.show_status)
+        
         # 状态栏
+        status_layout = QHBoxLayout()
+        
         self.status_label = QLabel("就绪")
         self.status_label.setStyleSheet("color: #666666; font-size: 11px; margin-top: 5px;")
-        layout.addWidget(self.status_label)
+        
+        # 后台任务的取消按钮（仅在任务执行时显示）
+        self.cancel_job_btn = QPushButton("取消")
+        self.cancel_job_btn.setFixedHeight(20)
+        self.cancel_job_btn.setStyleSheet("padding: 0px 8px; font-size: 11px; background-color: #555;")
+        self.cancel_job_btn.clicked.connect(self.cancel_report)
+        self.cancel_job_btn.hide()
+        
+        status_layout.addWidget(self.status_label)
+        status_layout.addStretch()
+        status_layout.addWidget(self.cancel_job_btn)
+        layout.addLayout(status_layout)
     
     def init_tray_icon(self):
         """初始化系统托盘图标"""
@@ -261,6 +473,54 @@ class MainWindow(QMainWindow):
         report_action.triggered.connect(self.generate_report)
         tray_menu.addAction(report_action)
         
+        # 其他导出格式
+        export_menu = tray_menu.addMenu("导出周报为…")
+        for label, fmt in (("Word (.docx)", "docx"), ("HTML 网页", "html")):
+            export_action = QAction(label, self)
+            export_action.triggered.connect(lambda checked=False, f=fmt: self.start_report_job(f))
+            export_menu.addAction(export_action)
+        
+        filtered_report_action = QAction("按筛选条件生成周报…", self)
+        filtered_report_action.triggered.connect(self.generate_filtered_report)
+        tray_menu.addAction(filtered_report_action)
+        
+        batch_report_action = QAction("批量生成报告…", self)
+        batch_report_action.triggered.connect(self.generate_batch_reports)
+        tray_menu.addAction(batch_report_action)
+        
+        # 按模板生成（用户模板目录中的同名模板优先于内置模板）
+        self.template_menu = tray_menu.addMenu("按模板生成报告")
+        self.template_menu.aboutToShow.connect(self.load_template_menu)
+        
+        heatmap_action = QAction("记录热力图", self)
+        heatmap_action.triggered.connect(self.show_heatmap)
+        tray_menu.addAction(heatmap_action)
+        
+        search_action = QAction("查找记录", self)
+        search_action.triggered.connect(self.show_search)
+        tray_menu.addAction(search_action)
+        
+        # 从本地 git 仓库导入提交
+        git_menu = tray_menu.addMenu("从 Git 导入")
+        add_repo_action = QAction("添加仓库目录…", self)
+        add_repo_action.triggered.connect(self.add_git_repositories)
+        git_menu.addAction(add_repo_action)
+        sync_action = QAction("同步已添加的仓库", self)
+        sync_action.triggered.connect(lambda: self.start_git_import())
+        git_menu.addAction(sync_action)
+        
+        classify_action = QAction("自动归类未分类记录…", self)
+        classify_action.triggered.connect(self.start_classify)
+        tray_menu.addAction(classify_action)
+        
+        tray_menu.addSeparator()
+        
+        # 性能采集：用户反馈卡顿时打开，结果写到数据库所在目录的 profiles/ 下
+        self.profile_action = QAction(f"性能采集（{CAPTURE_SECONDS} 秒）", self)
+        self.profile_action.setCheckable(True)
+        self.profile_action.toggled.connect(self.toggle_profiling)
+        tray_menu.addAction(self.profile_action)
+        
         tray_menu.addSeparator()
         
         quit_action = QAction("退出", self)
@@ -315,6 +575,12 @@ class MainWindow(QMainWindow):
             self.show_status("请输入内容", "warning")
             return
         
+        if self.submit_entry(text):
+            # 清空输入框
+            self.input_field.clear()
+    
+    def submit_entry(self, text: str) -> bool:
+        """解析并保存一条记录，成功返回 True（输入框和其他实例转发的记录共用）"""
         # 解析输入
         parsed = InputParser.parse_input(text)
         
@@ -323,34 +589,27 @@ class MainWindow(QMainWindow):
             log_id = self.db.add_log(
                 content=parsed["content"],
                 project=parsed["project"],
-                tags=parsed["tags"]
+                tags=parsed["tags"],
+                duration=parsed["duration"]
             )
             
-            # 增加项目使用计数
+            # 每条记录对其中的项目记一次使用（更新热度排序）
             if parsed["project"]:
                 # 项目名可能是多个，用逗号分隔
-                projects = [p.strip() for p in parsed["project"].split(',')]
-                for project_name in projects:
-                    if project_name:  # 确保不为空
-                        try:
-                            self.db.increment_project_usage(project_name)
-                        except Exception as e:
-                            print(f"更新项目 {project_name} 使用计数失败: {e}")
-            
-            # 清空输入框
-            self.input_field.clear()
+                try:
+                    self.db.record_project_usage(parsed["project"].split(','))
+                except Exception as e:
+                    print(f"更新项目使用热度失败: {e}")
             
-            # 重新加载日志
-            self.load_today_logs()
-            
-            # 重新加载项目（更新使用次数排序）
-            self.load_projects()
+            # 列表、补全索引、热力图和项目按钮由变更事件增量更新（见 on_db_event）
             
             # 显示成功状态
             self.show_status(f"已添加记录 #{log_id}", "success")
+            return True
             
         except Exception as e:
             self.show_status(f"添加失败: {str(e)}", "error")
+            return False
     
     def clear_input(self):
         """清空输入框"""
@@ -360,42 +619,154 @@ class MainWindow(QMainWindow):
     
     def load_today_logs(self):
         """加载今天的工作日志"""
+        self.show_day(datetime.now().strftime("%Y-%m-%d"))
+    
+    def step_day(self, offset: int):
+        """前后翻页（不超过今天）"""
+        self.show_day(shift_day(self.current_day, offset))
+    
+    def show_day(self, day: str):
+        """显示某一天的工作日志（优先使用缓存页），并在后台预取相邻日期"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        day = min(day, today)
+        self.current_day = day
+        
+        if day == today:
+            self.day_label.setText("今日记录：")
+        else:
+            self.day_label.setText(f"{day}（周{self.WEEKDAYS[datetime.strptime(day, '%Y-%m-%d').weekday()]}）记录：")
+        self.next_day_btn.setEnabled(day < today)
+        self.today_btn.setVisible(day != today)
+        
         self.log_list.clear()
         
         try:
-            logs = self.db.get_today_logs()
-            
-            if not logs:
-                item = QListWidgetItem("今天还没有记录，开始添加吧！")
-                item.setForeground(QColor("#888888"))
-                self.log_list.addItem(item)
-                return
+            page = self.day_pages.get(day)
+            for row in page.rows:
+                self.log_list.addItem(self.make_row_item(row, day))
             
-            for log in logs:
-                # 格式化显示
-                display_text = InputParser.format_for_display(log)
-                
-                # 添加时间信息
-                created_at = log.get('created_at', '')
-                if created_at:
-                    if isinstance(created_at, str):
-                        time_str = created_at.split()[1][:5] if ' ' in created_at else ''
-                    else:
-                        time_str = created_at.strftime("%H:%M")
-                    
-                    if time_str:
-                        display_text = f"[{time_str}] {display_text}"
-                
-                item = QListWidgetItem(display_text)
-                item.setData(Qt.UserRole, log.get('id'))
-                self.log_list.addItem(item)
+            if not page.rows:
+                self.show_empty_placeholder()
+            else:
+                # 更新状态
+                self.show_status(f"已加载 {len(page.rows)} 条记录", "info")
             
-            # 更新状态
-            self.show_status(f"已加载 {len(logs)} 条记录", "info")
+            self.day_pages.prefetch(day, today)
             
         except Exception as e:
             self.show_status(f"加载失败: {str(e)}", "error")
     
+    @staticmethod
+    def make_log_item(log, attachment_count: int = 0) -> QListWidgetItem:
+        """LogEntry -> 列表项（显示时间、项目、内容、标签、耗时和附件数）"""
+        return MainWindow.make_row_item(format_row(log, attachment_count), log.date)
+    
+    @staticmethod
+    def make_row_item(row: PageRow, day: str) -> QListWidgetItem:
+        """缓存页中的一行 -> 列表项"""
+        item = QListWidgetItem()
+        item.setData(Qt.UserRole, row.log_id)
+        item.setData(Qt.UserRole + 1, day)
+        item.setData(Qt.UserRole + 2, row.text)
+        MainWindow.set_attachment_count(item, row.attachments)
+        return item
+    
+    @staticmethod
+    def set_attachment_count(item: QListWidgetItem, count: int):
+        text = item.data(Qt.UserRole + 2)
+        item.setText(f"{text}  📎{count}" if count else text)
+    
+    def show_log_menu(self, pos: QPoint):
+        """日志列表右键菜单：附件操作和删除"""
+        item = self.log_list.itemAt(pos)
+        if item is None or not item.data(Qt.UserRole):
+            return
+        
+        menu = QMenu(self)
+        self.attachment_actions.populate_menu(menu, item.data(Qt.UserRole))
+        menu.addSeparator()
+        delete_action = QAction("删除记录", menu)
+        delete_action.triggered.connect(lambda: self.delete_log_item(item))
+        menu.addAction(delete_action)
+        menu.exec(self.log_list.mapToGlobal(pos))
+    
+    def show_empty_placeholder(self):
+        if self.current_day == datetime.now().strftime("%Y-%m-%d"):
+            item = QListWidgetItem("今天还没有记录，开始添加吧！")
+        else:
+            item = QListWidgetItem("这一天没有记录")
+        item.setForeground(QColor("#888888"))
+        self.log_list.addItem(item)
+    
+    def find_log_item(self, log_id: int) -> Optional[QListWidgetItem]:
+        for row in range(self.log_list.count()):
+            item = self.log_list.item(row)
+            if item.data(Qt.UserRole) == log_id:
+                return item
+        return None
+    
+    def on_db_event(self, event):
+        """数据库变更事件（在 GUI 线程中处理），只更新受影响的部分"""
+        if isinstance(event, LogAdded):
+            log = event.entry
+            self.day_pages.invalidate([log.date])
+            if log.date == self.current_day:
+                # 去掉“还没有记录”的占位项，新记录插到最上面
+                if self.log_list.count() and self.log_list.item(0).data(Qt.UserRole) is None:
+                    self.log_list.clear()
+                self.log_list.insertItem(0, self.make_log_item(log))
+            self.input_completer.add_entry(log.project, ', '.join(log.tags), log.content)
+            if self.heatmap_window:
+                self.heatmap_window.apply_delta(log.date, 1)
+            # 稍后在后台把新出现的项目导入项目列表
+            if log.projects:
+                self.project_import_timer.start()
+        
+        elif isinstance(event, LogDeleted):
+            self.day_pages.invalidate([event.date])
+            item = self.find_log_item(event.log_id)
+            if item is not None:
+                self.log_list.takeItem(self.log_list.row(item))
+                if self.log_list.count() == 0:
+                    self.show_empty_placeholder()
+            if self.heatmap_window and event.date:
+                self.heatmap_window.apply_delta(event.date, -1)
+        
+        elif isinstance(event, AttachmentsChanged):
+            self.day_pages.invalidate([event.date])
+            item = self.find_log_item(event.log_id)
+            if item is not None:
+                self.set_attachment_count(item, len(self.db.get_attachments(event.log_id)))
+        
+        elif isinstance(event, ProjectsAdded):
+            for name in event.names:
+                self.input_completer.add_project(name)
+            self.load_projects()
+        
+        elif isinstance(event, (ProjectUsageChanged, ProjectDeleted)):
+            # 热度变化只影响按钮栏的顺序（前 N 个项目走索引，查询很便宜）
+            self.load_projects()
+        
+        elif isinstance(event, (LogsImported, ProjectsAssigned)):
+            # 批量导入 / 自动归类：刷新受影响的日期，补全索引按新增 / 更新的记录增量更新
+            self.day_pages.invalidate(event.dates)
+            if self.current_day in event.dates:
+                self.show_day(self.current_day)
+            for project, tags, content in event.entries:
+                self.input_completer.add_entry(project, tags, content)
+            if self.heatmap_window:
+                self.heatmap_window.invalidate()
+            self.project_import_timer.start()
+        
+        elif isinstance(event, ExternalChange):
+            # 其他进程修改了数据库，无法知道具体变化，全部刷新
+            self.day_pages.clear()
+            self.show_day(self.current_day)
+            self.load_projects()
+            self.input_completer.reload()
+            if self.heatmap_window:
+                self.heatmap_window.invalidate()
+    
     def delete_log_item(self, item):
         """删除日志项"""
         if not item:
@@ -417,7 +788,6 @@ class MainWindow(QMainWindow):
             try:
                 success = self.db.delete_log(log_id)
                 if success:
-                    self.log_list.takeItem(self.log_list.row(item))
                     self.show_status("记录已删除", "success")
                 else:
                     self.show_status("删除失败", "error")
@@ -425,31 +795,285 @@ class MainWindow(QMainWindow):
                 self.show_status(f"删除失败: {str(e)}", "error")
     
     def generate_report(self):
-        """生成周报"""
+        """生成周报（Markdown）"""
+        self.start_report_job("md")
+    
+    def start_report_job(self, fmt: str, query: Optional[str] = None):
+        """在后台线程中生成周报，界面保持响应（fmt: md / html / docx）"""
+        self._start_report_job(export_weekly_report, self.db, fmt, query=query)
+    
+    def generate_filtered_report(self):
+        """只统计满足筛选条件的记录生成本周周报"""
+        query, ok = QInputDialog.getText(
+            self, "按筛选条件生成周报", "筛选条件（如 project:Unity tag:bug）：",
+            text=self.last_report_query
+        )
+        if not ok or not query.strip():
+            return
         try:
-            from service.report import ReportGenerator
-            
-            filepath, report = ReportGenerator.generate_and_export_weekly_report(self.db)
-            
-            # 显示成功消息
-            QMessageBox.information(
-                self, 
-                "周报生成成功",
-                f"周报已生成并保存到：\n{os.path.abspath(filepath)}"
-            )
-            
-            self.show_status("周报生成成功", "success")
-            
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "周报生成失败",
-                f"生成周报时出错：\n{str(e)}"
-            )
-            self.show_status(f"周报生成失败: {str(e)}", "error")
+            QueryParser.compile(query)
+        except QueryError as e:
+            QMessageBox.warning(self, "筛选条件有误", str(e))
+            return
+        self.last_report_query = query.strip()
+        self.start_report_job("md", self.last_report_query)
     
-    def show_status(self, message: str, status_type: str = "info"):
-        """显示状态消息"""
+    def generate_batch_reports(self):
+        """选择周期和日期范围，批量生成（重新生成）每个周期的报告"""
+        choices = [("每周（周报）", "week"), ("每两周（迭代报告）", "sprint"), ("每月（月报）", "month")]
+        label, ok = QInputDialog.getItem(
+            self, "批量生成报告", "报告周期：", [c[0] for c in choices], 0, False
+        )
+        if not ok:
+            return
+        period = dict(choices)[label]
+        
+        today = datetime.now()
+        span, ok = QInputDialog.getText(
+            self, "批量生成报告", "日期范围（首尾会扩展到完整的周期）：",
+            text=f"{today.year}-01-01 ~ {today.strftime('%Y-%m-%d')}"
+        )
+        if not ok:
+            return
+        dates = re.findall(r"\d{4}-\d{2}-\d{2}", span)
+        try:
+            start_date, end_date = sorted(datetime.strptime(d, "%Y-%m-%d").strftime("%Y-%m-%d") for d in dates)
+        except ValueError:
+            QMessageBox.warning(self, "日期范围有误", "请填写起止两个日期，如 2026-01-01 ~ 2026-03-31")
+            return
+        self._start_report_job(export_batch_reports, self.db, start_date, end_date, period)
+    
+    def load_template_menu(self):
+        """打开菜单时列出可用模板（模板目录可能随时有增减）"""
+        self.template_menu.clear()
+        names = self.template_loader.list_templates()
+        if not names:
+            empty_action = QAction("（没有可用模板）", self)
+            empty_action.setEnabled(False)
+            self.template_menu.addAction(empty_action)
+            return
+        for name in names:
+            template_action = QAction(name, self)
+            template_action.triggered.connect(lambda checked=False, n=name: self.start_templated_report_job(n))
+            self.template_menu.addAction(template_action)
+    
+    def start_templated_report_job(self, name: str):
+        """在后台线程中按模板生成报告"""
+        self._start_report_job(export_templated_report, self.db, name, self.template_loader)
+    
+    def _start_report_job(self, func, *args, **kwargs):
+        if self.report_job is not None:
+            self.show_status("周报正在生成中…", "info")
+            return
+        
+        self.report_job = BackgroundJob(func, *args, cancel_exception=ReportCancelled, **kwargs)
+        self.report_job.signals.progress.connect(self.on_report_progress)
+        self.report_job.signals.finished.connect(self.on_report_finished)
+        self.report_job.signals.failed.connect(self.on_report_failed)
+        self.report_job.signals.cancelled.connect(self.on_report_cancelled)
+        
+        self.cancel_job_btn.show()
+        self.set_status_text("正在生成周报…", "info")
+        self.report_job.start()
+    
+    def cancel_report(self):
+        """取消正在生成的周报"""
+        if self.report_job is not None:
+            self.report_job.cancel()
+            self.set_status_text("正在取消…", "warning")
+    
+    def on_report_progress(self, percent: int, stage: str):
+        """周报生成进度"""
+        self.set_status_text(f"正在生成周报：{stage}（{percent}%）", "info")
+    
+    def _finish_report_job(self):
+        self.report_job = None
+        self.cancel_job_btn.hide()
+    
+    def on_report_finished(self, result):
+        """周报生成完成"""
+        self._finish_report_job()
+        if isinstance(result, list):
+            # 批量生成：返回全部文件路径
+            folder = os.path.abspath(os.path.dirname(result[0])) if result else os.path.abspath("export")
+            QMessageBox.information(self, "报告生成成功", f"已生成 {len(result)} 份报告，保存在：\n{folder}")
+            self.show_status(f"已生成 {len(result)} 份报告", "success")
+            return
+        filepath, _report = result
+        
+        # 显示成功消息
+        QMessageBox.information(
+            self, 
+            "周报生成成功",
+            f"周报已生成并保存到：\n{os.path.abspath(filepath)}"
+        )
+        
+        self.show_status("周报生成成功", "success")
+    
+    def on_report_failed(self, error: str):
+        """周报生成失败"""
+        self._finish_report_job()
+        QMessageBox.critical(
+            self,
+            "周报生成失败",
+            f"生成周报时出错：\n{error}"
+        )
+        self.show_status(f"周报生成失败: {error}", "error")
+    
+    def on_report_cancelled(self):
+        """周报生成已取消"""
+        self._finish_report_job()
+        self.show_status("已取消生成周报", "warning")
+    
+    def add_git_repositories(self):
+        """选择仓库目录（或包含多个仓库的目录）并立即导入"""
+        path = QFileDialog.getExistingDirectory(self, "选择 git 仓库或包含多个仓库的目录")
+        if not path:
+            return
+        importer = GitImporter(self.db)
+        added = importer.add_repositories([path])
+        if not added:
+            if importer.get_repositories():
+                self.show_status("没有新的仓库，开始同步", "info")
+                self.start_git_import()
+            else:
+                self.show_status("所选目录中没有 git 仓库", "warning")
+            return
+        names = ', '.join(f"[{project}]" for project in added.values())
+        self.show_status(f"已添加 {len(added)} 个仓库：{names}", "success")
+        self.start_git_import()
+    
+    def start_git_import(self):
+        """在后台导入所有已添加仓库的新提交"""
+        if self.git_import_job is not None:
+            self.show_status("正在从 git 导入…", "info")
+            return
+        self.git_import_job = BackgroundJob(import_git_history, self.db)
+        self.git_import_job.signals.progress.connect(
+            lambda percent, project: self.set_status_text(f"正在从 git 导入：{project}（{percent}%）", "info"))
+        self.git_import_job.signals.finished.connect(self.on_git_import_finished)
+        self.git_import_job.signals.failed.connect(self.on_git_import_failed)
+        self.git_import_job.start()
+    
+    def on_git_import_finished(self, results):
+        self.git_import_job = None
+        if not results:
+            self.show_status("还没有添加 git 仓库", "warning")
+            return
+        added = sum(result.added for result in results)
+        errors = [result for result in results if result.error]
+        message = f"从 {len(results)} 个仓库导入 {added} 条记录"
+        if errors:
+            message += f"，{len(errors)} 个仓库失败"
+            print("git 导入失败:\n" + "\n".join(result.error for result in errors))
+        self.show_status(message, "warning" if errors else "success")
+    
+    def on_git_import_failed(self, error: str):
+        self.git_import_job = None
+        self.show_status(f"从 git 导入失败: {error}", "error")
+    
+    def start_classify(self):
+        """在后台更新归类模型，并为未分类的记录计算建议的项目"""
+        if self.classify_job is not None:
+            self.show_status("正在自动归类…", "info")
+            return
+        self.set_status_text("正在计算归类建议…", "info")
+        self.classify_job = BackgroundJob(classify_unlabeled, self.db)
+        self.classify_job.signals.finished.connect(self.confirm_classify)
+        self.classify_job.signals.failed.connect(self.on_classify_failed)
+        self.classify_job.start()
+    
+    def confirm_classify(self, suggestions):
+        """列出各项目可归入的记录数，确认后写入"""
+        self.classify_job = None
+        confident = [s for s in suggestions if s.confident]
+        if not confident:
+            message = "没有未分类的记录" if not suggestions else f"{len(suggestions)} 条未分类记录都无法可靠地归类"
+            self.show_status(message, "info")
+            return
+        
+        counts = {}
+        for suggestion in confident:
+            counts[suggestion.project] = counts.get(suggestion.project, 0) + 1
+        lines = [f"  [{project}] {count} 条" for project, count in sorted(counts.items(), key=lambda p: -p[1])]
+        reply = QMessageBox.question(
+            self, '自动归类',
+            f"共 {len(suggestions)} 条未分类记录，其中 {len(confident)} 条可以归入已有项目：\n"
+            + "\n".join(lines) + "\n\n是否应用？",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.Yes
+        )
+        if reply != QMessageBox.Yes:
+            self.show_status("已取消自动归类", "info")
+            return
+        
+        self.classify_job = BackgroundJob(apply_suggestions, self.db, confident)
+        self.classify_job.signals.finished.connect(self.on_classify_applied)
+        self.classify_job.signals.failed.connect(self.on_classify_failed)
+        self.classify_job.start()
+    
+    def on_classify_applied(self, count: int):
+        self.classify_job = None
+        self.show_status(f"已为 {count} 条记录设置项目", "success")
+    
+    def on_classify_failed(self, error: str):
+        self.classify_job = None
+        self.show_status(f"自动归类失败: {error}", "error")
+    
+    def toggle_profiling(self, enabled: bool):
+        """开始 / 提前结束性能采集"""
+        if not enabled:
+            if self.profile_session is not None:
+                self.profile_session.stop()
+            return
+        if self.profile_session is not None:
+            return
+        
+        output_dir = os.path.join(os.path.dirname(os.path.abspath(self.db.db_path)), 'profiles')
+        self.profile_session = ProfileSession(output_dir, parent=self, pool_stats=self.db.get_pool_stats)
+        self.profile_session.finished.connect(self.on_profiling_finished)
+        self.profile_session.failed.connect(self.on_profiling_failed)
+        self.profile_session.start()
+        self.show_status(f"正在采集性能数据（{CAPTURE_SECONDS} 秒）…", "info")
+    
+    def _finish_profiling(self):
+        self.profile_session.deleteLater()
+        self.profile_session = None
+        # 自动停止时同步菜单勾选状态（不再触发 toggled）
+        self.profile_action.blockSignals(True)
+        self.profile_action.setChecked(False)
+        self.profile_action.blockSignals(False)
+    
+    def on_profiling_finished(self, summary_path: str):
+        self._finish_profiling()
+        self.show_status("性能数据已保存", "success")
+        self.tray_icon.showMessage("性能采集完成", f"结果已保存到：\n{summary_path}")
+    
+    def on_profiling_failed(self, error: str):
+        self._finish_profiling()
+        self.show_status(f"保存性能数据失败: {error}", "error")
+    
+    def show_heatmap(self):
+        """显示记录热力图"""
+        if self.heatmap_window is None:
+            self.heatmap_window = HeatmapWindow(self.db)
+        
+        self.heatmap_window.show()
+        self.heatmap_window.raise_()
+        self.heatmap_window.activateWindow()
+    
+    def show_search(self):
+        """显示查找记录窗口"""
+        if self.search_window is None:
+            self.search_window = SearchWindow(self.db, self.db_events)
+        
+        self.search_window.show()
+        self.search_window.raise_()
+        self.search_window.activateWindow()
+        self.search_window.query_input.setFocus()
+    
+    def set_status_text(self, message: str, status_type: str = "info"):
+        """设置状态栏文字（不会自动清除，用于显示任务进度）"""
         colors = {
             "info": "#666666",
             "success": "#4CAF50",
@@ -460,9 +1084,13 @@ class MainWindow(QMainWindow):
         color = colors.get(status_type, "#666666")
         self.status_label.setText(message)
         self.status_label.setStyleSheet(f"color: {color}; font-size: 11px; margin-top: 5px;")
+    
+    def show_status(self, message: str, status_type: str = "info"):
+        """显示状态消息"""
+        self.set_status_text(message, status_type)
         
-        # 3秒后清除状态
-        QTimer.singleShot(3000, lambda: self.status_label.setText("就绪"))
+        # 3秒后清除状态（期间被其他消息覆盖时不清除）
+        QTimer.singleShot(3000, lambda: self.status_label.text() == message and self.status_label.setText("就绪"))
     
     def show_window(self):
         """显示窗口"""
@@ -470,6 +1098,13 @@ class MainWindow(QMainWindow):
         self.raise_()
         self.activateWindow()
     
+    def handle_instance_message(self, message: dict):
+        """处理再次启动的实例转发来的消息"""
+        text = (message.get("text") or "").strip()
+        if message.get("action") == "add" and text:
+            self.submit_entry(text)
+        self.show_window()
+    
     def hide_window(self):
         """隐藏窗口"""
         self.hide()
@@ -477,6 +1112,14 @@ class MainWindow(QMainWindow):
     
     def quit_app(self):
         """退出应用程序"""
+        if self.profile_session is not None:
+            self.profile_session.stop()
+        self.maintenance.stop()
+        self.day_pages.stop()
+        self.input_completer.stop()
+        if self.heatmap_window:
+            self.heatmap_window.stop()
+        self.db_events.close()
         self.db.close()
         self.tray_icon.hide()
         QApplication.quit()
@@ -490,8 +1133,8 @@ class MainWindow(QMainWindow):
                 widget.deleteLater()
         
         try:
-            # 从数据库获取项目
-            projects = self.db.get_all_projects()
+            # 从数据库获取热度最高的项目（已按热度排序）
+            projects = self.db.get_top_projects(self.MAX_PROJECT_BUTTONS)
             
             if not projects:
                 # 如果没有项目，显示提示
@@ -500,9 +1143,6 @@ class MainWindow(QMainWindow):
                 self.projects_layout.addWidget(empty_label)
                 return
             
-            # 按使用次数排序（降序）
-            projects.sort(key=lambda x: x.get('usage_count', 0), reverse=True)
-            
             for project in projects:
                 project_name = project.get('name', '')
                 usage_count = project.get('usage_count', 0)
@@ -512,7 +1152,8 @@ class MainWindow(QMainWindow):
                 
                 # 创建项目按钮
                 btn = QPushButton(f"[{project_name}]")
-                btn.setToolTip(f"点击插入项目名\n使用次数: {usage_count}")
+                last_used = project.get('last_used_at') or '从未使用'
+                btn.setToolTip(f"点击插入项目名\n使用次数: {usage_count}\n最近使用: {last_used}")
                 btn.setFixedHeight(30)
                 btn.setStyleSheet("""
                     QPushButton {
@@ -563,12 +1204,6 @@ class MainWindow(QMainWindow):
         new_cursor_position = cursor_position + len(f"[{project_name}]")
         self.input_field.setCursorPosition(new_cursor_position)
         
-        # 增加项目使用计数
-        try:
-            self.db.increment_project_usage(project_name)
-        except Exception as e:
-            print(f"更新项目使用计数失败: {e}")
-        
         # 聚焦输入框
         self.input_field.setFocus()
         
@@ -577,17 +1212,23 @@ class MainWindow(QMainWindow):
     def import_projects_from_history(self):
         """从历史记录导入项目"""
         try:
-            imported_count = self.db.get_projects_from_history()
+            imported = self.db.import_projects_from_history()
             
-            if imported_count > 0:
-                self.load_projects()
-                self.show_status(f"已从历史记录导入 {imported_count} 个项目", "success")
+            if imported:
+                self.show_status(f"已从历史记录导入 {len(imported)} 个项目", "success")
             else:
                 self.show_status("没有找到新的项目可以导入", "info")
                 
         except Exception as e:
             self.show_status(f"导入项目失败: {str(e)}", "error")
     
+    def auto_import_projects(self):
+        """后台增量导入新项目（静默执行，有新项目时由 ProjectsAdded 事件刷新按钮栏）"""
+        try:
+            self.db.import_projects_from_history()
+        except Exception as e:
+            print(f"自动导入项目失败: {e}")
+    
     def add_new_project(self):
         """添加新项目"""
         from PySide6.QtWidgets import QInputDialog
@@ -611,9 +1252,6 @@ class MainWindow(QMainWindow):
                 # 添加到数据库
                 self.db.add_project(project_name)
                 
-                # 重新加载项目
-                self.load_projects()
-                
                 self.show_status(f"已添加项目: [{project_name}]", "success")
                 
             except Exception as e:
@@ -625,14 +1263,44 @@ class MainWindow(QMainWindow):
             self.show_status("项目名称不能为空", "warning")
 
 
-def main():
-    """应用程序入口"""
+def main(initial_text: Optional[str] = None):
+    """应用程序入口（initial_text 为命令行传入的记录，启动后直接添加）"""
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
+    mark_startup('qapplication')
+    
+    # 监听后续启动的实例，由它们转发“显示窗口 / 添加记录”
+    instance_server = SingleInstanceServer(app)
+    if not instance_server.acquire():
+        # 另一个实例正在运行，只是没有及时响应（正在迁移、维护，或与本实例同时启动）
+        message = {"action": "add", "text": initial_text} if initial_text else {"action": "show"}
+        if send_with_retry(message):
+            print("WorkTag 已在运行，已通知现有窗口")
+        else:
+            print("WorkTag 已在运行，但现有实例没有响应")
+        return
+    if not instance_server.listen():
+        print(f"单实例监听失败: {instance_server.server.errorString()}")
     
-    window = MainWindow()
+    # 打开数据库期间事件循环仍在运行：其他实例转发的消息先暂存，窗口创建后再处理
+    pending_messages = []
+    instance_server.message_received.connect(pending_messages.append)
+    db = open_database()
+    mark_startup('database')
+    
+    window = MainWindow(db)
+    mark_startup('main_window')
+    instance_server.message_received.disconnect(pending_messages.append)
+    instance_server.message_received.connect(window.handle_instance_message)
+    # 启动测量时，首次绘制后记录时间并退出
+    StartupProbe.install(window, window.quit_app)
     window.show()
     
+    if initial_text:
+        window.submit_entry(initial_text)
+    for message in pending_messages:
+        window.handle_instance_message(message)
+    
     sys.exit(app.exec())
 
 
@@ -0,0 +1,80 @@
+import time
+from typing import Optional
+
+from PySide6.QtCore import QObject, QThreadPool, QTimer, Signal
+
+from db.maintenance import MaintenanceRunner, MaintenanceResult
+from ui.workers import BackgroundJob
+
+
+def run_maintenance_step(runner: MaintenanceRunner, progress=None) -> Optional[MaintenanceResult]:
+    """执行下一个到期的维护步骤（在后台线程中执行）"""
+    return runner.run_next()
+
+
+class MaintenanceScheduler(QObject):
+    """在用户空闲时执行数据库维护
+
+    窗口隐藏到托盘，或窗口不在前台且 IDLE_SECONDS 内没有输入时视为空闲；
+    每次检查最多执行一个步骤，步骤本身有时间预算（见 db/maintenance.py）。
+    """
+
+    CHECK_INTERVAL_MS = 60 * 1000
+    IDLE_SECONDS = 120
+
+    step_finished = Signal(object)
+    step_failed = Signal(str)
+
+    def __init__(self, db, window, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.window = window
+        self.runner = MaintenanceRunner(db)
+        self.job: Optional[BackgroundJob] = None
+        self.last_activity = time.monotonic()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.CHECK_INTERVAL_MS)
+        self.timer.timeout.connect(self.tick)
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self, wait_ms: int = 2000):
+        """停止调度，并等待正在执行的步骤结束（退出前调用）"""
+        self.timer.stop()
+        if self.job is not None:
+            QThreadPool.globalInstance().waitForDone(wait_ms)
+
+    def note_activity(self):
+        """用户有输入时调用，推迟维护"""
+        self.last_activity = time.monotonic()
+
+    def is_idle(self) -> bool:
+        if not self.window.isVisible():
+            return True
+        if self.window.isActiveWindow():
+            return False
+        return time.monotonic() - self.last_activity >= self.IDLE_SECONDS
+
+    def tick(self):
+        if self.job is not None or not self.is_idle():
+            return
+        # 正在生成报告等后台任务时不做维护
+        if getattr(self.window, 'report_job', None) is not None:
+            return
+
+        self.job = BackgroundJob(run_maintenance_step, self.runner)
+        self.job.signals.finished.connect(self.on_finished)
+        self.job.signals.failed.connect(self.on_failed)
+        self.job.start()
+
+    def on_finished(self, result: Optional[MaintenanceResult]):
+        self.job = None
+        if result is not None:
+            print(f"[数据库维护] {result}")
+            self.step_finished.emit(result)
+
+    def on_failed(self, error: str):
+        self.job = None
+        print(f"[数据库维护] 失败: {error}")
+        self.step_failed.emit(error)
@@ -0,0 +1,269 @@
+import cProfile
+import heapq
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QEvent, QObject, Qt, QTimer, Signal
+
+# 一次采集的时长（秒），到时自动停止并写出结果
+CAPTURE_SECONDS = 60
+# 事件循环延迟的采样间隔（毫秒）
+LAG_INTERVAL_MS = 50
+# tracemalloc 为每次分配保存的调用栈深度
+TRACE_FRAMES = 10
+# 结果摘要中列出的条目数
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 30
+
+# 启动测量（startup_bench.py）：设置为文件路径时，主窗口首次绘制完成后写出各阶段时间并退出
+STARTUP_PROBE_ENV = 'WORKTAG_STARTUP_PROBE'
+_startup_marks: List[Tuple[str, float]] = []
+
+
+def mark_startup(stage: str, at: Optional[float] = None):
+    """记录启动阶段的时间点（只在启动测量时记录）"""
+    if os.environ.get(STARTUP_PROBE_ENV):
+        _startup_marks.append((stage, at if at is not None else time.time()))
+
+
+class LagSampler(QObject):
+    """以固定间隔采样事件循环延迟
+
+    定时器本应每 LAG_INTERVAL_MS 触发一次，实际间隔超出的部分就是事件循环被
+    阻塞的时间。每次采样只更新直方图、累计值和固定大小的最慢记录堆，开销恒定。
+    """
+
+    # 直方图分档上限（毫秒）；最后一档为超过 1 秒
+    BUCKETS = (16, 50, 100, 250, 500, 1000)
+    # 保留最慢的若干次卡顿
+    MAX_STALLS = 20
+
+    def __init__(self, interval_ms: int = LAG_INTERVAL_MS, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.interval_ms = interval_ms
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._sample)
+
+        self.histogram = [0] * (len(self.BUCKETS) + 1)
+        self.samples = 0
+        self.total_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.stalls: List[Tuple[float, float]] = []  # (延迟, 距开始的秒数) 小顶堆
+        self._start = 0.0
+        self._last = 0.0
+
+    def start(self):
+        self._start = self._last = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def _sample(self):
+        now = time.perf_counter()
+        lag_ms = max((now - self._last) * 1000 - self.interval_ms, 0.0)
+        self._last = now
+
+        self.samples += 1
+        self.total_lag_ms += lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        bucket = 0
+        while bucket < len(self.BUCKETS) and lag_ms > self.BUCKETS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+        stall = (lag_ms, now - self._start)
+        if len(self.stalls) < self.MAX_STALLS:
+            heapq.heappush(self.stalls, stall)
+        elif lag_ms > self.stalls[0][0]:
+            heapq.heapreplace(self.stalls, stall)
+
+    def report(self) -> List[str]:
+        average = self.total_lag_ms / self.samples if self.samples else 0.0
+        lines = [
+            f"采样间隔 {self.interval_ms}ms，共 {self.samples} 次，"
+            f"平均延迟 {average:.1f}ms，最大延迟 {self.max_lag_ms:.0f}ms",
+            "",
+            "延迟分布：",
+        ]
+        lower = 0
+        for upper, count in zip(self.BUCKETS + (None,), self.histogram):
+            label = f"{lower}-{upper}ms" if upper is not None else f">{lower}ms"
+            lines.append(f"  {label:>12}: {count}")
+            lower = upper
+        stalls = [s for s in sorted(self.stalls, reverse=True) if s[0] > self.BUCKETS[0]]
+        if stalls:
+            lines += ["", "最慢的卡顿（延迟 / 发生时间）："]
+            lines += [f"  {lag:8.0f}ms  第 {offset:.1f} 秒" for lag, offset in stalls]
+        return lines
+
+
+class ProfileSession(QObject):
+    """一次性能采集：cProfile + tracemalloc + 事件循环延迟
+
+    start() 后开始采集，CAPTURE_SECONDS 秒后（或调用 stop() 时）写出：
+        profile_<时间>.pstats      cProfile 原始数据（python -m pstats 或 snakeviz 查看）
+        profile_<时间>.tracemalloc 结束时的内存分配快照（tracemalloc.Snapshot.load 读取）
+        profile_<时间>.txt         摘要：事件循环延迟、只读连接池统计、耗时最多的函数、内存分配排行和增长
+    cProfile 只统计 GUI 线程，后台线程中的报告、维护等任务不在其中；后台任务借用只读连接的
+    等待情况见连接池统计（pool_stats 为 Database.get_pool_stats）。
+    """
+
+    finished = Signal(str)  # 摘要文件路径
+    failed = Signal(str)
+
+    def __init__(self, output_dir: str, seconds: int = CAPTURE_SECONDS, parent: Optional[QObject] = None,
+                 pool_stats: Optional[Callable[[], Dict[str, float]]] = None):
+        super().__init__(parent)
+        self.output_dir = output_dir
+        self.seconds = seconds
+        self.pool_stats = pool_stats
+        self.profiler: Optional[cProfile.Profile] = None
+        self.lag = LagSampler(parent=self)
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_tracemalloc = False
+        self._started_at = None
+
+        self.stop_timer = QTimer(self)
+        self.stop_timer.setSingleShot(True)
+        self.stop_timer.timeout.connect(self.stop)
+
+    @property
+    def running(self) -> bool:
+        return self.profiler is not None
+
+    def start(self):
+        if self.running:
+            return
+        self._started_at = datetime.now()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started_tracemalloc = True
+        self._baseline = tracemalloc.take_snapshot()
+        self.lag.start()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        self.stop_timer.start(self.seconds * 1000)
+
+    def stop(self):
+        """停止采集并写出结果"""
+        if not self.running:
+            return
+        self.profiler.disable()
+        self.stop_timer.stop()
+        self.lag.stop()
+        profiler, self.profiler = self.profiler, None
+
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            summary_path = self._write(profiler, snapshot)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(summary_path)
+        finally:
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            self._baseline = None
+
+    def _write(self, profiler: cProfile.Profile, snapshot: tracemalloc.Snapshot) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile_{self._started_at.strftime('%Y%m%d_%H%M%S')}")
+        elapsed = (datetime.now() - self._started_at).total_seconds()
+
+        profiler.dump_stats(base + '.pstats')
+
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ]
+        snapshot = snapshot.filter_traces(filters)
+        snapshot.dump(base + '.tracemalloc')
+
+        stats_text = io.StringIO()
+        pstats.Stats(profiler, stream=stats_text).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"WorkTag 性能采集 {self._started_at.strftime('%Y-%m-%d %H:%M:%S')}，时长 {elapsed:.1f} 秒",
+            "",
+            "== 事件循环延迟 ==",
+            *self.lag.report(),
+            "",
+        ]
+        if self.pool_stats is not None:
+            lines += ["== 只读连接池（自启动以来）==", *self.pool_report(self.pool_stats()), ""]
+        lines += [
+            f"== 内存分配（当前 {current / 1024:.0f} KiB，峰值 {peak / 1024:.0f} KiB）==",
+        ]
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            lines.append(f"  {stat}")
+        if self._baseline is not None:
+            lines += ["", "== 采集期间的内存增长 =="]
+            growth = snapshot.compare_to(self._baseline.filter_traces(filters), 'lineno')
+            for stat in growth[:TOP_ALLOCATIONS]:
+                if stat.size_diff <= 0:
+                    break
+                lines.append(f"  {stat}")
+        lines += ["", "== 耗时最多的函数（GUI 线程，按累计时间）==", stats_text.getvalue()]
+
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        return base + '.txt'
+
+    @staticmethod
+    def pool_report(stats: Dict[str, float]) -> List[str]:
+        """连接池统计（ReaderPool.stats）-> 摘要中的几行"""
+        return [
+            f"  连接: 已创建 {stats['created']}/{stats['max_readers']}，借出中 {stats['in_use']}，"
+            f"峰值 {stats['peak_in_use']}",
+            f"  借用: {stats['borrows']} 次，其中等待 {stats['waits']} 次",
+            f"  等待: 平均 {stats['avg_wait_ms']:.1f}ms，最长 {stats['max_wait_ms']:.1f}ms",
+            f"  占用: 平均 {stats['avg_hold_ms']:.1f}ms",
+        ]
+
+
+class StartupProbe(QObject):
+    """启动测量：监听主窗口的首次绘制
+
+    收到第一个绘制事件后，等本轮事件处理完（绘制已完成）再记录时间，
+    把各阶段时间点写成 JSON（{"marks": [[阶段, 时间戳], ...]}），然后调用 on_done 退出。
+    时间戳为 time.time()，与启动进程的测量脚本直接相减即为各阶段耗时。
+    """
+
+    def __init__(self, window, path: str, on_done: Callable[[], None]):
+        super().__init__(window)
+        self.window = window
+        self.path = path
+        self.on_done = on_done
+        self._painted = False
+        window.installEventFilter(self)
+
+    @classmethod
+    def install(cls, window, on_done: Callable[[], None]) -> Optional['StartupProbe']:
+        """设置了 WORKTAG_STARTUP_PROBE 时安装到主窗口"""
+        path = os.environ.get(STARTUP_PROBE_ENV)
+        return cls(window, path, on_done) if path else None
+
+    def eventFilter(self, obj, event) -> bool:
+        if not self._painted and obj is self.window and event.type() == QEvent.Paint:
+            self._painted = True
+            QTimer.singleShot(0, self._finish)
+        return False
+
+    def _finish(self):
+        mark_startup('first_paint')
+        self.window.removeEventFilter(self)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'marks': _startup_marks}, f)
+        self.on_done()
@@ -0,0 +1,161 @@
+import time
+from typing import Optional
+
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QListWidget, QListWidgetItem,
+    QPushButton, QPlainTextEdit
+)
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QColor
+
+from service.parser import InputParser
+from service.query import QueryError, compile_for, explain_query
+
+
+class SearchWindow(QWidget):
+    """按筛选语句查找记录（语法见 service/query.py）
+
+    输入停顿 DEBOUNCE_MS 后执行查询；查询编译为走索引的 SQL，结果最多显示
+    RESULT_LIMIT 条。数据库变化时（events 为 QtEventBridge）自动重新查询。
+    """
+
+    DEBOUNCE_MS = 200
+    RESULT_LIMIT = 200
+
+    def __init__(self, db, events=None, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.db = db
+        self.setWindowTitle("WorkTag - 查找记录")
+        self.setWindowFlags(Qt.Tool | Qt.WindowStaysOnTopHint)
+        self.resize(520, 420)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #2b2b2b;
+                color: #aaaaaa;
+                font-size: 12px;
+            }
+            QLineEdit, QPlainTextEdit {
+                background-color: #3c3c3c;
+                color: #ffffff;
+                border: 1px solid #555;
+                border-radius: 4px;
+                padding: 6px;
+            }
+            QListWidget {
+                color: #ffffff;
+                border: none;
+                font-size: 13px;
+            }
+            QListWidget::item {
+                padding: 4px;
+                border-bottom: 1px solid #3c3c3c;
+            }
+            QPushButton {
+                background-color: #3c3c3c;
+                color: #ffffff;
+                border: 1px solid #555;
+                border-radius: 4px;
+                padding: 2px 8px;
+            }
+            QPushButton:hover {
+                background-color: #4a4a4a;
+            }
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(12, 12, 12, 12)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText('例如：project:Unity tag:bug since:2026-01-01 "回调"')
+        self.query_input.textChanged.connect(lambda: self.search_timer.start())
+        layout.addWidget(self.query_input)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+
+        self.result_list = QListWidget()
+        layout.addWidget(self.result_list)
+
+        self.plan_view = QPlainTextEdit()
+        self.plan_view.setReadOnly(True)
+        self.plan_view.setFixedHeight(110)
+        self.plan_view.hide()
+        layout.addWidget(self.plan_view)
+
+        footer = QHBoxLayout()
+        self.status_label = QLabel()
+        plan_btn = QPushButton("查询计划")
+        plan_btn.setToolTip("显示编译后的 SQL 和 SQLite 查询计划")
+        plan_btn.clicked.connect(self.toggle_plan)
+        footer.addWidget(self.status_label)
+        footer.addStretch()
+        footer.addWidget(plan_btn)
+        layout.addLayout(footer)
+
+        if events is not None:
+            events.event.connect(self.on_db_event)
+
+    def set_query(self, text: str):
+        self.query_input.setText(text)
+        self.run_search()
+
+    def run_search(self):
+        self.search_timer.stop()
+        text = self.query_input.text().strip()
+        self.result_list.clear()
+        if not text:
+            self.status_label.setText("输入筛选条件")
+            self.plan_view.clear()
+            return
+
+        start = time.perf_counter()
+        try:
+            compiled = compile_for(self.db, text)
+            # 多取一条，用于判断结果是否被截断
+            logs = list(self.db.iter_logs_where(compiled.where, dict(compiled.params), self.RESULT_LIMIT + 1))
+        except QueryError as e:
+            self.status_label.setText(str(e))
+            return
+        except Exception as e:
+            self.status_label.setText(f"查询失败: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        for log in logs[:self.RESULT_LIMIT]:
+            display_text = InputParser.format_entry(log.content, log.projects, log.tags, log.duration)
+            item = QListWidgetItem(f"{log.date} {log.time} {display_text}")
+            item.setData(Qt.UserRole, log.id)
+            self.result_list.addItem(item)
+        if not logs:
+            item = QListWidgetItem("没有符合条件的记录")
+            item.setForeground(QColor("#888888"))
+            self.result_list.addItem(item)
+
+        more = f"（仅显示前 {self.RESULT_LIMIT} 条）" if len(logs) > self.RESULT_LIMIT else ""
+        self.status_label.setText(f"{min(len(logs), self.RESULT_LIMIT)} 条{more}，耗时 {elapsed_ms:.1f}ms")
+        if self.plan_view.isVisible():
+            self.show_plan()
+
+    def toggle_plan(self):
+        if self.plan_view.isVisible():
+            self.plan_view.hide()
+            return
+        self.plan_view.show()
+        self.show_plan()
+
+    def show_plan(self):
+        text = self.query_input.text().strip()
+        if not text:
+            self.plan_view.clear()
+            return
+        try:
+            self.plan_view.setPlainText('\n'.join(explain_query(self.db, text)))
+        except Exception as e:
+            self.plan_view.setPlainText(str(e))
+
+    def on_db_event(self, event):
+        """记录有增删时重新查询（窗口隐藏时不处理）"""
+        if self.isVisible() and self.query_input.text().strip():
+            self.search_timer.start()
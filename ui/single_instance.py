@@ -0,0 +1,122 @@
+import getpass
+import json
+import os
+import re
+import time
+from typing import Dict, Optional, Sequence
+
+from PySide6.QtCore import QDir, QLockFile, QObject, Signal
+from PySide6.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
+
+# 第二个实例连接/发送消息的超时时间（毫秒）；正在运行的实例一般在几毫秒内响应
+CONNECT_TIMEOUT_MS = 300
+# 单实例锁被存活的实例持有、但它没有及时响应时（正在迁移、维护，或与本实例同时启动），
+# 重试转交消息前的等待时间（毫秒，逐次加倍）
+RETRY_DELAYS_MS = (200, 400, 800, 1600, 3200)
+
+
+def server_name() -> str:
+    """本地套接字名称（按用户区分，避免多用户同时登录时互相干扰）"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = 'user'
+    return 'WorkTag-' + re.sub(r'[^A-Za-z0-9_.-]', '_', user)
+
+
+def lock_path() -> str:
+    """单实例锁文件路径（与套接字名称一样按用户区分）"""
+    return os.path.join(QDir.tempPath(), server_name() + '.lock')
+
+
+def send_to_running_instance(message: Dict, timeout_ms: int = CONNECT_TIMEOUT_MS) -> bool:
+    """把消息发给正在运行的实例；没有实例在运行时返回 False
+
+    只用到 QtNetwork，不创建 QApplication、不打开数据库，供启动时尽早调用。
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(timeout_ms):
+        return False
+
+    socket.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+    sent = socket.waitForBytesWritten(timeout_ms)
+    socket.disconnectFromServer()
+    if socket.state() != QLocalSocket.UnconnectedState:
+        socket.waitForDisconnected(timeout_ms)
+    return sent
+
+
+def send_with_retry(message: Dict, delays_ms: Sequence[int] = RETRY_DELAYS_MS) -> bool:
+    """已知有实例在运行（持有单实例锁）时转交消息：对方正忙时按退避间隔重试"""
+    if send_to_running_instance(message):
+        return True
+    for delay in delays_ms:
+        time.sleep(delay / 1000)
+        if send_to_running_instance(message, CONNECT_TIMEOUT_MS + delay):
+            return True
+    return False
+
+
+class SingleInstanceServer(QObject):
+    """在首个实例中监听本地套接字，接收后续启动的实例转发的消息
+
+    消息为一行 JSON：
+        {"action": "show"}                 显示主窗口
+        {"action": "add", "text": "..."}   添加一条记录（格式与输入框相同）
+    """
+
+    message_received = Signal(dict)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self._on_new_connection)
+
+        # 单实例锁：套接字连不上不代表没有实例在运行（对方可能正忙），以锁为准。
+        # 不按时间判定过期，只有持有锁的进程已经退出时才视为残留
+        self.lock = QLockFile(lock_path())
+        self.lock.setStaleLockTime(0)
+
+    def acquire(self) -> bool:
+        """取得单实例锁；返回 False 表示另一个实例正在运行"""
+        return self.lock.tryLock(0)
+
+    def listen(self) -> bool:
+        """开始监听（须先取得单实例锁）
+
+        持有锁时已存在的套接字一定来自异常退出的实例，清理后重试；
+        Windows 的命名管道允许重复监听，也依赖锁保证只有一个实例。
+        """
+        name = server_name()
+        if self.server.listen(name):
+            return True
+        if self.server.serverError() == QAbstractSocket.SocketError.AddressInUseError and self.lock.isLocked():
+            QLocalServer.removeServer(name)
+            return self.server.listen(name)
+        return False
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self._read(s))
+            socket.disconnected.connect(lambda s=socket: self._read(s, closing=True))
+
+    def _read(self, socket: QLocalSocket, closing: bool = False):
+        while socket.canReadLine():
+            line = bytes(socket.readLine()).strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line.decode('utf-8'))
+            except (UnicodeDecodeError, ValueError):
+                continue
+            if isinstance(message, dict):
+                self.message_received.emit(message)
+        if closing:
+            socket.deleteLater()
+
+    def close(self):
+        self.server.close()
+        self.lock.unlock()
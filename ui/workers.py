@@ -0,0 +1,58 @@
+import threading
+from typing import Callable
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class JobCancelled(Exception):
+    """后台任务被取消"""
+
+
+class JobSignals(QObject):
+    """后台任务信号（跨线程发出，在 GUI 线程中处理）"""
+    progress = Signal(int, str)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class BackgroundJob(QRunnable):
+    """在 QThreadPool 中执行的可取消任务
+
+    func 会收到一个 progress(百分比, 阶段) 回调；调用 cancel() 后，
+    下一次 progress 回调会抛出 cancel_exception，由任务自行中止。
+    """
+
+    def __init__(self, func: Callable, *args, cancel_exception=JobCancelled, **kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancel_exception = cancel_exception
+        self.signals = JobSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _progress(self, percent: int, stage: str):
+        if self._cancel.is_set():
+            raise self.cancel_exception()
+        self.signals.progress.emit(percent, stage)
+
+    def run(self):
+        try:
+            result = self.func(*self.args, progress=self._progress, **self.kwargs)
+        except (JobCancelled, self.cancel_exception):
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+    def start(self, pool: QThreadPool = None):
+        (pool or QThreadPool.globalInstance()).start(self)
+        return self
@@ -1,62 +1,61 @@
-import sqlite3
 import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db.database import Database
+from db.maintenance import convert_auto_vacuum
+from db.migrations import get_schema_version, latest_version
+
+
+def print_progress(description: str, done: int, total: int):
+    """打印迁移进度"""
+    percent = done * 100 // total if total else 100
+    print(f"\r{description}: {done}/{total} ({percent}%)", end="", flush=True)
+    if done >= total:
+        print()
+
+
+def update_database_schema(db_path: str = None, vacuum: bool = False):
+    """将数据库结构升级到最新版本
+
+    迁移逻辑位于 db/migrations.py，程序启动时 Database 也会自动执行；
+    这个脚本用于手动升级并查看进度，数据库路径与程序保持一致
+    （开发环境为 data/worklog.db，打包环境为用户数据目录）。
+    vacuum 时再完整 VACUUM 一次以启用增量回收（较大的数据库程序不会自动执行，需退出程序后运行）。
+    """
+    if db_path is None:
+        db_path = Database._get_default_db_path()
 
-def update_database_schema():
-    """更新数据库表结构，移除DEFAULT CURRENT_TIMESTAMP约束"""
-    
-    db_path = "data/worklog.db"
-    
     if not os.path.exists(db_path):
-        print("数据库文件不存在，无需更新")
+        print(f"数据库文件不存在，无需更新: {db_path}")
         return
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+
+    print(f"数据库: {os.path.abspath(db_path)}")
+
     try:
-        # 1. 创建新表（不带DEFAULT约束）
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS work_log_new (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                content TEXT NOT NULL,
-                project TEXT,
-                tags TEXT,
-                created_at TIMESTAMP
-            )
-        ''')
-        
-        # 2. 复制数据到新表
-        cursor.execute('''
-            INSERT INTO work_log_new (id, date, content, project, tags, created_at)
-            SELECT id, date, content, project, tags, created_at
-            FROM work_log
-        ''')
-        
-        # 3. 删除旧表
-        cursor.execute('DROP TABLE work_log')
-        
-        # 4. 重命名新表为旧表名
-        cursor.execute('ALTER TABLE work_log_new RENAME TO work_log')
-        
-        # 5. 重新创建索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_date ON work_log(date)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project ON work_log(project)')
-        
-        conn.commit()
-        print("数据库表结构更新成功！")
-        
-        # 显示更新后的表结构
-        cursor.execute('PRAGMA table_info(work_log)')
-        print("\n更新后的表结构:")
-        for col in cursor.fetchall():
-            print(f"  {col[1]} ({col[2]})")
-            
+        with Database(db_path, migration_progress=print_progress) as db:
+            print(f"数据库结构已是最新版本（v{get_schema_version(db.conn)} / v{latest_version()}）")
+
+            # 显示更新后的表结构
+            cursor = db.conn.execute('PRAGMA table_info(work_log)')
+            print("\n当前表结构:")
+            for col in cursor.fetchall():
+                print(f"  {col[1]} ({col[2]})")
+            vacuum = vacuum and db.conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2
+
+        if vacuum:
+            print("\n完整 VACUUM（启用 auto_vacuum=INCREMENTAL）...")
+            before, after = convert_auto_vacuum(db_path, busy_timeout=30)
+            print(f"完成：{before / 1024 / 1024:.1f} MiB -> {after / 1024 / 1024:.1f} MiB")
     except Exception as e:
-        conn.rollback()
         print(f"更新失败: {e}")
-    finally:
-        conn.close()
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    update_database_schema()
+    parser = argparse.ArgumentParser(description="升级 WorkTag 数据库结构")
+    parser.add_argument("--db", help="数据库文件路径（默认与程序使用的路径一致）")
+    parser.add_argument("--vacuum", action="store_true", help="完整 VACUUM 一次以启用增量回收（请先退出程序）")
+    args = parser.parse_args()
+    update_database_schema(args.db, args.vacuum)